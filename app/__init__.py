@@ -0,0 +1,6 @@
+# app/__init__.py
+from .utils.timing import boot  # noqa: F401  (first, so the boot clock covers all app imports)
+from dotenv import load_dotenv
+
+# Before any submodule reads its settings (SECRET_KEY, DATABASE_URL, ...).
+load_dotenv()
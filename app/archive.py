@@ -0,0 +1,224 @@
+# app/archive.py
+"""Hot/cold archival of completed todos and old pomodoros.
+
+Every list, filter and summary query runs against `todos` and `pomodoros`,
+so finished work nobody looks at any more still costs each scan. A periodic
+pass moves it into the *_archive tables (see app.models):
+
+- completed todos not updated for ARCHIVE_TODOS_AFTER_DAYS, with their
+  steps, tag links and pomodoros (a todo with a running pomodoro waits
+  until it is stopped);
+- finished pomodoros started more than ARCHIVE_POMODOROS_AFTER_DAYS ago.
+
+The pass works in batches of ARCHIVE_BATCH_SIZE rows. Each batch is one
+short transaction: INSERT ... SELECT into the archive, then DELETE the
+originals. The pass pauses ARCHIVE_PAUSE_SECONDS between batches so request
+writers never queue behind it for long. The copy is the batch's first
+statement. On SQLite that takes the write lock before anything is read, and
+on Postgres the candidates are picked with SKIP LOCKED, so workers running
+a pass at the same time never move the same rows.
+
+Archived rows keep their ids. Read endpoints take include_archived=true to
+fall through to the archive, and POST /todos/{id}/restore moves a todo
+back. The pomodoro_daily rollup is left alone, so summaries still count
+archived sessions. Archival is not a change in the sync log: clients keep
+what they have, and a full reset returns only live rows.
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, List, Optional
+
+from sqlalchemy import DateTime, delete, exists, func, insert, literal, select
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal
+from .metrics import registry
+from .models import (
+    ArchivedPomodoro, ArchivedTodo, ArchivedTodoStep, ArchivedTodoTag, Pomodoro, Todo, TodoStep, TodoTag,
+)
+from .versions import versions
+
+ARCHIVE_TODOS_AFTER_DAYS = int(os.getenv("ARCHIVE_TODOS_AFTER_DAYS", "90"))  # 0 = never
+ARCHIVE_POMODOROS_AFTER_DAYS = int(os.getenv("ARCHIVE_POMODOROS_AFTER_DAYS", "90"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+ARCHIVE_PAUSE_SECONDS = float(os.getenv("ARCHIVE_PAUSE_SECONDS", "0.05"))
+ARCHIVE_INTERVAL_SECONDS = float(os.getenv("ARCHIVE_INTERVAL_SECONDS", "3600"))
+
+log = logging.getLogger(__name__)
+
+_TODO = [c.name for c in Todo.__table__.columns]
+_STEP = [c.name for c in TodoStep.__table__.columns]
+_POMODORO = [c.name for c in Pomodoro.__table__.columns]
+
+
+def _columns(table, names: List[str], **replace):
+    return [replace[n] if n in replace else table.c[n] for n in names]
+
+
+# SQLite hands out max(rowid) + 1, so moving a table's newest row away would
+# let its id be issued again. Leaving it in place keeps ids unique across the
+# hot and archive tables.
+def _newest_id(model):
+    return select(func.max(model.id)).correlate(None).scalar_subquery()
+
+
+def _not_newest(model):
+    return model.id < _newest_id(model)
+
+
+def _holds_newest(model, todo_id):
+    return exists().where(model.todo_id == todo_id, model.id == _newest_id(model))
+
+
+def _running_pomodoro(todo_id):
+    return exists().where(Pomodoro.todo_id == todo_id, Pomodoro.ended_at.is_(None))
+
+
+def _move_children(db: Session, todo_ids: List[int], now: datetime) -> None:
+    """Copy then delete the steps, tag links and pomodoros of archived todos."""
+    s, p = TodoStep.__table__, Pomodoro.__table__
+    db.execute(insert(ArchivedTodoStep).from_select(
+        _STEP, select(*_columns(s, _STEP)).where(s.c.todo_id.in_(todo_ids))
+    ))
+    db.execute(insert(ArchivedTodoTag).from_select(
+        ["todo_id", "tag_id"], select(TodoTag.c.todo_id, TodoTag.c.tag_id).where(TodoTag.c.todo_id.in_(todo_ids))
+    ))
+    db.execute(insert(ArchivedPomodoro).from_select(
+        _POMODORO + ["archived_at"],
+        select(*_columns(p, _POMODORO), literal(now, DateTime)).where(p.c.todo_id.in_(todo_ids)),
+    ))
+    db.execute(delete(Pomodoro).where(Pomodoro.todo_id.in_(todo_ids)))
+    db.execute(delete(TodoStep).where(TodoStep.todo_id.in_(todo_ids)))
+    db.execute(delete(TodoTag).where(TodoTag.c.todo_id.in_(todo_ids)))
+    db.execute(delete(Todo).where(Todo.id.in_(todo_ids)).execution_options(synchronize_session=False))
+
+
+def archive_todos(db: Session, cutoff: datetime, limit: int = ARCHIVE_BATCH_SIZE) -> List:
+    """Move up to `limit` completed todos last updated before `cutoff`.
+
+    Returns the moved (id, owner_id) rows; the caller commits.
+    """
+    now = datetime.utcnow()
+    t = Todo.__table__
+    candidates = (
+        select(*_columns(t, _TODO), literal(now, DateTime))
+        .where(t.c.completed.is_(True), t.c.updated_at < cutoff, _not_newest(Todo),
+               ~_holds_newest(TodoStep, t.c.id), ~_holds_newest(Pomodoro, t.c.id), ~_running_pomodoro(t.c.id))
+        .order_by(t.c.updated_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    rows = db.execute(
+        insert(ArchivedTodo).from_select(_TODO + ["archived_at"], candidates)
+        .returning(ArchivedTodo.id, ArchivedTodo.owner_id)
+    ).all()
+    if rows:
+        _move_children(db, [r.id for r in rows], now)
+    return rows
+
+
+def archive_pomodoros(db: Session, cutoff: datetime, limit: int = ARCHIVE_BATCH_SIZE) -> List:
+    """Move up to `limit` finished pomodoros started before `cutoff`."""
+    p = Pomodoro.__table__
+    candidates = (
+        select(*_columns(p, _POMODORO), literal(datetime.utcnow(), DateTime))
+        .where(p.c.ended_at.isnot(None), p.c.started_at < cutoff, _not_newest(Pomodoro))
+        .order_by(p.c.started_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    rows = db.execute(
+        insert(ArchivedPomodoro).from_select(_POMODORO + ["archived_at"], candidates)
+        .returning(ArchivedPomodoro.id, ArchivedPomodoro.owner_id)
+    ).all()
+    if rows:
+        db.execute(delete(Pomodoro).where(Pomodoro.id.in_([r.id for r in rows])))
+    return rows
+
+
+def restore_todo(db: Session, owner_id: int, todo_id: int) -> bool:
+    """Move an archived todo (and everything archived with it) back; the caller commits.
+
+    updated_at is set to now, so the next pass doesn't archive it straight away.
+    """
+    a, s, p = ArchivedTodo.__table__, ArchivedTodoStep.__table__, ArchivedPomodoro.__table__
+    moved = db.execute(insert(Todo).from_select(
+        _TODO,
+        select(*_columns(a, _TODO, updated_at=literal(datetime.utcnow(), DateTime)))
+        .where(a.c.id == todo_id, a.c.owner_id == owner_id),
+    )).rowcount
+    if not moved:
+        return False
+    db.execute(insert(TodoStep).from_select(_STEP, select(*_columns(s, _STEP)).where(s.c.todo_id == todo_id)))
+    db.execute(insert(TodoTag).from_select(
+        ["todo_id", "tag_id"],
+        select(ArchivedTodoTag.c.todo_id, ArchivedTodoTag.c.tag_id).where(ArchivedTodoTag.c.todo_id == todo_id),
+    ))
+    db.execute(insert(Pomodoro).from_select(_POMODORO, select(*_columns(p, _POMODORO)).where(p.c.todo_id == todo_id)))
+    _delete(db, [todo_id])
+    return True
+
+
+def _delete(db: Session, todo_ids: List[int]) -> None:
+    db.execute(delete(ArchivedPomodoro).where(ArchivedPomodoro.todo_id.in_(todo_ids)))
+    db.execute(delete(ArchivedTodoStep).where(ArchivedTodoStep.todo_id.in_(todo_ids)))
+    db.execute(delete(ArchivedTodoTag).where(ArchivedTodoTag.c.todo_id.in_(todo_ids)))
+    db.execute(delete(ArchivedTodo).where(ArchivedTodo.id.in_(todo_ids)).execution_options(synchronize_session=False))
+
+
+def delete_todo(db: Session, owner_id: int, todo_id: int) -> bool:
+    """Delete an archived todo and what was archived with it."""
+    found = db.scalar(select(ArchivedTodo.id).where(ArchivedTodo.id == todo_id, ArchivedTodo.owner_id == owner_id))
+    if found is None:
+        return False
+    _delete(db, [todo_id])
+    return True
+
+
+def forget_todos(db: Session, todo_ids: Iterable[int]) -> None:
+    """Drop archived pomodoros of live todos that are being deleted."""
+    db.execute(delete(ArchivedPomodoro).where(ArchivedPomodoro.todo_id.in_(list(todo_ids))))
+
+
+def _run_batch(move: Callable[[Session, datetime], List], cutoff: datetime) -> int:
+    with SessionLocal() as db:
+        rows = move(db, cutoff)
+        db.commit()
+    if rows:
+        versions.bump(*{r.owner_id for r in rows})  # cached lists changed
+    return len(rows)
+
+
+async def archive_once(now: Optional[datetime] = None) -> dict:
+    """One pass over both tables, batch by batch, pausing between batches."""
+    now = now or datetime.utcnow()
+    stats = {"todos": 0, "pomodoros": 0}
+    for table, days, move in (
+        ("todos", ARCHIVE_TODOS_AFTER_DAYS, archive_todos),
+        ("pomodoros", ARCHIVE_POMODOROS_AFTER_DAYS, archive_pomodoros),
+    ):
+        if days <= 0:
+            continue
+        cutoff = now - timedelta(days=days)
+        while True:
+            moved = await asyncio.to_thread(_run_batch, move, cutoff)
+            if moved:
+                stats[table] += moved
+                registry.inc("archived_rows_total", (("table", table),), moved)
+            if moved < ARCHIVE_BATCH_SIZE:
+                break
+            await asyncio.sleep(ARCHIVE_PAUSE_SECONDS)
+    return stats
+
+
+async def archive_periodically() -> None:
+    """Lifespan task: a pass now and then every ARCHIVE_INTERVAL_SECONDS."""
+    while True:
+        try:
+            stats = await archive_once()
+            log.info("archival pass: %s", stats)
+        except Exception:
+            log.exception("archival pass failed")
+        await asyncio.sleep(ARCHIVE_INTERVAL_SECONDS)
@@ -0,0 +1,60 @@
+# app/changes.py
+"""Record what a transaction changed and act on it once it commits.
+
+Mutating routes call record() before db.commit(). Just before the
+commit the changes are appended to the sync change log (app.sync), in the
+same transaction. Nothing else happens on rollback. After a commit, the
+owners' data versions are bumped and one compact event per change is
+published to the live hub:
+{"type": "todo.update", "id": 7, "v": <data version>, ...payload}.
+"""
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from . import sync
+from .live import hub
+from .versions import versions
+
+
+class Change(NamedTuple):
+    user_id: int
+    entity: str      # "todo" | "step" | "pomodoro"
+    entity_id: Optional[int]
+    op: str          # "create" | "update" | "delete"; pomodoros: "start" | "stop"
+    payload: Optional[Dict[str, Any]] = None
+
+
+def record(db: Session, user_id: int, entity: str, entity_id: Optional[int], op: str,
+           payload: Optional[Dict[str, Any]] = None) -> None:
+    db.info.setdefault("pending_changes", []).append(Change(user_id, entity, entity_id, op, payload))
+
+
+@event.listens_for(Session, "before_commit")
+def _log_pending_changes(session):
+    pending = session.info.get("pending_changes")
+    if pending:
+        sync.append(session, pending)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_committed_changes(session):
+    pending = session.info.pop("pending_changes", None)
+    if not pending:
+        return
+    by_user: Dict[int, List[Change]] = {}
+    for c in pending:
+        by_user.setdefault(c.user_id, []).append(c)
+    versions.bump(*by_user)
+    for user_id, user_changes in by_user.items():
+        v = versions.get(user_id)
+        hub.publish(user_id, [
+            {"type": f"{c.entity}.{c.op}", "id": c.entity_id, "v": v, **(c.payload or {})}
+            for c in user_changes
+        ])
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_uncommitted_changes(session):
+    session.info.pop("pending_changes", None)
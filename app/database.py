@@ -1,16 +1,174 @@
+import logging
 import os
-from sqlalchemy import create_engine
+import time
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, StaticPool
+
+from .utils.timing import current_stats
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./app.db")
-connect_args = {"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
-engine = create_engine(DATABASE_URL, connect_args=connect_args)
+# Optional read replica for GET routes (see app.replica). For a local SQLite
+# stand-in: sqlite:///file:app.db?mode=ro&uri=true, or a copy of the file.
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL", "")
+# "async" serves the JSON routes from an AsyncSession (see app.routers.aio);
+# the sync engine stays around for startup, exports and anything not ported.
+DB_MODE = os.getenv("DB_MODE", "sync").lower()
+# "production" applies the SQLite pragmas below; "plain" keeps driver defaults.
+DB_PROFILE = os.getenv("DB_PROFILE", "production").lower()
+
+# Statements slower than this are logged to "app.sql.slow" (0 disables).
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "250"))
+slow_log = logging.getLogger("app.sql.slow")
+
+# Applied on every new SQLite connection. WAL lets readers run alongside the
+# single writer; busy_timeout makes writers from other workers wait, not fail.
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-20000")),  # negative = KiB
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(128 * 1024 * 1024))),
+    "temp_store": os.getenv("SQLITE_TEMP_STORE", "MEMORY"),
+}
+
+def _is_memory_sqlite(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+def engine_options(url: str) -> dict:
+    """Pool/connect kwargs for create_engine, per backend, from the environment."""
+    u = make_url(url)
+    if _is_memory_sqlite(u):
+        return {"connect_args": {"check_same_thread": False}, "poolclass": StaticPool}
+    sqlite = u.get_backend_name() == "sqlite"
+    # A request keeps its connection until teardown, possibly while queued for
+    # a threadpool slot; SQLite connections are cheap, so size the pool past
+    # AnyIO's 40 threads to avoid pool timeouts under bursts.
+    opts = {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "40" if sqlite else "10")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "40" if sqlite else "20")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "-1" if sqlite else "1800")),
+    }
+    if sqlite:
+        opts["connect_args"] = {"check_same_thread": False}
+    else:
+        opts["pool_pre_ping"] = os.getenv("DB_POOL_PRE_PING", "true").lower() in {"1", "true", "yes"}
+        if os.getenv("DB_CONNECT_TIMEOUT"):
+            opts["connect_args"] = {"connect_timeout": int(os.getenv("DB_CONNECT_TIMEOUT"))}
+    return opts
+
+# Replica connections don't get to pick the journal mode, and can't write.
+SQLITE_READ_PRAGMAS = {
+    **{k: v for k, v in SQLITE_PRAGMAS.items() if k not in ("journal_mode", "synchronous")},
+    "query_only": 1,
+}
+
+def _pragma_applier(pragmas: dict):
+    def apply(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+    return apply
+
+_apply_sqlite_pragmas = _pragma_applier(SQLITE_PRAGMAS)
+_apply_sqlite_read_pragmas = _pragma_applier(SQLITE_READ_PRAGMAS)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    stats = current_stats.get()
+    if stats is not None:
+        stats.sql_count += 1
+        stats.sql_seconds += elapsed
+    if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS:
+        if stats is not None:
+            stats.slow_queries += 1
+        # Parameters are left out on purpose: they carry user data.
+        slow_log.warning(
+            "%.1f ms %s%s",
+            elapsed * 1000, f"[{stats.path}] " if stats else "", " ".join(statement.split())[:1000],
+        )
+
+def _on_error(context):
+    started = context.connection.info.get("query_started") if context.connection is not None else None
+    if started:
+        started.pop()
+
+def tune_engine(sync_engine, read_only: bool = False) -> None:
+    """Attach connect-time pragmas to a (sync or async's .sync_engine) SQLite
+    engine, and per-request SQL counting/slow-query logging to any engine."""
+    if sync_engine.dialect.name == "sqlite" and read_only:
+        event.listen(sync_engine, "connect", _apply_sqlite_read_pragmas)
+    elif sync_engine.dialect.name == "sqlite" and DB_PROFILE == "production":
+        event.listen(sync_engine, "connect", _apply_sqlite_pragmas)
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _on_error)
+
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
+tune_engine(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+read_engine = None
+ReadSessionLocal = None
+if DATABASE_READ_URL:
+    read_engine = create_engine(DATABASE_READ_URL, **engine_options(DATABASE_READ_URL))
+    tune_engine(read_engine, read_only=True)
+    ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+def async_url(url: str) -> str:
+    """Map a sync URL to its async driver: aiosqlite / psycopg (v3)."""
+    u = make_url(url)
+    if u.get_backend_name() == "sqlite":
+        return u.set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+    if u.get_backend_name() == "postgresql":
+        return u.set(drivername="postgresql+psycopg").render_as_string(hide_password=False)
+    return url
+
+def _async_engine_options(url: str) -> dict:
+    opts = engine_options(url)
+    if make_url(url).get_backend_name() == "sqlite":
+        opts.pop("connect_args", None)  # check_same_thread is meaningless for aiosqlite
+        if "pool_size" in opts:  # file DB: pool connections instead of aiosqlite's NullPool default
+            opts["poolclass"] = AsyncAdaptedQueuePool
+    return opts
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or async_url(DATABASE_URL)
+ASYNC_DATABASE_READ_URL = os.getenv("ASYNC_DATABASE_READ_URL") or (
+    async_url(DATABASE_READ_URL) if DATABASE_READ_URL else ""
+)
+async_engine = None
+AsyncSessionLocal = None
+async_read_engine = None
+AsyncReadSessionLocal = None
+if DB_MODE == "async":
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, **_async_engine_options(ASYNC_DATABASE_URL))
+    tune_engine(async_engine.sync_engine)
+    # expire_on_commit=False: attributes can't lazy-load once we're back on the event loop.
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    if ASYNC_DATABASE_READ_URL:
+        async_read_engine = create_async_engine(
+            ASYNC_DATABASE_READ_URL, **_async_engine_options(ASYNC_DATABASE_READ_URL)
+        )
+        tune_engine(async_read_engine.sync_engine, read_only=True)
+        AsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,26 +1,7 @@
 # app/deps.py
-import os
-from fastapi import Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
-from sqlalchemy.orm import Session
+# Kept for import compatibility: every route resolves users through app.security
+# so they all share the same token cache.
 from .database import get_db
-from . import models
+from .security import CurrentUser, get_current_user, oauth2_scheme
 
-SECRET_KEY = os.getenv("SECRET_KEY", "CHANGE_ME")
-ALGORITHM = os.getenv("ALGORITHM", "HS256")
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
-
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    creds_exc = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired token")
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email = payload.get("sub")
-        if not email:
-            raise creds_exc
-    except JWTError:
-        raise creds_exc
-    user = db.query(models.User).filter(models.User.email == email).first()
-    if not user:
-        raise creds_exc
-    return user
+__all__ = ["CurrentUser", "get_current_user", "get_db", "oauth2_scheme"]
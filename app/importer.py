@@ -0,0 +1,232 @@
+# app/importer.py
+"""Bulk import behind POST /todos/import: CSV (the export.csv columns) or ICS.
+
+The body is consumed as it arrives. Bytes are decoded and split into lines
+incrementally and parsed one record at a time. Every IMPORT_BATCH_SIZE valid
+rows are inserted and committed in their own short transaction, set-based as
+in /todos/bulk. Memory stays flat with upload size, and a slow client never
+holds a transaction open. Batches already committed stay committed if a later
+part of the upload is rejected.
+
+Each date column gets its own ColumnDateParser, so its format is detected
+once rather than tried format by format for every value.
+"""
+import codecs
+import csv
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from . import changes, models, schemas, tags
+from .database import SessionLocal
+from .utils.calendar import iter_ics_components
+from .utils import lexorank
+from .utils.dates import KNOWN_FORMATS, ColumnDateParser
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", "1000"))  # reported; the rest are only counted
+IMPORT_MAX_LINE = 1024 * 1024
+ICS_DATE_FORMATS = ("%Y%m%dT%H%M%SZ", "%Y%m%dT%H%M%S", "%Y%m%d", *KNOWN_FORMATS)
+_TRUE = {"1", "true", "yes", "y", "x"}
+
+
+class ImportFormatError(ValueError):
+    """The upload as a whole can't be read (as opposed to one bad row)."""
+
+
+class _Row(NamedTuple):
+    values: Dict[str, Any]  # todos columns, minus owner_id
+    tags: List[str]
+    steps: List[Dict[str, Any]]
+
+
+def insert_todos(db: Session, rows: List[Dict[str, Any]]) -> List[int]:
+    """INSERT rows into todos in one statement; returns the ids in row order."""
+    # SQLite can't batch an order-preserving RETURNING, but it hands out
+    # rowids in VALUES order, so sorting the batched result is equivalent.
+    sqlite = db.get_bind().dialect.name == "sqlite"
+    ids = db.scalars(
+        insert(models.Todo.__table__).returning(models.Todo.id, sort_by_parameter_order=not sqlite), rows
+    ).all()
+    return sorted(ids) if sqlite else list(ids)
+
+
+def _lines(chunks: Iterable[bytes]) -> Iterator[str]:
+    """Decode a byte stream and yield "\\n"-terminated lines as they complete."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    tail = ""
+    for chunk in chunks:
+        text = tail + decoder.decode(chunk)
+        start = 0
+        while True:
+            nl = text.find("\n", start)
+            if nl < 0:
+                break
+            yield text[start:nl + 1]
+            start = nl + 1
+        tail = text[start:]
+        if len(tail) > IMPORT_MAX_LINE:
+            raise ImportFormatError(f"a line is longer than {IMPORT_MAX_LINE} bytes")
+    tail += decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def _row(now: datetime, title: Optional[str], notes: Optional[str], priority: Any, estimate: Any,
+         due: Optional[datetime], plan: Optional[datetime], created: Optional[datetime],
+         completed: bool, tag_names: List[str], steps: List[Dict[str, Any]]) -> _Row:
+    if not (title or "").strip():
+        raise ValueError("title is required")
+    data: Dict[str, Any] = {"title": title.strip(), "notes": notes or "", "due_date": due, "plan_at": plan,
+                            "tags": tag_names}
+    if priority not in (None, ""):
+        data["priority"] = priority
+    if estimate not in (None, ""):
+        data["estimate_minutes"] = estimate
+    c = schemas.TodoCreate.model_validate(data)
+    return _Row({
+        "title": c.title, "notes": c.notes, "completed": completed, "priority": c.priority,
+        "due_date": c.due_date, "plan_at": c.plan_at, "estimate_minutes": c.estimate_minutes,
+        "created_at": created or now, "updated_at": now,
+    }, c.tags, steps)
+
+
+def _json_or_csv_list(value: str) -> list:
+    value = (value or "").strip()
+    if not value:
+        return []
+    if value.startswith("["):
+        items = json.loads(value)
+        if not isinstance(items, list):
+            raise ValueError("expected a JSON list")
+        return items
+    return value.split(",")
+
+
+def _steps(value: str) -> List[Dict[str, Any]]:
+    out = []
+    for item in _json_or_csv_list(value):
+        if isinstance(item, dict):
+            text, done = str(item.get("text") or "").strip(), bool(item.get("done"))
+        else:
+            text, done = str(item).strip(), False
+        if text:
+            out.append({"text": text, "done": done})
+    return out
+
+
+def _csv_records(lines: Iterator[str], now: datetime) -> Iterator[Tuple[int, Union[_Row, str]]]:
+    reader = csv.reader(lines)
+    header = [h.strip().lower() for h in next(reader, [])]
+    if "title" not in header:
+        raise ImportFormatError("the CSV header must include a title column")
+    col = {name: i for i, name in enumerate(header)}
+    dates = {name: ColumnDateParser() for name in ("due_date", "plan_at", "created_at")}
+    width = len(header)
+
+    def get(rec: List[str], name: str) -> str:
+        i = col.get(name)
+        return rec[i] if i is not None and i < len(rec) else ""
+
+    n = 0
+    while True:
+        try:
+            rec = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as exc:
+            n += 1
+            yield n, str(exc)
+            continue
+        if not any(rec):
+            continue  # blank line
+        n += 1
+        if len(rec) > width:
+            yield n, f"expected {width} fields, got {len(rec)}"
+            continue
+        try:
+            yield n, _row(
+                now, get(rec, "title"), get(rec, "notes"), get(rec, "priority"), get(rec, "estimate_minutes"),
+                dates["due_date"](get(rec, "due_date")), dates["plan_at"](get(rec, "plan_at")),
+                dates["created_at"](get(rec, "created_at")), get(rec, "completed").strip().lower() in _TRUE,
+                [str(t) for t in _json_or_csv_list(get(rec, "tags"))], _steps(get(rec, "steps")),
+            )
+        except ValidationError as exc:
+            yield n, _describe(exc)
+        except ValueError as exc:
+            yield n, str(exc)
+
+
+def _ics_priority(value: Optional[str]) -> Optional[int]:
+    """RFC 5545 PRIORITY (1 highest .. 9 lowest, 0 undefined) -> 1..3."""
+    p = int(value or 0)
+    return None if p == 0 else 1 if p <= 4 else 2 if p == 5 else 3
+
+
+def _ics_records(lines: Iterator[str], now: datetime) -> Iterator[Tuple[int, Union[_Row, str]]]:
+    dates = {name: ColumnDateParser(ICS_DATE_FORMATS) for name in ("DUE", "DTSTART", "CREATED")}
+    for n, comp in enumerate(iter_ics_components(lines), start=1):
+        try:
+            start = dates["DTSTART"](comp.get("DTSTART"))
+            if comp["KIND"] == "VTODO":
+                due, plan = dates["DUE"](comp.get("DUE")), start
+            else:  # an event is a deadline on its day (what calendar.ics exports)
+                due, plan = start, None
+            yield n, _row(
+                now, comp.get("SUMMARY"), comp.get("DESCRIPTION"), _ics_priority(comp.get("PRIORITY")), None,
+                due, plan, dates["CREATED"](comp.get("CREATED")),
+                comp.get("STATUS", "").upper() == "COMPLETED" or "COMPLETED" in comp,
+                [c for c in comp.get("CATEGORIES", "").split(",") if c], [],
+            )
+        except ValidationError as exc:
+            yield n, _describe(exc)
+        except ValueError as exc:
+            yield n, str(exc)
+
+
+def _describe(exc: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in exc.errors(include_url=False))
+
+
+def _flush(owner_id: int, batch: List[_Row]) -> int:
+    with SessionLocal() as db:
+        ids = insert_todos(db, [{**r.values, "owner_id": owner_id} for r in batch])
+        steps = [
+            {"todo_id": todo_id, "text": s["text"], "done": s["done"], "rank": rank}
+            for todo_id, r in zip(ids, batch) for s, rank in zip(r.steps, lexorank.spread(len(r.steps)))
+        ]
+        if steps:
+            db.execute(insert(models.TodoStep), steps)
+        tags.replace_links(db, {todo_id: r.tags for todo_id, r in zip(ids, batch) if r.tags})
+        for todo_id in ids:
+            changes.record(db, owner_id, "todo", todo_id, "create")
+        db.commit()
+    return len(ids)
+
+
+def import_todos(owner_id: int, fmt: str, chunks: Iterable[bytes]) -> Dict[str, Any]:
+    """Import a CSV/ICS byte stream for owner_id. Blocking; run it in a thread."""
+    now = datetime.utcnow()
+    lines = _lines(chunks)
+    records = _csv_records(lines, now) if fmt == "csv" else _ics_records(lines, now)
+    result: Dict[str, Any] = {"format": fmt, "imported": 0, "failed": 0, "errors": []}
+    batch: List[_Row] = []
+    for row, parsed in records:
+        if isinstance(parsed, str):
+            result["failed"] += 1
+            if len(result["errors"]) < IMPORT_MAX_ERRORS:
+                result["errors"].append({"row": row, "error": parsed})
+            continue
+        batch.append(parsed)
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            result["imported"] += _flush(owner_id, batch)
+            batch = []
+    if batch:
+        result["imported"] += _flush(owner_id, batch)
+    result["errors_truncated"] = result["failed"] > len(result["errors"])
+    return result
@@ -0,0 +1,198 @@
+# app/live.py
+"""In-process pub/sub for live change events.
+
+app.changes publishes each committed transaction's events here, and
+WebSocket/SSE connections (app.routers.live) subscribe per user. Each
+subscriber owns a bounded queue on its event loop. A subscriber that falls
+behind gets a single {"type": "resync"} in place of the backlog, and so
+does a transaction that touches too many rows.
+
+The backend decides who else hears a publish:
+  LIVE_BACKEND=local  this process only (one uvicorn worker)
+  LIVE_BACKEND=unix   every worker on the host. Each worker binds a
+                      datagram socket in LIVE_BROKER_DIR, and a publish is
+                      sent to every socket found there. This stands in for
+                      a real broker (e.g. Redis pub/sub), which would
+                      implement the same three methods.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import socket
+import tempfile
+import threading
+import uuid
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, List, Optional, Set
+
+from .database import DATABASE_URL
+
+LIVE_BACKEND = os.getenv("LIVE_BACKEND", "local")
+LIVE_BROKER_DIR = os.getenv("LIVE_BROKER_DIR") or os.path.join(
+    tempfile.gettempdir(), "todo-live-" + hashlib.sha1(DATABASE_URL.encode()).hexdigest()[:12]
+)
+LIVE_QUEUE_SIZE = int(os.getenv("LIVE_QUEUE_SIZE", "256"))
+LIVE_COALESCE_AFTER = int(os.getenv("LIVE_COALESCE_AFTER", "50"))
+
+Deliver = Callable[[int, List[dict]], None]
+
+
+def _encode(obj) -> str:
+    return json.dumps(obj, separators=(",", ":"), default=str)
+
+
+class LocalBackend:
+    name = "local"
+
+    def __init__(self):
+        self._deliver: Optional[Deliver] = None
+
+    async def start(self, deliver: Deliver) -> None:
+        self._deliver = deliver
+
+    async def stop(self) -> None:
+        pass
+
+    def publish(self, user_id: int, events: List[dict]) -> None:
+        if self._deliver is not None:
+            self._deliver(user_id, events)
+
+
+class UnixSocketBackend(LocalBackend):
+    """Fan out to sibling workers over AF_UNIX datagrams (Linux/macOS)."""
+
+    name = "unix"
+    MAX_DATAGRAM = 60_000
+
+    def __init__(self, directory: str = LIVE_BROKER_DIR):
+        super().__init__()
+        self.directory = directory
+        self.path = os.path.join(directory, f"{os.getpid()}-{uuid.uuid4().hex[:8]}.sock")
+        self._sock: Optional[socket.socket] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def start(self, deliver: Deliver) -> None:
+        await super().start(deliver)
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sock.bind(self.path)
+        self._sock.setblocking(False)
+        self._loop = asyncio.get_running_loop()
+        self._loop.add_reader(self._sock.fileno(), self._on_readable)
+
+    async def stop(self) -> None:
+        if self._sock is not None:
+            self._loop.remove_reader(self._sock.fileno())
+            self._sock.close()
+            self._sock = None
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+
+    def _on_readable(self) -> None:
+        while True:
+            try:
+                data = self._sock.recv(self.MAX_DATAGRAM)
+            except (BlockingIOError, InterruptedError):
+                return
+            user_id, events = json.loads(data)
+            self._deliver(user_id, events)
+
+    def publish(self, user_id: int, events: List[dict]) -> None:
+        super().publish(user_id, events)
+        if self._sock is None:
+            return
+        data = _encode([user_id, events]).encode()
+        if len(data) > self.MAX_DATAGRAM:
+            data = _encode([user_id, [{"type": "resync", "v": events[-1].get("v")}]]).encode()
+        for entry in os.scandir(self.directory):
+            if entry.path == self.path or not entry.name.endswith(".sock"):
+                continue
+            try:
+                self._sock.sendto(data, entry.path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # A worker that died without cleaning up.
+                try:
+                    os.unlink(entry.path)
+                except FileNotFoundError:
+                    pass
+            except BlockingIOError:
+                pass  # peer's buffer is full; its clients will resync on reconnect
+
+
+class Subscription:
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue: "asyncio.Queue[List[str]]" = asyncio.Queue(LIVE_QUEUE_SIZE)
+
+    def push(self, frames: List[str], resync: str) -> None:
+        """Runs on the subscriber's loop."""
+        try:
+            self.queue.put_nowait(frames)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait([resync])
+
+    async def get(self) -> List[str]:
+        return await self.queue.get()
+
+
+class Hub:
+    def __init__(self, backend: LocalBackend):
+        self.backend = backend
+        self._subs: Dict[int, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+
+    async def start(self) -> None:
+        await self.backend.start(self._deliver)
+
+    async def stop(self) -> None:
+        await self.backend.stop()
+
+    def publish(self, user_id: int, events: List[dict]) -> None:
+        """Thread-safe; called from app.changes after a commit."""
+        if not events:
+            return
+        if len(events) > LIVE_COALESCE_AFTER:
+            events = [{"type": "resync", "v": events[-1].get("v")}]
+        self.backend.publish(user_id, events)
+
+    def _deliver(self, user_id: int, events: List[dict]) -> None:
+        with self._lock:
+            subs = list(self._subs.get(user_id, ()))
+        if not subs:
+            return
+        frames = [_encode(e) for e in events]  # encoded once, shared by every connection
+        resync = _encode({"type": "resync", "v": events[-1].get("v")})
+        for sub in subs:
+            sub.loop.call_soon_threadsafe(sub.push, frames, resync)
+
+    @asynccontextmanager
+    async def subscribe(self, user_id: int):
+        sub = Subscription(user_id)
+        with self._lock:
+            self._subs.setdefault(user_id, set()).add(sub)
+        try:
+            yield sub
+        finally:
+            with self._lock:
+                subs = self._subs.get(user_id)
+                subs.discard(sub)
+                if not subs:
+                    del self._subs[user_id]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": self.backend.name,
+                "users": len(self._subs),
+                "connections": sum(len(s) for s in self._subs.values()),
+            }
+
+
+_BACKENDS = {"local": LocalBackend, "unix": UnixSocketBackend}
+hub = Hub(_BACKENDS[LIVE_BACKEND]())
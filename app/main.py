@@ -1,25 +1,67 @@
 # app/main.py
+import asyncio
+import logging
 import os
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from fastapi.routing import APIRoute
 
-from .database import Base, engine
+from .database import DB_MODE, async_engine, async_read_engine, engine
+from .responses import FastJSONResponse
+from . import metrics, replica
+from .live import hub
+from .archive import archive_periodically
+from .schema import ensure_schema
+from .steps import rebalance_periodically
+from .security import auth_cache_stats
+from .sync import compact_periodically
+from .utils.timing import boot
+from .versions import versions
 from .routers import auth as auth_router
 from .routers import todos as todos_router
 from .routers import pomodoro as pomodoro_router
-from .routers import todos as todos_router
-from dotenv import load_dotenv; load_dotenv()
+from .routers import live as live_router
+from .routers import sync as sync_router
+
+boot_log = logging.getLogger("app.boot")
 
 
-# Create DB tables once on startup (better to use Alembic later)
+# Migrates only when the schema fingerprint changed, and then in one worker
+# (see app.schema).
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    Base.metadata.create_all(bind=engine)
+    boot.mark("server")  # from the end of import until the server starts us
+    ensure_schema(engine)
+    boot.mark("schema")
+    versions.reset()  # the DB may have changed while we were down
+    await hub.start()
+    compaction = asyncio.create_task(compact_periodically())
+    archival = asyncio.create_task(archive_periodically())
+    rebalancing = asyncio.create_task(rebalance_periodically())
+    metrics.prune_stale()  # snapshots of workers from earlier runs would inflate /metrics
+    metrics_flush = asyncio.create_task(metrics.flush_periodically())
+    boot.mark("services")
+    boot_log.info("worker ready: %s", boot.report())
     yield
+    compaction.cancel()
+    archival.cancel()
+    rebalancing.cancel()
+    metrics_flush.cancel()
+    await hub.stop()
+    if async_engine is not None:
+        await async_engine.dispose()
+    if async_read_engine is not None:
+        await async_read_engine.dispose()
 
 # Single FastAPI app
-app = FastAPI(title="Todo + Time Manager", version="1.1.0", lifespan=lifespan)
+app = FastAPI(
+    title="Todo + Time Manager",
+    version="1.1.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
+)
 
 # CORS: read comma-separated origins from env, with sensible defaults
 env_origins = os.getenv("CORS_ORIGINS", "").strip()
@@ -32,12 +74,37 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
+# Added last so it wraps CORS as well.
+app.add_middleware(metrics.MetricsMiddleware)
 
 # Routers
+if DB_MODE == "async":
+    # Registered first so they win; the sync routes they shadow are dropped below.
+    from .routers import aio
+    app.include_router(aio.auth_router)
+    app.include_router(aio.todos_router)
+    app.include_router(aio.pomodoro_router)
+    app.include_router(aio.sync_router)
 app.include_router(auth_router.router)
 app.include_router(todos_router.router)
 app.include_router(pomodoro_router.router)
+app.include_router(sync_router.router)
+app.include_router(live_router.router)
+
+def _drop_shadowed_routes(app: FastAPI) -> None:
+    seen = set()
+    keep = []
+    for route in app.router.routes:
+        key = (route.path, frozenset(route.methods)) if isinstance(route, APIRoute) else None
+        if key is not None and key in seen:
+            continue
+        seen.add(key)
+        keep.append(route)
+    app.router.routes[:] = keep
+
+_drop_shadowed_routes(app)
 
 # Friendly root + health
 @app.get("/", include_in_schema=False)
@@ -49,4 +116,11 @@ def root():
 
 @app.get("/health", include_in_schema=False)
 def health():
-    return {"ok": True}
+    return {"ok": True, "auth_cache": auth_cache_stats(), "live": hub.stats(),
+            "replica": replica.stats(), "boot": boot.report()}
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+boot.mark("import")
@@ -0,0 +1,245 @@
+# app/metrics.py
+"""Request metrics: Server-Timing headers and a Prometheus /metrics page.
+
+MetricsMiddleware times every HTTP request, labelled by route template.
+It also reads the SQL count/time and serialization time gathered for that
+request (app.utils.timing, fed by the engine hooks in app.database and by
+app.responses) and adds a Server-Timing header to the response.
+
+Each worker keeps its own registry and snapshots it to
+METRICS_DIR/<pid>-<id>.json every METRICS_FLUSH_SECONDS. /metrics adds up
+the live registry and every other worker's snapshot, so a scrape that
+lands on any worker reports totals for the host. This works like
+prometheus_client's multiprocess mode. Each worker prunes snapshots left by
+dead processes when it starts (prune_stale), so restarts don't inflate the
+totals. Set METRICS_DIR=memory to report this process only.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from typing import Dict, List, Tuple
+
+from starlette.datastructures import MutableHeaders
+
+from .database import DATABASE_URL
+from .utils.timing import RequestStats, current_stats
+
+METRICS_DIR = os.getenv("METRICS_DIR") or os.path.join(
+    tempfile.gettempdir(), "todo-metrics-" + hashlib.sha1(DATABASE_URL.encode()).hexdigest()[:12]
+)
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HELP = {
+    "http_requests_total": ("counter", "Requests by route template, method and status."),
+    "http_request_duration_seconds": ("histogram", "Time from request start to last body byte."),
+    "http_request_sql_queries_total": ("counter", "SQL statements executed while serving requests."),
+    "http_request_sql_seconds_total": ("counter", "Time spent in SQL statements while serving requests."),
+    "http_request_serialize_seconds_total": ("counter", "Time spent validating/encoding response bodies."),
+    "http_request_slow_queries_total": ("counter", "Statements at or over SLOW_QUERY_MS."),
+    "auth_throttled_total": ("counter", "Auth requests rejected by app.throttle, by endpoint and bucket scope."),
+    "archived_rows_total": ("counter", "Rows moved to the archive tables by app.archive, by source table."),
+    "db_read_sessions_total": ("counter", "Read sessions by engine chosen in app.replica, and why the primary was."),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        self.histograms: Dict[Tuple[str, Labels], List[float]] = {}  # bucket counts..., sum, count
+
+    def inc(self, name: str, labels: Labels, value: float = 1.0) -> None:
+        with self._lock:
+            key = (name, labels)
+            self.counters[key] = self.counters.get(key, 0.0) + value
+
+    def observe(self, name: str, labels: Labels, value: float) -> None:
+        with self._lock:
+            h = self.histograms.setdefault((name, labels), [0.0] * (len(BUCKETS) + 3))
+            h[bisect_left(BUCKETS, value)] += 1  # index len(BUCKETS) is +Inf
+            h[-2] += value
+            h[-1] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "counters": [[n, list(map(list, l)), v] for (n, l), v in self.counters.items()],
+                "histograms": [[n, list(map(list, l)), h] for (n, l), h in self.histograms.items()],
+            }
+
+
+registry = Registry()
+_worker_file = os.path.join(METRICS_DIR, f"{os.getpid()}-{uuid.uuid4().hex[:8]}.json")
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:  # exists, owned by someone else
+        return True
+    except OSError:
+        return False
+    return True
+
+
+def prune_stale() -> int:
+    """Delete snapshots whose worker is gone; returns how many went.
+
+    A file also counts as stale when it hasn't been flushed for a long
+    while, in case its pid has since been reused by an unrelated process.
+    """
+    if METRICS_DIR == "memory" or not os.path.isdir(METRICS_DIR):
+        return 0
+    cutoff = time.time() - max(60.0, 10 * METRICS_FLUSH_SECONDS)
+    removed = 0
+    for entry in os.scandir(METRICS_DIR):
+        if entry.path.startswith(_worker_file) or not entry.name.endswith((".json", ".json.tmp")):
+            continue
+        pid = entry.name.split("-", 1)[0]
+        try:
+            stale = not pid.isdigit() or not _pid_alive(int(pid)) or entry.stat().st_mtime < cutoff
+            if stale:
+                os.remove(entry.path)
+                removed += 1
+        except FileNotFoundError:
+            continue  # another worker pruned it first
+    return removed
+
+
+def flush() -> None:
+    if METRICS_DIR == "memory":
+        return
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    tmp = _worker_file + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(registry.snapshot(), f)
+    os.replace(tmp, _worker_file)
+
+
+async def flush_periodically() -> None:
+    """Lifespan task; cancelled (after a final flush) on shutdown."""
+    try:
+        while True:
+            await asyncio.sleep(METRICS_FLUSH_SECONDS)
+            await asyncio.to_thread(flush)
+    finally:
+        flush()
+
+
+def _snapshots() -> List[dict]:
+    snaps = [registry.snapshot()]
+    if METRICS_DIR != "memory" and os.path.isdir(METRICS_DIR):
+        for entry in os.scandir(METRICS_DIR):
+            if entry.name.endswith(".json") and entry.path != _worker_file:
+                try:
+                    with open(entry.path) as f:
+                        snaps.append(json.load(f))
+                except (OSError, ValueError):
+                    continue  # being replaced right now; next scrape will have it
+    return snaps
+
+
+def _fmt_labels(labels, extra: str = "") -> str:
+    parts = [
+        '%s="%s"' % (k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in labels
+    ]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _num(v: float) -> str:
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+
+def render() -> str:
+    """Prometheus text exposition (format 0.0.4) summed over all workers."""
+    counters: Dict[tuple, float] = {}
+    histograms: Dict[tuple, List[float]] = {}
+    for snap in _snapshots():
+        for name, labels, value in snap["counters"]:
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0.0) + value
+        for name, labels, h in snap["histograms"]:
+            key = (name, tuple(map(tuple, labels)))
+            acc = histograms.setdefault(key, [0.0] * len(h))
+            for i, v in enumerate(h):
+                acc[i] += v
+
+    lines = []
+    for name, (kind, help_text) in HELP.items():
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        if kind == "counter":
+            for (n, labels), v in sorted(counters.items()):
+                if n == name:
+                    lines.append(f"{name}{_fmt_labels(labels)} {_num(v)}")
+            continue
+        for (n, labels), h in sorted(histograms.items()):
+            if n != name:
+                continue
+            cumulative = 0.0
+            for le, count in zip([*map(str, BUCKETS), "+Inf"], h):
+                cumulative += count
+                le_label = 'le="%s"' % le
+                lines.append(f"{name}_bucket{_fmt_labels(labels, le_label)} {_num(cumulative)}")
+            lines.append(f"{name}_sum{_fmt_labels(labels)} {_num(h[-2])}")
+            lines.append(f"{name}_count{_fmt_labels(labels)} {_num(h[-1])}")
+    return "\n".join(lines) + "\n"
+
+
+def _server_timing(stats: RequestStats, total: float) -> str:
+    return (
+        f'db;dur={stats.sql_seconds * 1000:.1f};desc="{stats.sql_count} queries", '
+        f"ser;dur={stats.serialize_seconds * 1000:.1f}, app;dur={total * 1000:.1f}"
+    )
+
+
+class MetricsMiddleware:
+    """Pure ASGI (streams pass straight through, unlike BaseHTTPMiddleware)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats(path=scope["path"])
+        token = current_stats.set(stats)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                MutableHeaders(scope=message).append(
+                    "Server-Timing", _server_timing(stats, time.perf_counter() - start)
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_stats.reset(token)
+            route = getattr(scope.get("route"), "path", None) or "<unmatched>"
+            labels = (("method", scope["method"]), ("route", route))
+            registry.inc("http_requests_total", labels + (("status", str(status)),))
+            registry.observe("http_request_duration_seconds", labels, time.perf_counter() - start)
+            registry.inc("http_request_sql_queries_total", labels, stats.sql_count)
+            registry.inc("http_request_sql_seconds_total", labels, stats.sql_seconds)
+            registry.inc("http_request_serialize_seconds_total", labels, stats.serialize_seconds)
+            if stats.slow_queries:
+                registry.inc("http_request_slow_queries_total", labels, stats.slow_queries)
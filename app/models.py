@@ -1,14 +1,18 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Table
+from sqlalchemy import Column, Integer, String, Boolean, Date, DateTime, ForeignKey, Table, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .database import Base
 
+RANK_LENGTH = 64  # longest step rank; see app.steps
+
 
 TodoTag = Table(
     "todo_tags",
     Base.metadata,
     Column("todo_id", Integer, ForeignKey("todos.id"), primary_key=True),
     Column("tag_id", Integer, ForeignKey("tags.id"), primary_key=True),
+    # PK covers todo -> tags; this covers tag -> todos for ?tag= filtering.
+    Index("ix_todo_tags_tag_todo", "tag_id", "todo_id"),
 )
 
 class User(Base):
@@ -29,7 +33,7 @@ class Todo(Base):
     notes = Column(String, default="")
     completed = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     due_date = Column(DateTime, nullable=True)
     priority = Column(Integer, default=3)
 
@@ -41,7 +45,20 @@ class Todo(Base):
     tags = relationship("Tag", secondary=TodoTag, back_populates="todos")
     pomodoros = relationship("Pomodoro", back_populates="todo", cascade="all, delete-orphan")
     # NEW: checklist steps
-    steps = relationship("TodoStep", back_populates="todo", cascade="all, delete-orphan")
+    steps = relationship("TodoStep", back_populates="todo", cascade="all, delete-orphan",
+                         order_by=lambda: (TodoStep.rank, TodoStep.id))
+
+    # Keyset pagination walks (created_at, id) newest-first within each list filter.
+    __table_args__ = (
+        Index("ix_todos_owner_created", "owner_id", "created_at", "id"),
+        Index("ix_todos_owner_completed_created", "owner_id", "completed", "created_at", "id"),
+        Index("ix_todos_owner_priority_created", "owner_id", "priority", "created_at", "id"),
+        # Covers count/max(updated_at) for conditional GETs.
+        Index("ix_todos_owner_updated", "owner_id", "updated_at"),
+        # Archival candidates (app.archive). Partial, so only completed rows pay for it.
+        Index("ix_todos_completed_updated", "updated_at",
+              sqlite_where=completed.is_(True), postgresql_where=completed.is_(True)),
+    )
 
 class TodoStep(Base):
     __tablename__ = "todo_steps"
@@ -49,10 +66,13 @@ class TodoStep(Base):
     todo_id = Column(Integer, ForeignKey("todos.id"), index=True, nullable=False)
     text = Column(String, nullable=False)
     done = Column(Boolean, default=False)
-    order = Column(Integer, default=0)
+    # Fractional sort key (app.utils.lexorank); a move rewrites only this row.
+    rank = Column(String(RANK_LENGTH), nullable=False, server_default="")
 
     todo = relationship("Todo", back_populates="steps")
 
+    __table_args__ = (Index("ix_todo_steps_todo_rank", "todo_id", "rank"),)
+
 class Tag(Base):
     __tablename__ = "tags"
     id = Column(Integer, primary_key=True, index=True)
@@ -72,3 +92,117 @@ class Pomodoro(Base):
 
     owner = relationship("User", back_populates="pomodoros")
     todo = relationship("Todo", back_populates="pomodoros")
+
+    __table_args__ = (
+        Index("ix_pomodoros_started", "started_at"),  # archival candidates
+        Index("ix_pomodoros_todo_ended", "todo_id", "ended_at"),  # a candidate todo's running pomodoro
+    )
+
+class PomodoroDaily(Base):
+    """Per-user, per-day (UTC, by started_at), per-todo pomodoro totals.
+
+    Maintained incrementally by the pomodoro router (see app.rollups); todo_id
+    0 collects sessions that aren't linked to a todo.
+    """
+    __tablename__ = "pomodoro_daily"
+    owner_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    todo_id = Column(Integer, primary_key=True, default=0)
+    sessions = Column(Integer, nullable=False, default=0)
+    minutes = Column(Integer, nullable=False, default=0)
+
+# Cold storage (see app.archive). Rows keep their hot ids, so an archived todo
+# reads exactly like a live one; there are no FKs back to the hot tables.
+ArchivedTodoTag = Table(
+    "todo_tags_archive",
+    Base.metadata,
+    Column("todo_id", Integer, ForeignKey("todos_archive.id"), primary_key=True),
+    Column("tag_id", Integer, ForeignKey("tags.id"), primary_key=True),
+    Index("ix_todo_tags_archive_tag_todo", "tag_id", "todo_id"),
+)
+
+class ArchivedTodo(Base):
+    """A completed todo moved out of `todos`; same columns plus archived_at."""
+    __tablename__ = "todos_archive"
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    title = Column(String, nullable=False)
+    notes = Column(String, default="")
+    completed = Column(Boolean, default=True)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    due_date = Column(DateTime, nullable=True)
+    priority = Column(Integer, default=3)
+    plan_at = Column(DateTime, nullable=True)
+    estimate_minutes = Column(Integer, default=25)
+    archived_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    tags = relationship("Tag", secondary=ArchivedTodoTag, viewonly=True)
+    steps = relationship("ArchivedTodoStep", viewonly=True,
+                         order_by=lambda: (ArchivedTodoStep.rank, ArchivedTodoStep.id))
+    archived = True  # read by TodoOut
+
+    __table_args__ = (
+        Index("ix_todos_archive_owner_created", "owner_id", "created_at", "id"),
+        Index("ix_todos_archive_owner_archived", "owner_id", "archived_at"),  # calendar.ics Last-Modified
+    )
+
+class ArchivedTodoStep(Base):
+    __tablename__ = "todo_steps_archive"
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    todo_id = Column(Integer, ForeignKey("todos_archive.id"), index=True, nullable=False)
+    text = Column(String, nullable=False)
+    done = Column(Boolean, default=False)
+    rank = Column(String(RANK_LENGTH), nullable=False, server_default="")
+
+class ArchivedPomodoro(Base):
+    __tablename__ = "pomodoros_archive"
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    todo_id = Column(Integer, nullable=True, index=True)  # hot or archived todo
+    started_at = Column(DateTime)
+    ended_at = Column(DateTime, nullable=True)
+    duration_minutes = Column(Integer, default=25)
+    actual_minutes = Column(Integer, default=0)
+    note = Column(String, default="")
+    archived_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_pomodoros_archive_owner_started", "owner_id", "started_at"),
+    )
+
+class ChangeLog(Base):
+    """Append-only record of committed changes, read by GET /sync.
+
+    One row per changed entity per transaction (see app.changes); `seq` is
+    the sync cursor. op is "upsert" or "delete" (a tombstone). Superseded
+    rows and old tombstones are removed by app.sync.compact().
+    """
+    __tablename__ = "change_log"
+    seq = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    entity = Column(String(16), nullable=False)   # "todo" | "step" | "pomodoro"
+    entity_id = Column(Integer, nullable=False)
+    op = Column(String(8), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_change_log_user_seq", "user_id", "seq"),
+        Index("ix_change_log_user_entity", "user_id", "entity", "entity_id", "seq"),
+        # Never reuse a seq, even after the newest row is compacted away.
+        {"sqlite_autoincrement": True},
+    )
+
+class SyncHorizon(Base):
+    """Highest seq of a user's pruned tombstones; older cursors must reset."""
+    __tablename__ = "sync_horizons"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    seq = Column(Integer, nullable=False, default=0)
+
+
+class SchemaMeta(Base):
+    """Key/value facts about the database itself (see app.schema)."""
+    __tablename__ = "schema_meta"
+    key = Column(String(64), primary_key=True)
+    value = Column(String(255), nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,143 @@
+# app/replica.py
+"""Read/write routing: GET endpoints read from a replica when one is configured.
+
+DATABASE_READ_URL (and, in DB_MODE=async, ASYNC_DATABASE_READ_URL, which
+defaults to the async form of it) names a read-only engine; see
+app.database. Routes that only read take `db = Depends(get_read_db)` and
+get a session on it. Writes always go to the primary through get_db.
+
+A replica lags the primary, so a user who has just written reads from the
+primary for READ_YOUR_WRITES_SECONDS after their last write. "Last write"
+is the app.versions stamp that every commit bumps, so this needs no extra
+bookkeeping. It also means read-your-writes holds per host, like the
+ETags. The window must be longer than the replica's worst lag, or a read
+could return older data than its ETag promises.
+
+If the replica can't be reached, the read falls back to the primary and
+the replica is left alone for REPLICA_RETRY_SECONDS. Only connection
+failures trip this. Errors raised by a query once it is running
+propagate as usual.
+
+Locally, a second connection to the same SQLite file opened read-only
+(sqlite:///file:app.db?mode=ro&uri=true) or a copied file can stand in
+for a replica.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+from fastapi import Depends
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from . import database
+from .database import AsyncReadSessionLocal, AsyncSessionLocal, ReadSessionLocal, SessionLocal
+from .metrics import registry
+from .security import CurrentUser, get_current_user, get_current_user_async
+from .versions import versions
+
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+REPLICA_RETRY_SECONDS = float(os.getenv("REPLICA_RETRY_SECONDS", "30"))
+
+log = logging.getLogger(__name__)
+
+_down_until = 0.0  # time.monotonic() before which the replica is skipped
+_down_lock = threading.Lock()
+
+
+def _mark_down(exc: BaseException) -> None:
+    global _down_until
+    with _down_lock:
+        already = _down_until > time.monotonic()
+        _down_until = time.monotonic() + REPLICA_RETRY_SECONDS
+    if not already:
+        log.warning("read replica unavailable, reading from the primary for %ss: %s", REPLICA_RETRY_SECONDS, exc)
+
+
+def _count(reason: Optional[str] = None) -> None:
+    labels = (("target", "primary"), ("reason", reason)) if reason else (("target", "replica"),)
+    registry.inc("db_read_sessions_total", labels)
+
+
+def _route(user_id: int, configured: bool) -> bool:
+    """True to try the replica; counts the reads kept on the primary."""
+    if not configured:
+        return False
+    if _down_until > time.monotonic():
+        _count("replica_down")
+    elif time.time_ns() - versions.get(user_id) < READ_YOUR_WRITES_SECONDS * 1e9:
+        _count("recent_write")
+    else:
+        return True
+    return False
+
+
+def _failed(exc: BaseException) -> None:
+    _mark_down(exc)
+    _count("replica_down")
+
+
+def read_sessionmaker(user_id: int) -> Callable[[], Session]:
+    """The session factory a read for user_id should use, for callers that open
+    sessions themselves (streamed responses). Doesn't check the connection."""
+    if _route(user_id, ReadSessionLocal is not None):
+        _count()
+        return ReadSessionLocal
+    return SessionLocal
+
+
+def open_read_session(user_id: int) -> Session:
+    if _route(user_id, ReadSessionLocal is not None):
+        db = ReadSessionLocal()
+        try:
+            db.connection()  # connect now, so a dead replica costs one attempt, not the request
+            _count()
+            return db
+        except DBAPIError as exc:
+            db.close()
+            _failed(exc)
+    return SessionLocal()
+
+
+def get_read_db(user: CurrentUser = Depends(get_current_user)):
+    db = open_read_session(user.id)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db(user: CurrentUser = Depends(get_current_user_async)):
+    """get_read_db for DB_MODE=async; app.routers.aio swaps it in."""
+    db = None
+    if _route(user.id, AsyncReadSessionLocal is not None):
+        db = AsyncReadSessionLocal()
+        try:
+            await db.connection()
+            _count()
+        except DBAPIError as exc:
+            await db.close()
+            _failed(exc)
+            db = None
+    async with (db if db is not None else AsyncSessionLocal()) as session:
+        yield session
+
+
+def stats() -> dict:
+    return {
+        "configured": ReadSessionLocal is not None,
+        "down_for": max(0.0, round(_down_until - time.monotonic(), 1)),
+    }
+
+
+def _on_replica_error(context) -> None:
+    if context.is_disconnect:
+        _mark_down(context.original_exception)
+
+
+for _engine in (database.read_engine, database.async_read_engine):
+    if _engine is not None:
+        event.listen(getattr(_engine, "sync_engine", _engine), "handle_error", _on_replica_error)
@@ -0,0 +1,49 @@
+# app/responses.py
+"""JSON response helpers.
+
+FastJSONResponse is the app's default response class (orjson when it is
+installed, stdlib json otherwise). For large lists, json_response() skips
+FastAPI's validate -> dict -> encode round trip: a cached TypeAdapter
+validates straight from ORM objects and pydantic-core writes the bytes.
+"""
+from functools import lru_cache
+from typing import Any, Mapping, Optional
+
+from fastapi.responses import JSONResponse, Response
+from pydantic import TypeAdapter
+
+from .utils.timing import timing_serialization
+
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        with timing_serialization():
+            if orjson is None:
+                return super().render(content)
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+class PreSerializedJSON(Response):
+    media_type = "application/json"
+
+
+@lru_cache(maxsize=None)
+def type_adapter(tp: Any) -> TypeAdapter:
+    return TypeAdapter(tp)
+
+
+def dump_json(tp: Any, content: Any) -> bytes:
+    """Validate `content` (ORM objects welcome) as `tp` and encode it, in Rust."""
+    adapter = type_adapter(tp)
+    with timing_serialization():
+        return adapter.dump_json(adapter.validate_python(content, from_attributes=True))
+
+
+def json_response(tp: Any, content: Any, status_code: int = 200,
+                  headers: Optional[Mapping[str, str]] = None) -> Response:
+    return PreSerializedJSON(dump_json(tp, content), status_code=status_code, headers=headers)
@@ -0,0 +1,90 @@
+# app/rollups.py
+"""Incremental maintenance of the pomodoro_daily rollup.
+
+Callers run these inside their own transaction, before commit, so a
+pomodoro row and its rollup contribution land together.
+"""
+from datetime import date
+from typing import Iterable, Optional
+
+from sqlalchemy import Date, cast, delete, func, insert, select, union_all, update
+from sqlalchemy.orm import Session
+
+from .models import ArchivedPomodoro, Pomodoro, PomodoroDaily
+
+_KEY = ("owner_id", "day", "todo_id")
+
+
+def _add(db: Session, owner_id: int, day: date, todo_id: Optional[int], sessions: int = 0, minutes: int = 0) -> None:
+    """Atomically add to one rollup cell, creating it if needed."""
+    values = {"owner_id": owner_id, "day": day, "todo_id": todo_id or 0,
+              "sessions": sessions, "minutes": minutes}
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as upsert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as upsert
+        stmt = upsert(PomodoroDaily).values(**values)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=list(_KEY),
+            set_={
+                "sessions": PomodoroDaily.sessions + stmt.excluded.sessions,
+                "minutes": PomodoroDaily.minutes + stmt.excluded.minutes,
+            },
+        ))
+        return
+    where = [getattr(PomodoroDaily, k) == values[k] for k in _KEY]
+    res = db.execute(
+        update(PomodoroDaily).where(*where).values(
+            sessions=PomodoroDaily.sessions + sessions,
+            minutes=PomodoroDaily.minutes + minutes,
+        )
+    )
+    if not res.rowcount:
+        db.execute(insert(PomodoroDaily).values(**values))
+
+
+def record_start(db: Session, p: Pomodoro) -> None:
+    _add(db, p.owner_id, p.started_at.date(), p.todo_id, sessions=1)
+
+
+def record_stop(db: Session, p: Pomodoro) -> None:
+    if p.actual_minutes:
+        _add(db, p.owner_id, p.started_at.date(), p.todo_id, minutes=p.actual_minutes)
+
+
+def forget_todo(db: Session, owner_id: int, todo_id: int) -> None:
+    """Drop a deleted todo's cells (its pomodoros are deleted with it)."""
+    forget_todos(db, owner_id, [todo_id])
+
+
+def forget_todos(db: Session, owner_id: int, todo_ids: Iterable[int]) -> None:
+    db.execute(delete(PomodoroDaily).where(
+        PomodoroDaily.owner_id == owner_id, PomodoroDaily.todo_id.in_(list(todo_ids))
+    ))
+
+
+def rebuild(db: Session, owner_id: Optional[int] = None) -> None:
+    """Recompute the rollup from the pomodoros tables, archive included (all users or one)."""
+    sessions = union_all(*(
+        select(m.owner_id, m.started_at, m.todo_id, m.actual_minutes)
+        for m in (Pomodoro, ArchivedPomodoro)
+    )).subquery()
+    if db.get_bind().dialect.name == "sqlite":
+        day = func.date(sessions.c.started_at)
+    else:
+        day = cast(sessions.c.started_at, Date)
+    todo = func.coalesce(sessions.c.todo_id, 0)
+    src = select(
+        sessions.c.owner_id, day, todo,
+        func.count(), func.coalesce(func.sum(sessions.c.actual_minutes), 0),
+    ).group_by(sessions.c.owner_id, day, todo)
+    clear = delete(PomodoroDaily)
+    if owner_id is not None:
+        src = src.where(sessions.c.owner_id == owner_id)
+        clear = clear.where(PomodoroDaily.owner_id == owner_id)
+    db.execute(clear)
+    db.execute(insert(PomodoroDaily).from_select(
+        ["owner_id", "day", "todo_id", "sessions", "minutes"], src
+    ))
@@ -0,0 +1,123 @@
+# app/routers/aio.py
+"""DB_MODE=async variants of the todo, pomodoro, sync and auth routers.
+
+Todo/pomodoro/sync routes are mirrored from the sync routers: each endpoint
+that takes a `db` session is re-registered as an `async def` that runs the
+very same function through AsyncSession.run_sync (greenlet, no threadpool
+hop). Routes without `db` (the streaming exports) are left to the sync
+routers. Auth is written natively so bcrypt is awaited rather than
+blocking the event loop.
+"""
+import inspect
+import os
+import secrets
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.routing import APIRoute
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database import get_async_db
+from ..replica import get_async_read_db, get_read_db
+from .. import models, schemas
+from ..security import (
+    CurrentUser, create_access_token, get_current_user, get_current_user_async,
+    get_password_hash_async, verify_and_update_password_async,
+)
+from ..throttle import throttle_login, throttle_seed_demo
+from . import auth, pomodoro, sync, todos
+
+
+def _run_in_session(endpoint):
+    """Wrap a sync `endpoint(db=..., user=..., ...)` as an async endpoint."""
+    sig = inspect.signature(endpoint)
+    params = []
+    for p in sig.parameters.values():
+        if p.name == "db":
+            reads = getattr(p.default, "dependency", None) is get_read_db
+            p = p.replace(default=Depends(get_async_read_db if reads else get_async_db), annotation=AsyncSession)
+        elif p.default is not inspect.Parameter.empty and getattr(p.default, "dependency", None) is get_current_user:
+            p = p.replace(default=Depends(get_current_user_async))
+        params.append(p)
+
+    async def wrapper(**kwargs):
+        db: AsyncSession = kwargs.pop("db")
+        return await db.run_sync(lambda session: endpoint(db=session, **kwargs))
+
+    wrapper.__name__ = endpoint.__name__
+    wrapper.__doc__ = endpoint.__doc__
+    wrapper.__signature__ = sig.replace(parameters=params)
+    return wrapper
+
+
+def mirror_router(sync_router: APIRouter) -> APIRouter:
+    router = APIRouter(prefix=sync_router.prefix, tags=sync_router.tags)
+    for route in sync_router.routes:
+        if not isinstance(route, APIRoute) or "db" not in inspect.signature(route.endpoint).parameters:
+            continue
+        router.add_api_route(
+            route.path[len(sync_router.prefix):],
+            _run_in_session(route.endpoint),
+            methods=list(route.methods),
+            response_model=route.response_model,
+            status_code=route.status_code,
+            response_class=route.response_class,
+            include_in_schema=route.include_in_schema,
+            name=route.name,
+            summary=route.summary,
+            description=route.description,
+        )
+    return router
+
+
+todos_router = mirror_router(todos.router)
+pomodoro_router = mirror_router(pomodoro.router)
+sync_router = mirror_router(sync.router)
+
+# ---- auth ----
+auth_router = APIRouter(prefix="/auth", tags=["auth"])
+
+async def _email_taken(db: AsyncSession, email: str) -> bool:
+    return (await db.scalar(select(models.User.id).where(models.User.email == email))) is not None
+
+@auth_router.get("/me", response_model=schemas.UserOut)
+async def me(request: Request, response: Response, user: CurrentUser = Depends(get_current_user_async)):
+    return auth.me(request, response, user)
+
+@auth_router.post("/register", response_model=schemas.UserOut, status_code=status.HTTP_201_CREATED)
+async def register(user_in: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
+    if await _email_taken(db, user_in.email):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
+    user = models.User(email=user_in.email, hashed_password=await get_password_hash_async(user_in.password))
+    db.add(user); await db.commit(); await db.refresh(user)
+    return user
+
+@auth_router.post("/login", response_model=schemas.Token, dependencies=[Depends(throttle_login)])
+async def login(form: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    user = await db.scalar(select(models.User).where(models.User.email == form.username))
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    ok, new_hash = await verify_and_update_password_async(form.password, user.hashed_password)
+    if not ok:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
+    return {"access_token": create_access_token({"sub": user.email}), "token_type": "bearer"}
+
+@auth_router.post("/seed_demo", dependencies=[Depends(throttle_seed_demo)])
+async def seed_demo(db: AsyncSession = Depends(get_async_db)):
+    if os.getenv("DEMO_ENABLED", "true").lower() not in {"1","true","yes"}:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Demo seeding disabled")
+    for _ in range(5):
+        email = f"demo+{secrets.token_hex(3)}@mail.com"
+        if not await _email_taken(db, email):
+            break
+    else:
+        raise HTTPException(status_code=500, detail="Could not generate demo user")
+    password = "secret123"
+    user = models.User(email=email, hashed_password=await get_password_hash_async(password))
+    db.add(user); await db.commit()
+    token = create_access_token({"sub": email})
+    return {"email": email, "password": password, "access_token": token, "token_type": "bearer"}
@@ -1,48 +1,69 @@
 # app/routers/auth.py
 import os, secrets
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from ..database import get_db
-from .. import models, schemas
-from ..security import verify_password, get_password_hash, create_access_token
-from ..security import get_current_user
+from .. import models, schemas, versions
+from ..throttle import throttle_login, throttle_seed_demo
+from ..security import verify_and_update_password_async, get_password_hash_async, create_access_token
+from ..security import CurrentUser, get_current_user
+from ..utils.http import is_not_modified, private_cache_headers
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 @router.get("/me", response_model=schemas.UserOut)
-def me(user = Depends(get_current_user)):  # 200 JSON
+def me(request: Request, response: Response, user: CurrentUser = Depends(get_current_user)):  # 200 JSON
+    headers = private_cache_headers(versions.etag(request, "me", user.id))
+    if is_not_modified(request, headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
     return user
 
-@router.post("/register", response_model=schemas.UserOut, status_code=status.HTTP_201_CREATED)
-def register(user_in: schemas.UserCreate, db: Session = Depends(get_db)):
-    existing = db.query(models.User).filter(models.User.email == user_in.email).first()
-    if existing:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
-    user = models.User(email=user_in.email, hashed_password=get_password_hash(user_in.password))
+# The endpoints that hash are async: the short queries hop to the threadpool,
+# and bcrypt is awaited on the hashing pool (app.security) without holding a
+# threadpool thread while it runs.
+def _user_by_email(db: Session, email: str):
+    return db.query(models.User).filter(models.User.email == email).first()
+
+def _save(db: Session, user: models.User) -> models.User:
     db.add(user); db.commit(); db.refresh(user)
     return user
 
-@router.post("/login", response_model=schemas.Token)
-def login(form: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(models.User).filter(models.User.email == form.username).first()
-    if not user or not verify_password(form.password, user.hashed_password):
+@router.post("/register", response_model=schemas.UserOut, status_code=status.HTTP_201_CREATED)
+async def register(user_in: schemas.UserCreate, db: Session = Depends(get_db)):
+    if await run_in_threadpool(_user_by_email, db, user_in.email):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
+    user = models.User(email=user_in.email, hashed_password=await get_password_hash_async(user_in.password))
+    return await run_in_threadpool(_save, db, user)
+
+@router.post("/login", response_model=schemas.Token, dependencies=[Depends(throttle_login)])
+async def login(form: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    user = await run_in_threadpool(_user_by_email, db, form.username)
+    if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
-    access_token = create_access_token({"sub": user.email})
+    ok, new_hash = await verify_and_update_password_async(form.password, user.hashed_password)
+    if not ok:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    if new_hash:  # BCRYPT_ROUNDS changed since this hash was made
+        user.hashed_password = new_hash
+        await run_in_threadpool(db.commit)
+    access_token = create_access_token({"sub": form.username})
     return {"access_token": access_token, "token_type": "bearer"}
 
-@router.post("/seed_demo")
-def seed_demo(db: Session = Depends(get_db)):
+@router.post("/seed_demo", dependencies=[Depends(throttle_seed_demo)])
+async def seed_demo(db: Session = Depends(get_db)):
     if os.getenv("DEMO_ENABLED", "true").lower() not in {"1","true","yes"}:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Demo seeding disabled")
     for _ in range(5):
         email = f"demo+{secrets.token_hex(3)}@mail.com"
-        if not db.query(models.User).filter(models.User.email == email).first():
+        if not await run_in_threadpool(_user_by_email, db, email):
             break
     else:
         raise HTTPException(status_code=500, detail="Could not generate demo user")
     password = "secret123"
-    user = models.User(email=email, hashed_password=get_password_hash(password))
-    db.add(user); db.commit(); db.refresh(user)
-    token = create_access_token({"sub": user.email})
+    user = models.User(email=email, hashed_password=await get_password_hash_async(password))
+    await run_in_threadpool(_save, db, user)
+    token = create_access_token({"sub": email})
     return {"email": email, "password": password, "access_token": token, "token_type": "bearer"}
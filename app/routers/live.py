@@ -0,0 +1,113 @@
+# app/routers/live.py
+"""Push channel: WebSocket /live/ws with an SSE fallback at /live/events.
+
+Both authenticate with the usual JWT. Browsers cannot set headers on
+either transport, so `?token=` is accepted alongside `Authorization`.
+The first message is a hello with the current data version and any
+running pomodoros; change events follow (see app.changes), plus a ping
+every LIVE_PING_SECONDS. The connection is closed when the token expires,
+and the client reconnects with a fresh one.
+"""
+import asyncio
+import json
+import os
+import time
+from typing import AsyncIterator, Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from ..database import SessionLocal
+from ..live import Subscription, hub
+from ..models import Pomodoro
+from ..security import CurrentUser, authenticate_token
+from ..versions import versions
+from .pomodoro import timer_state
+
+LIVE_PING_SECONDS = float(os.getenv("LIVE_PING_SECONDS", "25"))
+
+router = APIRouter(prefix="/live", tags=["live"])
+
+
+def _bearer(authorization: Optional[str]) -> Optional[str]:
+    scheme, _, token = (authorization or "").partition(" ")
+    return token if scheme.lower() == "bearer" else None
+
+
+def _hello(user: CurrentUser) -> str:
+    with SessionLocal() as db:
+        running = db.query(Pomodoro).filter(Pomodoro.owner_id == user.id, Pomodoro.ended_at.is_(None)).all()
+        timers = [{"id": p.id, **timer_state(p)} for p in running]
+    return json.dumps({"type": "hello", "v": versions.get(user.id), "pomodoros": timers}, separators=(",", ":"))
+
+
+async def _frames(sub: Subscription, exp: Optional[float]) -> AsyncIterator[Optional[str]]:
+    """Yield encoded events as they arrive, None as a keep-alive; stop at `exp`."""
+    while True:
+        timeout = LIVE_PING_SECONDS
+        if exp is not None:
+            timeout = min(timeout, exp - time.time())
+            if timeout <= 0:
+                return
+        try:
+            frames = await asyncio.wait_for(sub.get(), timeout)
+        except asyncio.TimeoutError:
+            yield None
+            continue
+        for frame in frames:
+            yield frame
+
+
+@router.websocket("/ws")
+async def live_ws(websocket: WebSocket, token: Optional[str] = Query(None)):
+    try:
+        user, exp = await run_in_threadpool(
+            authenticate_token, token or _bearer(websocket.headers.get("authorization"))
+        )
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Invalid or expired token")
+        return
+    await websocket.accept()
+
+    async def pump(sub: Subscription) -> None:
+        await websocket.send_text(await run_in_threadpool(_hello, user))
+        async for frame in _frames(sub, exp):
+            await websocket.send_text(frame if frame is not None else '{"type":"ping"}')
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Token expired")
+
+    async def drain_client() -> None:
+        # Nothing is expected from the client; reading is how we notice it left.
+        while True:
+            await websocket.receive_text()
+
+    async with hub.subscribe(user.id) as sub:
+        tasks = {asyncio.create_task(pump(sub)), asyncio.create_task(drain_client())}
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        for task in done:
+            exc = task.exception()
+            if exc is not None and not isinstance(exc, WebSocketDisconnect):
+                raise exc
+
+
+@router.get("/events", include_in_schema=False)
+async def live_events(request: Request, token: Optional[str] = Query(None)):
+    user, exp = await run_in_threadpool(
+        authenticate_token, token or _bearer(request.headers.get("authorization"))
+    )
+
+    async def stream() -> AsyncIterator[str]:
+        async with hub.subscribe(user.id) as sub:
+            yield "retry: 3000\n"
+            yield f"data: {await run_in_threadpool(_hello, user)}\n\n"
+            async for frame in _frames(sub, exp):
+                # Starlette cancels this generator when the client disconnects.
+                yield f"data: {frame}\n\n" if frame is not None else ": ping\n\n"
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,18 +1,35 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
+from .. import changes, rollups, versions
 from ..database import get_db
-from ..models import Pomodoro, Todo, User
+from ..models import Pomodoro, PomodoroDaily, Todo
+from ..replica import get_read_db
 from ..schemas import PomodoroStart, PomodoroStop, PomodoroOut
-from ..security import get_current_user
+from ..security import CurrentUser, get_current_user
+from ..utils.http import is_not_modified, private_cache_headers
 
 router = APIRouter(prefix="/pomodoro", tags=["pomodoro"])
 
+def timer_state(p: Pomodoro, now: Optional[datetime] = None) -> dict:
+    """Compact timer fields for live events, so other tabs can run the countdown."""
+    now = now or datetime.utcnow()
+    ends_at = p.started_at + timedelta(minutes=p.duration_minutes)
+    return {
+        "todo_id": p.todo_id,
+        "started_at": p.started_at.isoformat(),
+        "ends_at": ends_at.isoformat(),
+        "ended_at": p.ended_at.isoformat() if p.ended_at else None,
+        "remaining_seconds": 0 if p.ended_at else max(0, int((ends_at - now).total_seconds())),
+    }
+
 @router.post("/start", response_model=PomodoroOut)
 def start_pomodoro(
     payload: PomodoroStart,
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    user: CurrentUser = Depends(get_current_user),
 ):
     if payload.todo_id:
         todo = db.query(Todo).filter(Todo.id == payload.todo_id, Todo.owner_id == user.id).first()
@@ -26,6 +43,9 @@ def start_pomodoro(
         note=payload.note,
     )
     db.add(p)
+    rollups.record_start(db, p)
+    db.flush()
+    changes.record(db, user.id, "pomodoro", p.id, "start", timer_state(p))
     db.commit()
     db.refresh(p)
     return p
@@ -34,7 +54,7 @@ def start_pomodoro(
 def stop_pomodoro(
     payload: PomodoroStop,
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    user: CurrentUser = Depends(get_current_user),
 ):
     p = db.query(Pomodoro).filter(Pomodoro.id == payload.pomodoro_id, Pomodoro.owner_id == user.id).first()
     if not p:
@@ -42,18 +62,64 @@ def stop_pomodoro(
     if not p.ended_at:
         p.ended_at = datetime.utcnow()
         p.actual_minutes = int((p.ended_at - p.started_at).total_seconds() // 60)
+        rollups.record_stop(db, p)
+        changes.record(db, user.id, "pomodoro", p.id, "stop",
+                       {**timer_state(p), "actual_minutes": p.actual_minutes})
         db.commit()
         db.refresh(p)
     return p
 
 @router.get("/summary")
-def pomodoro_summary(db: Session = Depends(get_db), user: User = Depends(get_current_user), days: int = Query(7, ge=1, le=90)):
-    since = datetime.utcnow() - timedelta(days=days)
-    sessions = db.query(Pomodoro).filter(Pomodoro.owner_id == user.id, Pomodoro.started_at >= since).all()
-    total_minutes = sum(s.actual_minutes or 0 for s in sessions)
+def pomodoro_summary(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
+    user: CurrentUser = Depends(get_current_user),
+    days: int = Query(7, ge=1, le=366),
+    group_by: Optional[Literal["day", "week", "todo"]] = Query(None),
+):
+    """Totals over the last `days` UTC calendar days (today included).
+
+    Answered from the pomodoro_daily rollup, so cost depends on the number
+    of active days, not sessions. `by_todo` is always present; `group_by=day`
+    adds `by_day` and `group_by=week` adds `by_week` (ISO weeks).
+    """
+    today = datetime.utcnow().date()
+    # The window slides at midnight, so the date is part of the ETag too.
+    headers = private_cache_headers(versions.etag(request, "pomodoro-summary", user.id, today))
+    if is_not_modified(request, headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    since = today - timedelta(days=days - 1)
+    window = (PomodoroDaily.owner_id == user.id, PomodoroDaily.day >= since)
+
+    sessions = total_minutes = 0
     by_todo = {}
-    for s in sessions:
-        if s.todo_id:
-            by_todo.setdefault(s.todo_id, 0)
-            by_todo[s.todo_id] += (s.actual_minutes or 0)
-    return {"sessions": len(sessions), "total_minutes": int(total_minutes), "by_todo": {str(k): int(v) for k, v in by_todo.items()}}
+    for todo_id, n, minutes in (
+        db.query(PomodoroDaily.todo_id, func.sum(PomodoroDaily.sessions), func.sum(PomodoroDaily.minutes))
+        .filter(*window)
+        .group_by(PomodoroDaily.todo_id)
+    ):
+        sessions += n or 0
+        total_minutes += minutes or 0
+        if todo_id:
+            by_todo[str(todo_id)] = int(minutes or 0)
+    out = {"sessions": int(sessions), "total_minutes": int(total_minutes), "by_todo": by_todo}
+
+    if group_by in ("day", "week"):
+        by_day = (
+            db.query(PomodoroDaily.day, func.sum(PomodoroDaily.minutes))
+            .filter(*window)
+            .group_by(PomodoroDaily.day)
+            .order_by(PomodoroDaily.day)
+        )
+        if group_by == "day":
+            out["by_day"] = {d.isoformat(): int(m or 0) for d, m in by_day}
+        else:
+            by_week = {}
+            for d, m in by_day:
+                year, week, _ = d.isocalendar()
+                key = f"{year}-W{week:02d}"
+                by_week[key] = by_week.get(key, 0) + int(m or 0)
+            out["by_week"] = by_week
+    return out
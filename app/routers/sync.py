@@ -0,0 +1,87 @@
+# app/routers/sync.py
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session, selectinload
+
+from .. import models, schemas, steps, sync
+from ..replica import get_read_db
+from ..security import CurrentUser, get_current_user
+
+router = APIRouter(prefix="/sync", tags=["sync"])
+
+_ENTITY = {"todo": "todos", "step": "steps", "pomodoro": "pomodoros"}
+
+
+def _todos(db: Session, owner_id: int, ids=None):
+    q = db.query(models.Todo).options(selectinload(models.Todo.tags), selectinload(models.Todo.steps))
+    q = q.filter(models.Todo.owner_id == owner_id)
+    return q if ids is None else q.filter(models.Todo.id.in_(ids))
+
+
+def _steps(db: Session, owner_id: int, ids):
+    return (
+        db.query(models.TodoStep)
+        .join(models.Todo, models.Todo.id == models.TodoStep.todo_id)
+        .filter(models.Todo.owner_id == owner_id, models.TodoStep.id.in_(ids))
+    )
+
+
+def _pomodoros(db: Session, owner_id: int, ids=None):
+    q = db.query(models.Pomodoro).filter(models.Pomodoro.owner_id == owner_id)
+    return q if ids is None else q.filter(models.Pomodoro.id.in_(ids))
+
+
+@router.get("", response_model=schemas.SyncResponse)
+def sync_changes(
+    since: Optional[int] = Query(None, ge=0, description="`cursor` from the previous response"),
+    limit: int = Query(1000, ge=1, le=5000),
+    db: Session = Depends(get_read_db),
+    user: CurrentUser = Depends(get_current_user),
+):
+    """Delta sync for offline clients.
+
+    Returns the current state of every todo, step and pomodoro changed after
+    `since`, plus ids deleted since then, and the next cursor. Without
+    `since`, or when it predates compacted tombstones, the response is a
+    full snapshot with `reset: true`. Steps also arrive inside their todo,
+    and deleting a todo deletes its steps and pomodoros without separate
+    tombstones.
+    """
+    if since is None or since < sync.horizon_of(db, user.id):
+        cursor = sync.cursor_of(db, user.id)  # read first: later changes get re-sent, never lost
+        return {
+            "cursor": cursor,
+            "reset": True,
+            "todos": _todos(db, user.id).all(),
+            "pomodoros": _pomodoros(db, user.id).all(),
+        }
+
+    rows, has_more = sync.changes_since(db, user.id, since, limit)
+    upserts = {"todo": [], "step": [], "pomodoro": []}
+    deleted = {"todos": [], "steps": [], "pomodoros": []}
+    for _, entity, entity_id, op in rows:
+        if op == "delete":
+            deleted[_ENTITY[entity]].append(entity_id)
+        else:
+            upserts[entity].append(entity_id)
+
+    out = {
+        "cursor": rows[-1].seq if rows else since,
+        "has_more": has_more,
+        "todos": _todos(db, user.id, upserts["todo"]).all() if upserts["todo"] else [],
+        "steps": _steps(db, user.id, upserts["step"]).all() if upserts["step"] else [],
+        "pomodoros": _pomodoros(db, user.id, upserts["pomodoro"]).all() if upserts["pomodoro"] else [],
+        "deleted": deleted,
+    }
+    # An upsert whose row is gone went with its parent todo (cascade); say so.
+    for entity, key in _ENTITY.items():
+        missing = set(upserts[entity]) - {o.id for o in out[key]}
+        deleted[key].extend(sorted(missing))
+    if out["steps"]:
+        pos = steps.positions(db, [s.id for s in out["steps"]])
+        out["steps"] = [
+            {"id": s.id, "todo_id": s.todo_id, "text": s.text, "done": s.done, "rank": s.rank, "order": pos[s.id]}
+            for s in out["steps"]
+        ]
+    return out
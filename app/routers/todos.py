@@ -1,37 +1,144 @@
 # app/routers/todos.py
-from typing import Literal
-from fastapi import APIRouter, Depends, HTTPException, Query, status, Response
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse, StreamingResponse
-from sqlalchemy.orm import Session
-import io, csv
+from datetime import datetime, timedelta
+from pydantic import ValidationError
+from sqlalchemy import and_, delete, func, or_, select, update
+from sqlalchemy.orm import Session, selectinload
+import io, csv, hashlib, heapq, json
+import anyio
 
 from ..database import get_db
-from .. import models, schemas
-from ..security import get_current_user
+from .. import archive, changes, importer, models, rollups, scheduler, schemas, search, steps, tags, versions
+from ..replica import get_read_db, read_sessionmaker
+from ..responses import json_response
+from ..security import CurrentUser, get_current_user
+from ..utils.calendar import ICS_FORMAT_VERSION, iter_ics
+from ..utils.http import accepts_gzip, gzip_stream, http_date, is_not_modified, private_cache_headers, settled
+from ..utils.pagination import decode_cursor, encode_cursor
 
 router = APIRouter(prefix="/todos", tags=["todos"])
 
+DEFAULT_PAGE_SIZE = 100
+BULK_CHUNK = 500  # ids per IN (...) list
+EXPORT_BATCH_SIZE = 1000
+SCHEDULE_MAX_DAYS = 92
+IMPORT_TYPES = {"text/csv": "csv", "text/calendar": "ics"}
+EXPORT_COLUMNS = [
+    "id", "title", "notes", "completed", "priority", "due_date", "plan_at",
+    "estimate_minutes", "created_at", "updated_at", "tags", "steps",
+]
+
+def todo_query(db: Session, owner_id: int):
+    """Base query for todos that get serialized as TodoOut.
+
+    tags/steps are batch-loaded with one SELECT ... IN each, so a page costs
+    three queries no matter how many todos it holds.
+    """
+    return (
+        db.query(models.Todo)
+        .options(selectinload(models.Todo.tags), selectinload(models.Todo.steps))
+        .filter(models.Todo.owner_id == owner_id)
+    )
+
+def archived_query(db: Session, owner_id: int):
+    """todo_query over the archive (app.archive); rows serialize the same way."""
+    return (
+        db.query(models.ArchivedTodo)
+        .options(selectinload(models.ArchivedTodo.tags), selectinload(models.ArchivedTodo.steps))
+        .filter(models.ArchivedTodo.owner_id == owner_id)
+    )
+
+def _load_todo(db: Session, owner_id: int, todo_id: int) -> models.Todo:
+    # populate_existing: tag links may have been rewritten with Core statements.
+    return todo_query(db, owner_id).filter(models.Todo.id == todo_id).populate_existing().one()
+
+def _tagged_ids(db: Session, names: List[str], mode: str, links=models.TodoTag):
+    """Subquery of todo ids carrying any/all of the tag names (None = no match)."""
+    ids = tags.lookup_ids(db, tags.normalize(names))
+    if not ids or (mode == "all" and len(ids) < len(tags.normalize(names))):
+        return None
+    q = select(links.c.todo_id).where(links.c.tag_id.in_(list(ids.values())))
+    if mode == "all":
+        q = q.group_by(links.c.todo_id).having(
+            func.count(links.c.tag_id) == len(ids)
+        )
+    return q
+
+def _newest_first(todo):
+    return todo.created_at, todo.id
+
 # --------- LIST / CREATE ---------
 @router.get("/", response_model=list[schemas.TodoOut])
 def list_todos(
+    request: Request,
     filter: Literal["all", "done", "pending", "urgent"] = Query("all"),
-    db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user),
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    tag: Optional[List[str]] = Query(None, description="Repeatable; see tag_mode"),
+    tag_mode: Literal["any", "all"] = Query("any"),
+    include_archived: bool = Query(False, description="Also list archived (completed long ago) todos"),
+    db: Session = Depends(get_read_db),
+    user: CurrentUser = Depends(get_current_user),
 ):
-    q = db.query(models.Todo).filter(models.Todo.owner_id == user.id)
-    if filter == "done":
-        q = q.filter(models.Todo.completed.is_(True))
-    elif filter == "pending":
-        q = q.filter(models.Todo.completed.is_(False))
-    elif filter == "urgent":
-        q = q.filter(models.Todo.priority == 1)
-    return q.order_by(models.Todo.created_at.desc()).all()
+    """Newest first. Without `limit`/`cursor` the whole list is returned (legacy);
+    otherwise a page is returned and `X-Next-Cursor` is set while more remain.
+
+    Carries an ETag from the user's data version; a matching If-None-Match
+    is answered 304 before any query runs."""
+    headers = private_cache_headers(versions.etag(request, "todos", user.id))
+    if is_not_modified(request, headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    if cursor:
+        try:
+            created_at, last_id = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    sources = [(todo_query(db, user.id), models.Todo, models.TodoTag)]
+    if include_archived and filter != "pending":  # everything archived is completed
+        sources.append((archived_query(db, user.id), models.ArchivedTodo, models.ArchivedTodoTag))
+
+    # The archive is paged with the same keyset and merged in; ids are
+    # unique across both tables.
+    queries = []
+    for q, model, links in sources:
+        if filter == "done":
+            q = q.filter(model.completed.is_(True))
+        elif filter == "pending":
+            q = q.filter(model.completed.is_(False))
+        elif filter == "urgent":
+            q = q.filter(model.priority == 1)
+        if tag:
+            tagged = _tagged_ids(db, tag, tag_mode, links)
+            if tagged is None:
+                return json_response(list[schemas.TodoOut], [], headers=headers)
+            q = q.filter(model.id.in_(tagged))
+        if cursor:
+            q = q.filter(or_(
+                model.created_at < created_at,
+                and_(model.created_at == created_at, model.id < last_id),
+            ))
+        queries.append(q.order_by(model.created_at.desc(), model.id.desc()))
+    if limit is None and cursor is None:
+        rows = [q.all() for q in queries]
+        return json_response(list[schemas.TodoOut], list(heapq.merge(*rows, key=_newest_first, reverse=True)),
+                             headers=headers)
+
+    limit = limit or DEFAULT_PAGE_SIZE
+    pages = [q.limit(limit + 1).all() for q in queries]
+    page = pages[0] if len(pages) == 1 else list(heapq.merge(*pages, key=_newest_first, reverse=True))[:limit + 1]
+    if len(page) > limit:
+        page = page[:limit]
+        headers["X-Next-Cursor"] = encode_cursor(page[-1].created_at, page[-1].id)
+    return json_response(list[schemas.TodoOut], page, headers=headers)
 
 @router.post("/", response_model=schemas.TodoOut, status_code=status.HTTP_201_CREATED)
 def create_todo(
     body: schemas.TodoCreate,
     db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user),
+    user: CurrentUser = Depends(get_current_user),
 ):
     todo = models.Todo(
         title=body.title,
@@ -44,9 +151,258 @@ def create_todo(
         owner_id=user.id,
     )
     db.add(todo)
+    db.flush()
+    if body.tags:
+        tags.replace_links(db, {todo.id: body.tags})
+    changes.record(db, user.id, "todo", todo.id, "create")
     db.commit()
-    db.refresh(todo)
-    return todo
+    return _load_todo(db, user.id, todo.id)
+
+@router.get("/search", response_model=list[schemas.TodoOut])
+def search_todos(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=10_000),
+    db: Session = Depends(get_read_db),
+    user: CurrentUser = Depends(get_current_user),
+):
+    """Ranked full-text search over title, notes and step text (prefix match per word).
+
+    Covers live todos only; the archive isn't indexed."""
+    headers = private_cache_headers(versions.etag(request, "search", user.id))
+    if is_not_modified(request, headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    ids = search.search_todo_ids(db, user.id, q, limit, offset)
+    found = {t.id: t for t in todo_query(db, user.id).filter(models.Todo.id.in_(ids))} if ids else {}
+    return json_response(list[schemas.TodoOut], [found[i] for i in ids if i in found], headers=headers)
+
+@router.get("/tags", response_model=list[schemas.TagCount])
+def tag_counts(
+    request: Request,
+    response: Response,
+    include_archived: bool = Query(False),
+    db: Session = Depends(get_read_db),
+    user: CurrentUser = Depends(get_current_user),
+):
+    """The user's tags with how many of their todos carry each, most used first."""
+    headers = private_cache_headers(versions.etag(request, "tags", user.id))
+    if is_not_modified(request, headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    sources = [(models.Todo, models.TodoTag)]
+    if include_archived:
+        sources.append((models.ArchivedTodo, models.ArchivedTodoTag))
+    counts: dict[tuple[int, str], int] = {}
+    for model, links in sources:
+        for r in db.execute(
+            select(models.Tag.id, models.Tag.name, func.count(links.c.todo_id))
+            .join(links, links.c.tag_id == models.Tag.id)
+            .join(model, model.id == links.c.todo_id)
+            .where(model.owner_id == user.id)
+            .group_by(models.Tag.id, models.Tag.name)
+        ):
+            counts[r[0], r[1]] = counts.get((r[0], r[1]), 0) + r[2]
+    ranked = sorted(counts.items(), key=lambda kv: (-kv[1], kv[0][1]))
+    return [{"id": tag_id, "name": name, "count": n} for (tag_id, name), n in ranked]
+
+# --------- BULK ---------
+def _chunks(seq: list, size: int = BULK_CHUNK):
+    for i in range(0, len(seq), size):
+        yield seq[i:i + size]
+
+def _owned_ids(db: Session, owner_id: int, ids: list[int]) -> set[int]:
+    owned: set[int] = set()
+    for chunk in _chunks(ids):
+        owned.update(db.scalars(select(models.Todo.id).where(
+            models.Todo.owner_id == owner_id, models.Todo.id.in_(chunk)
+        )))
+    return owned
+
+def _delete_todos(db: Session, owner_id: int, ids: list[int]) -> None:
+    """Set-based delete, including what the ORM cascade would have removed."""
+    for chunk in _chunks(ids):
+        db.execute(delete(models.TodoStep).where(models.TodoStep.todo_id.in_(chunk)))
+        db.execute(delete(models.TodoTag).where(models.TodoTag.c.todo_id.in_(chunk)))
+        db.execute(delete(models.Pomodoro).where(models.Pomodoro.todo_id.in_(chunk)))
+        archive.forget_todos(db, chunk)
+        rollups.forget_todos(db, owner_id, chunk)
+        db.execute(
+            delete(models.Todo)
+            .where(models.Todo.owner_id == owner_id, models.Todo.id.in_(chunk))
+            .execution_options(synchronize_session=False)
+        )
+
+@router.post("/bulk", response_model=schemas.BulkResponse)
+def bulk_todos(
+    body: schemas.BulkRequest,
+    db: Session = Depends(get_db),
+    user: CurrentUser = Depends(get_current_user),
+):
+    """Apply a batch of create/update/delete ops in one transaction.
+
+    Items are validated individually (a bad item is reported, not fatal);
+    valid ones are applied as one INSERT, one executemany UPDATE and one
+    DELETE per table, plus one tag upsert and link rewrite for the batch.
+    """
+    results: list[schemas.BulkResult | None] = [None] * len(body.ops)
+    creates: list[tuple[int, schemas.TodoCreate]] = []
+    updates: list[tuple[int, int, schemas.TodoUpdate]] = []
+    deletes: list[tuple[int, int]] = []
+    for i, item in enumerate(body.ops):
+        try:
+            if item.op == "create":
+                creates.append((i, schemas.TodoCreate.model_validate(item.data)))
+            elif item.id is None:
+                results[i] = schemas.BulkResult(index=i, op=item.op, ok=False, error="id is required")
+            elif item.op == "update":
+                updates.append((i, item.id, schemas.TodoUpdate.model_validate(item.data)))
+            else:
+                deletes.append((i, item.id))
+        except ValidationError as exc:
+            results[i] = schemas.BulkResult(index=i, op=item.op, ok=False, error=str(exc.errors(include_url=False)))
+
+    owned = _owned_ids(db, user.id, [tid for _, tid, _ in updates] + [tid for _, tid in deletes])
+    now = datetime.utcnow()
+    tag_links: dict[int, list[str]] = {}
+
+    if creates:
+        rows = [{
+            "owner_id": user.id, "title": c.title, "notes": c.notes, "completed": False,
+            "priority": c.priority, "due_date": c.due_date, "plan_at": c.plan_at,
+            "estimate_minutes": c.estimate_minutes, "created_at": now, "updated_at": now,
+        } for _, c in creates]
+        new_ids = importer.insert_todos(db, rows)
+        for (i, c), new_id in zip(creates, new_ids):
+            results[i] = schemas.BulkResult(index=i, op="create", ok=True, id=new_id)
+            if c.tags:
+                tag_links[new_id] = c.tags
+
+    edits = []
+    for i, tid, u in updates:
+        if tid not in owned:
+            results[i] = schemas.BulkResult(index=i, op="update", ok=False, id=tid, error="Todo not found")
+            continue
+        values = u.model_dump(exclude_unset=True, exclude={"tags"})
+        values = {k: v for k, v in values.items() if v is not None}
+        edits.append({"id": tid, "updated_at": now, **values})
+        if u.tags is not None:
+            tag_links[tid] = u.tags
+        results[i] = schemas.BulkResult(index=i, op="update", ok=True, id=tid)
+    if edits:
+        db.execute(update(models.Todo), edits)
+    tags.replace_links(db, tag_links)
+
+    doomed = []
+    for i, tid in deletes:
+        ok = tid in owned
+        results[i] = schemas.BulkResult(index=i, op="delete", ok=ok, id=tid, error=None if ok else "Todo not found")
+        if ok:
+            doomed.append(tid)
+    if doomed:
+        _delete_todos(db, user.id, sorted(set(doomed)))
+
+    for r in results:
+        if r.ok:
+            changes.record(db, user.id, "todo", r.id, r.op)
+    db.commit()
+    return {"results": results}
+
+# --------- IMPORT ---------
+@router.post("/import", response_model=schemas.ImportResult)
+async def import_todos(
+    request: Request,
+    format: Optional[Literal["csv", "ics"]] = Query(None, description="Defaults from Content-Type"),
+    user: CurrentUser = Depends(get_current_user),
+):
+    """Create todos from a CSV (the export.csv columns; only title is
+    required) or ICS (VTODO/VEVENT) request body.
+
+    The body is parsed while it streams in and committed in batches (see
+    app.importer). Bad rows are reported by number and skipped.
+    """
+    fmt = format or IMPORT_TYPES.get(request.headers.get("content-type", "").split(";")[0].strip().lower())
+    if fmt is None:
+        raise HTTPException(status_code=415, detail="Send text/csv or text/calendar, or pass ?format=")
+    body = request.stream()
+
+    def chunks():  # runs on the worker thread, pulling from the event loop
+        while True:
+            try:
+                yield anyio.from_thread.run(body.__anext__)
+            except StopAsyncIteration:
+                return
+
+    try:
+        result = await run_in_threadpool(importer.import_todos, user.id, fmt, chunks())
+    except importer.ImportFormatError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    return json_response(schemas.ImportResult, result)
+
+# --------- SCHEDULE ---------
+@router.post("/schedule", response_model=schemas.ScheduleResponse)
+def schedule_todos(
+    body: schemas.ScheduleRequest,
+    db: Session = Depends(get_db),
+    user: CurrentUser = Depends(get_current_user),
+):
+    """Place pending todos into free working time within [start, end).
+
+    Todos with a plan_at are fixed commitments and block their estimate;
+    with `replan`, those planned inside the window are placed again. Logged
+    and running pomodoros block their time too. Unplanned todos go most
+    urgent first (priority, due date, age) into the earliest slot that fits
+    (see app.scheduler). With `apply`, the placements are saved as plan_at
+    in one batch.
+    """
+    start = body.start or datetime.utcnow().replace(second=0, microsecond=0)
+    end = body.end or start + timedelta(days=7)
+    if not start < end <= start + timedelta(days=SCHEDULE_MAX_DAYS):
+        raise HTTPException(status_code=422, detail=f"end must be after start and within {SCHEDULE_MAX_DAYS} days")
+
+    longest = timedelta(minutes=600)  # estimate_minutes / duration_minutes upper bounds
+    todos = db.execute(
+        select(models.Todo.id, models.Todo.priority, models.Todo.due_date, models.Todo.plan_at,
+               models.Todo.estimate_minutes, models.Todo.created_at)
+        .where(models.Todo.owner_id == user.id, models.Todo.completed.is_(False))
+        .where(or_(models.Todo.plan_at.is_(None),
+                   and_(models.Todo.plan_at >= start - longest, models.Todo.plan_at < end)))
+    ).all()
+    pomodoros = db.execute(
+        select(models.Pomodoro.started_at, models.Pomodoro.ended_at, models.Pomodoro.duration_minutes)
+        .where(models.Pomodoro.owner_id == user.id,
+               models.Pomodoro.started_at >= start - longest, models.Pomodoro.started_at < end)
+    ).all()
+
+    busy = [(p.started_at, p.ended_at or p.started_at + timedelta(minutes=p.duration_minutes or 25))
+            for p in pomodoros]
+    tasks = []
+    for t in todos:
+        minutes = t.estimate_minutes or 25
+        if t.plan_at is None or (body.replan and t.plan_at >= start):
+            tasks.append(scheduler.Task(t.id, minutes, t.priority or 3, t.due_date, t.created_at))
+        else:
+            busy.append((t.plan_at, t.plan_at + timedelta(minutes=minutes)))
+
+    hours = scheduler.WorkingHours(
+        start=body.work_start, end=body.work_end, weekdays=frozenset(body.weekdays),
+        utc_offset=timedelta(minutes=body.utc_offset_minutes),
+    )
+    placed, unplaced = scheduler.plan(start, end, hours, busy, tasks, body.gap_minutes)
+
+    if body.apply and placed:
+        now = datetime.utcnow()
+        db.execute(update(models.Todo), [{"id": p.todo_id, "plan_at": p.start, "updated_at": now} for p in placed])
+        for p in placed:
+            changes.record(db, user.id, "todo", p.todo_id, "update")
+        db.commit()
+    return json_response(schemas.ScheduleResponse, {
+        "start": start,
+        "end": end,
+        "scheduled": [{"todo_id": p.todo_id, "start": p.start, "end": p.end, "late": p.late} for p in placed],
+        "unscheduled": [{"todo_id": i, "reason": r} for i, r in unplaced],
+        "applied": body.apply and bool(placed),
+    })
 
 # --------- UPDATE / DELETE ---------
 @router.put("/{todo_id}", response_model=schemas.TodoOut)
@@ -54,7 +410,7 @@ def update_todo(
     todo_id: int,
     body: schemas.TodoUpdate,
     db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user),
+    user: CurrentUser = Depends(get_current_user),
 ):
     todo = db.query(models.Todo).filter(
         models.Todo.id == todo_id, models.Todo.owner_id == user.id
@@ -69,144 +425,242 @@ def update_todo(
     if body.due_date is not None: todo.due_date = body.due_date
     if body.plan_at is not None: todo.plan_at = body.plan_at
     if body.estimate_minutes is not None: todo.estimate_minutes = body.estimate_minutes
+    if body.tags is not None:
+        tags.replace_links(db, {todo.id: body.tags})
+        todo.updated_at = datetime.utcnow()
 
+    changes.record(db, user.id, "todo", todo.id, "update")
     db.commit()
-    db.refresh(todo)
-    return todo
+    return _load_todo(db, user.id, todo.id)
 
 # Return JSON so the frontend can res.json()
 @router.delete("/{todo_id}", response_class=JSONResponse)
 def delete_todo(
     todo_id: int,
     db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user),
+    user: CurrentUser = Depends(get_current_user),
 ):
     todo = db.query(models.Todo).filter(
         models.Todo.id == todo_id, models.Todo.owner_id == user.id
     ).first()
     if todo:
         db.delete(todo)
-        db.commit()
-        return {"deleted": True, "id": todo_id}
-    return JSONResponse({"deleted": False, "id": todo_id}, status_code=200)
+        archive.forget_todos(db, [todo_id])
+    elif not archive.delete_todo(db, user.id, todo_id):
+        return JSONResponse({"deleted": False, "id": todo_id}, status_code=200)
+    rollups.forget_todo(db, user.id, todo_id)
+    changes.record(db, user.id, "todo", todo_id, "delete")
+    db.commit()
+    return {"deleted": True, "id": todo_id}
+
+@router.post("/{todo_id}/restore", response_model=schemas.TodoOut)
+def restore_todo(
+    todo_id: int,
+    db: Session = Depends(get_db),
+    user: CurrentUser = Depends(get_current_user),
+):
+    """Move an archived todo back to the live list, with its steps, tags and pomodoros."""
+    if not archive.restore_todo(db, user.id, todo_id):
+        if db.scalar(select(models.Todo.id).where(models.Todo.id == todo_id, models.Todo.owner_id == user.id)):
+            return _load_todo(db, user.id, todo_id)  # not archived: nothing to do
+        raise HTTPException(status_code=404, detail="Todo not found")
+    changes.record(db, user.id, "todo", todo_id, "update")
+    db.commit()
+    return _load_todo(db, user.id, todo_id)
 
 # --------- STEPS ---------
+def _owned_todo_id(db: Session, owner_id: int, todo_id: int) -> int:
+    if db.scalar(select(models.Todo.id).where(models.Todo.id == todo_id, models.Todo.owner_id == owner_id)) is None:
+        raise HTTPException(status_code=404, detail="Todo not found")
+    return todo_id
+
+def _owned_step(db: Session, owner_id: int, step_id: int) -> Optional[models.TodoStep]:
+    return (
+        db.query(models.TodoStep)
+        .join(models.Todo, models.Todo.id == models.TodoStep.todo_id)
+        .filter(models.TodoStep.id == step_id, models.Todo.owner_id == owner_id)
+        .first()
+    )
+
+def _step_out(db: Session, step: models.TodoStep) -> dict:
+    return {"id": step.id, "text": step.text, "done": step.done, "rank": step.rank,
+            "order": steps.position(db, step)}
+
 @router.post("/{todo_id}/steps", response_model=schemas.StepOut, status_code=status.HTTP_201_CREATED)
 def add_step(
     todo_id: int,
     body: schemas.StepCreate,
     db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user),
+    user: CurrentUser = Depends(get_current_user),
 ):
-    todo = db.query(models.Todo).filter(
-        models.Todo.id == todo_id, models.Todo.owner_id == user.id
-    ).first()
-    if not todo:
-        raise HTTPException(status_code=404, detail="Todo not found")
-
-    step = models.Step(
-        todo_id=todo.id,
+    _owned_todo_id(db, user.id, todo_id)
+    step = models.TodoStep(
+        todo_id=todo_id,
         text=body.text,
         done=False,
-        order=(body.order if body.order is not None else 0),
+        rank=steps.rank_at(db, user.id, todo_id, body.order),
     )
     db.add(step)
+    db.flush()
+    changes.record(db, user.id, "step", step.id, "create", {"todo_id": todo_id})
     db.commit()
     db.refresh(step)
-    return step
+    return _step_out(db, step)
+
+@router.patch("/{todo_id}/steps/order", response_model=list[schemas.StepOut])
+def reorder_steps(
+    todo_id: int,
+    body: schemas.StepOrder,
+    db: Session = Depends(get_db),
+    user: CurrentUser = Depends(get_current_user),
+):
+    """Put all of a todo's steps in the given order, in one UPDATE."""
+    _owned_todo_id(db, user.id, todo_id)
+    current = set(db.scalars(select(models.TodoStep.id).where(models.TodoStep.todo_id == todo_id)))
+    if len(body.step_ids) != len(current) or set(body.step_ids) != current:
+        raise HTTPException(status_code=422, detail="step_ids must list each of the todo's steps exactly once")
+    steps.assign(db, user.id, todo_id, body.step_ids)
+    db.commit()
+    rows = db.scalars(
+        select(models.TodoStep).where(models.TodoStep.todo_id == todo_id)
+        .order_by(models.TodoStep.rank, models.TodoStep.id)
+        .execution_options(populate_existing=True)
+    ).all()
+    return json_response(list[schemas.StepOut], [
+        {"id": r.id, "text": r.text, "done": r.done, "rank": r.rank, "order": i} for i, r in enumerate(rows)
+    ])
 
 @router.put("/steps/{step_id}", response_model=schemas.StepOut)
 def update_step(
     step_id: int,
     body: schemas.StepUpdate,
     db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user),
+    user: CurrentUser = Depends(get_current_user),
 ):
-    step = (
-        db.query(models.Step)
-        .join(models.Todo, models.Todo.id == models.Step.todo_id)
-        .filter(models.Step.id == step_id, models.Todo.owner_id == user.id)
-        .first()
-    )
+    """Edit a step; `order` moves it to that position, rewriting only this row."""
+    step = _owned_step(db, user.id, step_id)
     if not step:
         raise HTTPException(status_code=404, detail="Step not found")
 
     if body.text is not None: step.text = body.text
     if body.done is not None: step.done = body.done
-    if body.order is not None: step.order = body.order
+    if body.order is not None: step.rank = steps.rank_at(db, user.id, step.todo_id, body.order, exclude_id=step.id)
 
+    changes.record(db, user.id, "step", step.id, "update", {"todo_id": step.todo_id})
     db.commit()
     db.refresh(step)
-    return step
+    return _step_out(db, step)
 
 @router.delete("/steps/{step_id}", status_code=status.HTTP_200_OK)
 def delete_step(
     step_id: int,
     db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user),
+    user: CurrentUser = Depends(get_current_user),
 ):
-    step = (
-        db.query(models.Step)
-        .join(models.Todo, models.Todo.id == models.Step.todo_id)
-        .filter(models.Step.id == step_id, models.Todo.owner_id == user.id)
-        .first()
-    )
+    step = _owned_step(db, user.id, step_id)
     if step:
         db.delete(step)
+        changes.record(db, user.id, "step", step_id, "delete", {"todo_id": step.todo_id})
         db.commit()
         return {"deleted": True, "id": step_id}
     return {"deleted": False, "id": step_id}
 
 # --------- EXPORTS ---------
+def _iter_calendar(owner_id: int):
+    db = read_sessionmaker(owner_id)()
+    try:
+        stmt = (
+            select(models.Todo)
+            .where(models.Todo.owner_id == owner_id, models.Todo.due_date.isnot(None))
+            .order_by(models.Todo.id)
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        yield from iter_ics(db.scalars(stmt))
+    finally:
+        db.close()
+
+def _calendar_state(db: Session, owner_id: int):
+    """(todo count, time of the last change to the feed).
+
+    updated_at alone misses todos that left: deletes are taken from the
+    change log, archival from archived_at.
+    """
+    count, updated = db.query(
+        func.count(models.Todo.id), func.max(models.Todo.updated_at)
+    ).filter(models.Todo.owner_id == owner_id).one()
+    logged = db.scalar(
+        select(models.ChangeLog.created_at)
+        .where(models.ChangeLog.user_id == owner_id)
+        .order_by(models.ChangeLog.seq.desc())
+        .limit(1)
+    )
+    archived = db.scalar(
+        select(func.max(models.ArchivedTodo.archived_at)).where(models.ArchivedTodo.owner_id == owner_id)
+    )
+    return count, max((t for t in (updated, logged, archived) if t is not None), default=None)
+
 @router.get("/calendar.ics", include_in_schema=False)
 def as_ics(
-    db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user),
+    request: Request,
+    db: Session = Depends(get_read_db),
+    user: CurrentUser = Depends(get_current_user),
 ):
-    todos = db.query(models.Todo).filter(
-        models.Todo.owner_id == user.id,
-        models.Todo.due_date.isnot(None),
-    ).all()
+    # Index-only lookups decide freshness; the feed is only rendered on a miss.
+    count, last_change = _calendar_state(db, user.id)
+    raw = f"{user.id}:{count}:{last_change.isoformat() if last_change else '-'}:{ICS_FORMAT_VERSION}"
+    headers = {"ETag": '"ics-%s"' % hashlib.sha1(raw.encode()).hexdigest()[:20]}
+    last_modified = settled(last_change)
+    if last_modified:
+        headers["Last-Modified"] = http_date(last_modified)
+    if is_not_modified(request, headers["ETag"], last_modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return StreamingResponse(_iter_calendar(user.id), media_type="text/calendar", headers=headers)
 
-    def ics_dt(dt):
-        return dt.strftime("%Y%m%d")
+def _iter_export_csv(owner_id: int, include_archived: bool = False):
+    """Yield CSV text one batch at a time; memory stays flat with account size.
 
-    lines = [
-        "BEGIN:VCALENDAR",
-        "VERSION:2.0",
-        "PRODID:-//Todo+Pomodoro//EN",
-    ]
-    for t in todos:
-        lines += [
-            "BEGIN:VEVENT",
-            f"UID:todo-{t.id}@todo-pomodoro",
-            f"SUMMARY:{t.title}",
-            f"DESCRIPTION:{(t.notes or '').replace('\\n', ' ')}",
-            f"DTSTART;VALUE=DATE:{ics_dt(t.due_date)}",
-            f"DTEND;VALUE=DATE:{ics_dt(t.due_date)}",
-            "END:VEVENT",
+    Uses its own session: the request-scoped one is closed before streaming
+    starts.
+    """
+    db = read_sessionmaker(owner_id)()
+    try:
+        buf = io.StringIO()
+        w = csv.writer(buf)
+        w.writerow(EXPORT_COLUMNS)
+        yield buf.getvalue()
+
+        stmts = [
+            select(model)
+            .options(selectinload(model.tags), selectinload(model.steps))
+            .where(model.owner_id == owner_id)
+            .order_by(model.id)
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
+            for model in ((models.Todo, models.ArchivedTodo) if include_archived else (models.Todo,))
         ]
-    lines.append("END:VCALENDAR")
-    body = "\r\n".join(lines) + "\r\n"
-    return Response(content=body, media_type="text/calendar")
+        for batch in (b for stmt in stmts for b in db.scalars(stmt).partitions()):
+            buf.seek(0); buf.truncate()
+            for t in batch:
+                w.writerow([
+                    t.id, t.title, t.notes, t.completed, t.priority,
+                    t.due_date.isoformat() if t.due_date else "",
+                    t.plan_at.isoformat() if t.plan_at else "",
+                    t.estimate_minutes, t.created_at.isoformat(), t.updated_at.isoformat(),
+                    json.dumps([tag.name for tag in t.tags]),
+                    json.dumps([{"text": s.text, "done": s.done} for s in t.steps]),
+                ])
+            yield buf.getvalue()
+    finally:
+        db.close()
 
 @router.get("/export.csv", include_in_schema=False)
 def export_csv(
-    db: Session = Depends(get_db),
-    user: models.User = Depends(get_current_user),
+    request: Request,
+    include_archived: bool = Query(False),
+    user: CurrentUser = Depends(get_current_user),
 ):
-    todos = db.query(models.Todo).filter(models.Todo.owner_id == user.id).all()
-    buf = io.StringIO()
-    w = csv.writer(buf)
-    w.writerow(["id","title","notes","completed","priority","due_date","plan_at","estimate_minutes","created_at","updated_at"])
-    for t in todos:
-        w.writerow([
-            t.id, t.title, t.notes, t.completed, t.priority,
-            t.due_date.isoformat() if t.due_date else "",
-            t.plan_at.isoformat() if t.plan_at else "",
-            t.estimate_minutes, t.created_at.isoformat(), t.updated_at.isoformat()
-        ])
-    buf.seek(0)
-    return StreamingResponse(iter([buf.read()]),
-        media_type="text/csv",
-        headers={"Content-Disposition": "attachment; filename=todos.csv"})
+    headers = {"Content-Disposition": "attachment; filename=todos.csv", "Vary": "Accept-Encoding"}
+    body = _iter_export_csv(user.id, include_archived)
+    if accepts_gzip(request):
+        headers["Content-Encoding"] = "gzip"
+        body = gzip_stream(body)
+    return StreamingResponse(body, media_type="text/csv", headers=headers)
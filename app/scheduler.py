@@ -0,0 +1,162 @@
+# app/scheduler.py
+"""Pack pending todos into free working time (POST /todos/schedule).
+
+Times are whole minutes from the window start. Free time is the working
+hours of each day in the window minus the busy intervals (todos already
+planned, logged pomodoros), found in one sweep over the merged busy list.
+Todos are then placed most urgent first (priority, due date, age), each at
+the start of the earliest free slot long enough to hold it.
+
+Free slots sit in a max segment tree keyed by remaining length. Finding the
+leftmost slot with room for d minutes is one O(log m) descent, and placing
+a todo is one O(log m) update. n todos over m slots therefore cost
+O((n + m) log m), not O(n * m), which keeps thousands of todos well inside
+a request budget. Nothing here touches the database.
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from typing import FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+
+Interval = Tuple[int, int]  # [start, end) in minutes from the window start
+
+
+@dataclass(frozen=True)
+class WorkingHours:
+    start: time = time(9, 0)
+    end: time = time(17, 0)  # at or before start: runs past midnight
+    weekdays: FrozenSet[int] = frozenset(range(5))  # 0 = Monday
+    utc_offset: timedelta = timedelta(0)  # the hours are local to this offset
+
+
+class Task(NamedTuple):
+    id: int
+    minutes: int
+    priority: int = 3
+    due: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+
+
+class Placement(NamedTuple):
+    todo_id: int
+    start: datetime
+    end: datetime
+    late: bool  # ends after the todo's due date
+
+
+def _minutes(t0: datetime, t: datetime, up: bool = False) -> int:
+    seconds = (t - t0).total_seconds()
+    whole = int(seconds // 60)
+    return whole + 1 if up and seconds > whole * 60 else whole
+
+
+def working_intervals(start: datetime, end: datetime, hours: WorkingHours) -> List[Interval]:
+    """Working hours inside [start, end), as sorted disjoint minute intervals."""
+    length = _minutes(start, end)
+    out: List[Interval] = []
+    day: date = (start + hours.utc_offset).date() - timedelta(days=1)  # yesterday may run past midnight
+    last: date = (end + hours.utc_offset).date()
+    span = datetime.combine(date.min, hours.end) - datetime.combine(date.min, hours.start)
+    if span <= timedelta(0):
+        span += timedelta(days=1)
+    while day <= last:
+        if day.weekday() in hours.weekdays:
+            local = datetime.combine(day, hours.start)
+            a = max(0, _minutes(start, local - hours.utc_offset, up=True))
+            b = min(length, _minutes(start, local - hours.utc_offset + span))
+            if a < b:
+                out.append((a, b))
+        day += timedelta(days=1)
+    return out
+
+
+def subtract(free: List[Interval], busy: Iterable[Interval]) -> List[Interval]:
+    """free minus busy; `free` must be sorted and disjoint."""
+    merged: List[List[int]] = []
+    for a, b in sorted(busy):
+        if merged and a <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], b)
+        elif a < b:
+            merged.append([a, b])
+    out: List[Interval] = []
+    j = 0
+    for a, b in free:
+        while j < len(merged) and merged[j][1] <= a:
+            j += 1
+        k = j
+        while a < b and k < len(merged) and merged[k][0] < b:
+            if merged[k][0] > a:
+                out.append((a, merged[k][0]))
+            a = max(a, merged[k][1])
+            k += 1
+        if a < b:
+            out.append((a, b))
+    return out
+
+
+class _SlotTree:
+    """Max segment tree over slot lengths: leftmost slot with room for d."""
+
+    def __init__(self, lengths: List[int]):
+        size = 1
+        while size < len(lengths):
+            size *= 2
+        self.size = size
+        self.tree = [0] * (2 * size)
+        self.tree[size:size + len(lengths)] = lengths
+        for i in range(size - 1, 0, -1):
+            self.tree[i] = max(self.tree[2 * i], self.tree[2 * i + 1])
+
+    def leftmost(self, need: int) -> int:
+        tree = self.tree
+        if tree[1] < need:
+            return -1
+        i = 1
+        while i < self.size:
+            i = 2 * i if tree[2 * i] >= need else 2 * i + 1
+        return i - self.size
+
+    def set(self, slot: int, length: int) -> None:
+        tree = self.tree
+        i = slot + self.size
+        tree[i] = length
+        i //= 2
+        while i:
+            tree[i] = max(tree[2 * i], tree[2 * i + 1])
+            i //= 2
+
+
+def _urgency(task: Task):
+    return (task.priority, task.due or datetime.max, task.created_at or datetime.max, task.id)
+
+
+def plan(
+    start: datetime,
+    end: datetime,
+    hours: WorkingHours,
+    busy: Iterable[Tuple[datetime, datetime]],
+    tasks: Iterable[Task],
+    gap_minutes: int = 0,
+) -> Tuple[List[Placement], List[Tuple[int, str]]]:
+    """Place tasks into free time; returns (placements, [(todo id, reason)])."""
+    busy_minutes = [(_minutes(start, a), _minutes(start, b, up=True)) for a, b in busy]
+    slots = subtract(working_intervals(start, end, hours), busy_minutes)
+    slot_start = [a for a, _ in slots]
+    slot_end = [b for _, b in slots]
+    longest = max((b - a for a, b in slots), default=0)
+    tree = _SlotTree([b - a for a, b in slots])
+
+    placed: List[Placement] = []
+    unplaced: List[Tuple[int, str]] = []
+    for task in sorted(tasks, key=_urgency):
+        slot = tree.leftmost(task.minutes)
+        if slot < 0:
+            unplaced.append((task.id, "longer than any free slot" if task.minutes > longest else "no free time left"))
+            continue
+        a = slot_start[slot]
+        begins, ends = start + timedelta(minutes=a), start + timedelta(minutes=a + task.minutes)
+        placed.append(Placement(task.id, begins, ends, late=task.due is not None and ends > task.due))
+        slot_start[slot] = min(a + task.minutes + gap_minutes, slot_end[slot])
+        tree.set(slot, slot_end[slot] - slot_start[slot])
+    placed.sort(key=lambda p: p.start)
+    return placed, unplaced
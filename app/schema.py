@@ -0,0 +1,168 @@
+# app/schema.py
+"""Schema bootstrap: tables via create_all, plus indexes added after a table
+already existed (create_all skips existing tables entirely).
+
+Introspecting every table on every worker boot is slow, so ensure_schema()
+compares a fingerprint of the DDL this code would emit with the one stored
+in schema_meta by the last successful bootstrap. When they match, startup
+costs a single SELECT. Otherwise one process takes a lock (a flock beside
+the SQLite file, or a Postgres advisory lock), migrates and stores the new
+fingerprint. Workers waiting on the lock find the schema current and skip.
+
+Run `python -m app.schema` in the deploy step and set SCHEMA_AUTO_MIGRATE=false
+to keep workers from migrating at all; they then refuse to start against
+an out-of-date schema.
+"""
+import hashlib
+import logging
+import os
+import zlib
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import inspect, select, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateColumn, CreateIndex, CreateTable
+
+from .database import Base
+from . import models, rollups, search, steps
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock; migrate from one process
+    fcntl = None
+
+# Bump for changes the DDL can't show (e.g. a data backfill in init_schema).
+SCHEMA_REVISION = 1
+SCHEMA_AUTO_MIGRATE = os.getenv("SCHEMA_AUTO_MIGRATE", "true").lower() in {"1", "true", "yes"}
+_PG_LOCK_KEY = zlib.crc32(b"todo-schema-bootstrap")
+
+log = logging.getLogger(__name__)
+
+
+def add_missing_columns(engine: Engine) -> set:
+    """ALTER TABLE ... ADD COLUMN for model columns an existing table lacks.
+
+    New columns need a server_default (or to be nullable) to be added to a
+    table that has rows. Returns the (table, column) pairs added.
+    """
+    insp = inspect(engine)
+    added = set()
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not insp.has_table(table.name):
+                continue
+            existing = {c["name"] for c in insp.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+                    added.add((table.name, column.name))
+    return added
+
+
+def ensure_indexes(engine: Engine) -> None:
+    insp = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        existing = {ix["name"] for ix in insp.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=engine)
+
+
+def init_schema(engine: Engine) -> None:
+    had_rollup = inspect(engine).has_table(models.PomodoroDaily.__tablename__)
+    Base.metadata.create_all(bind=engine)
+    added = add_missing_columns(engine)
+    ensure_indexes(engine)
+    search.ensure_search_index(engine)
+    if not had_rollup:
+        # First boot with the rollup table: backfill it from existing sessions.
+        with Session(engine) as db:
+            rollups.rebuild(db)
+            db.commit()
+    for table in (models.TodoStep.__tablename__, models.ArchivedTodoStep.__tablename__):
+        if (table, "rank") in added:
+            with Session(engine) as db:
+                steps.backfill_ranks(db, table)
+                db.commit()
+
+
+def fingerprint(engine: Engine) -> str:
+    """Hash of the DDL init_schema would create on this dialect (no DB access)."""
+    dialect = engine.dialect
+    h = hashlib.sha256(f"revision {SCHEMA_REVISION}\n".encode())
+    for table in Base.metadata.sorted_tables:
+        h.update(str(CreateTable(table).compile(dialect=dialect)).encode())
+        for index in sorted(table.indexes, key=lambda ix: ix.name):
+            h.update(str(CreateIndex(index).compile(dialect=dialect)).encode())
+    for ddl in search.search_ddl(dialect.name):
+        h.update(ddl.encode())
+    return h.hexdigest()
+
+
+def stored_fingerprint(engine: Engine) -> Optional[str]:
+    try:
+        with engine.connect() as conn:
+            return conn.scalar(
+                select(models.SchemaMeta.value).where(models.SchemaMeta.key == "fingerprint")
+            )
+    except DBAPIError:  # no schema_meta yet
+        return None
+
+
+def _store_fingerprint(engine: Engine, value: str) -> None:
+    with Session(engine) as db:
+        db.merge(models.SchemaMeta(key="fingerprint", value=value, updated_at=datetime.utcnow()))
+        db.commit()
+
+
+@contextmanager
+def _migration_lock(engine: Engine):
+    """Held by one process at a time across every worker sharing the database."""
+    url = make_url(str(engine.url))
+    if engine.dialect.name == "postgresql":
+        with engine.connect() as conn:
+            conn.execute(text("SELECT pg_advisory_lock(:k)"), {"k": _PG_LOCK_KEY})
+            try:
+                yield
+            finally:
+                conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": _PG_LOCK_KEY})
+    elif engine.dialect.name == "sqlite" and url.database not in (None, "", ":memory:") and fcntl is not None:
+        with open(os.path.abspath(url.database) + ".schema-lock", "a") as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+    else:
+        yield
+
+
+def ensure_schema(engine: Engine, migrate: bool = SCHEMA_AUTO_MIGRATE) -> bool:
+    """Bring the schema up to date if needed; True if this call migrated it."""
+    expected = fingerprint(engine)
+    if stored_fingerprint(engine) == expected:
+        search.probe_search_index(engine)
+        return False
+    if not migrate:
+        raise RuntimeError("database schema is out of date; run `python -m app.schema` first")
+    with _migration_lock(engine):
+        if stored_fingerprint(engine) == expected:  # another worker got here first
+            search.probe_search_index(engine)
+            return False
+        init_schema(engine)
+        _store_fingerprint(engine, expected)
+    log.info("schema migrated to %s", expected[:12])
+    return True
+
+
+if __name__ == "__main__":
+    from .database import engine
+
+    logging.basicConfig(level=logging.INFO)
+    if not ensure_schema(engine, migrate=True):
+        print("schema already current")
@@ -1,7 +1,7 @@
 # app/schemas.py
-from datetime import datetime
-from typing import Optional, List
-from pydantic import BaseModel, Field, ConfigDict, EmailStr, field_validator
+from datetime import datetime, time
+from typing import Any, Dict, Literal, Optional, List
+from pydantic import BaseModel, Field, ConfigDict, EmailStr, field_validator, model_validator
 from .utils.dates import parse_any_dt
 
 # ---- User ----
@@ -25,16 +25,20 @@ class StepOut(BaseModel):
     id: int
     text: str
     done: bool
-    order: int
+    rank: str
+    order: int = 0  # position within the todo; steps sort by rank
 
 class StepCreate(BaseModel):
     text: str
-    order: int = 0
+    order: Optional[int] = Field(None, ge=0, description="Position to insert at; default last")
 
 class StepUpdate(BaseModel):
     text: Optional[str] = None
     done: Optional[bool] = None
-    order: Optional[int] = None
+    order: Optional[int] = Field(None, ge=0, description="Position to move to")
+
+class StepOrder(BaseModel):
+    step_ids: List[int] = Field(..., max_length=1000, description="Every step of the todo, in the new order")
 
 # ---- Todos ----
 class TagOut(BaseModel):
@@ -42,6 +46,11 @@ class TagOut(BaseModel):
     id: int
     name: str
 
+class TagCount(BaseModel):
+    id: int
+    name: str
+    count: int
+
 class TodoCreate(BaseModel):
     title: str
     notes: str = ""
@@ -85,6 +94,84 @@ class TodoOut(BaseModel):
     updated_at: datetime
     tags: List[TagOut] = []
     steps: List[StepOut] = []
+    archived: bool = False
+
+    @model_validator(mode="after")
+    def _number_steps(self):
+        for i, step in enumerate(self.steps):  # loaded in rank order
+            step.order = i
+        return self
+
+class BulkOp(BaseModel):
+    """One item of a /todos/bulk batch; `data` is a TodoCreate/TodoUpdate body."""
+    op: Literal["create", "update", "delete"]
+    id: Optional[int] = None
+    data: Dict[str, Any] = {}
+
+class BulkRequest(BaseModel):
+    ops: List[BulkOp] = Field(..., max_length=5000)
+
+class BulkResult(BaseModel):
+    index: int
+    op: str
+    ok: bool
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+class BulkResponse(BaseModel):
+    results: List[BulkResult]
+
+class ImportRowError(BaseModel):
+    row: int  # 1-based data row (CSV, header excluded) or component (ICS)
+    error: str
+
+class ImportResult(BaseModel):
+    format: str
+    imported: int
+    failed: int
+    errors: List[ImportRowError]
+    errors_truncated: bool = False
+
+class ScheduleRequest(BaseModel):
+    """Window defaults to now .. now + 7 days (UTC)."""
+    start: Optional[datetime | str] = None
+    end: Optional[datetime | str] = None
+    work_start: time = time(9, 0)
+    work_end: time = time(17, 0)
+    weekdays: List[int] = Field([0, 1, 2, 3, 4], description="0 = Monday")
+    utc_offset_minutes: int = Field(0, ge=-840, le=840, description="Working hours are local to this offset")
+    gap_minutes: int = Field(0, ge=0, le=120, description="Break left after each placed todo")
+    replan: bool = Field(False, description="Also move todos already planned inside the window")
+    apply: bool = Field(False, description="Save the new plan_at values")
+
+    @field_validator("start", "end", mode="before")
+    @classmethod
+    def _coerce_dates(cls, v):
+        return parse_any_dt(v)
+
+    @field_validator("weekdays")
+    @classmethod
+    def _check_weekdays(cls, v):
+        if any(d < 0 or d > 6 for d in v):
+            raise ValueError("weekdays are 0 (Monday) .. 6 (Sunday)")
+        return v
+
+class ScheduledTodo(BaseModel):
+    todo_id: int
+    start: datetime
+    end: datetime
+    late: bool = False
+
+class UnscheduledTodo(BaseModel):
+    todo_id: int
+    reason: str
+
+class ScheduleResponse(BaseModel):
+    start: datetime
+    end: datetime
+    scheduled: List[ScheduledTodo]
+    unscheduled: List[UnscheduledTodo]
+    applied: bool = False
 
 # ---- Pomodoro ----
 class PomodoroStart(BaseModel):
@@ -104,3 +191,23 @@ class PomodoroOut(BaseModel):
     duration_minutes: int
     actual_minutes: int
     note: str
+
+# ---- Sync ----
+class SyncStepOut(StepOut):
+    todo_id: int
+
+class SyncDeleted(BaseModel):
+    todos: List[int] = []
+    steps: List[int] = []
+    pomodoros: List[int] = []
+
+class SyncResponse(BaseModel):
+    """Changes after `since`. With `reset` the client should drop its copy:
+    the lists then hold the whole account. Page until `has_more` is false."""
+    cursor: int
+    reset: bool = False
+    has_more: bool = False
+    todos: List[TodoOut] = []
+    steps: List[SyncStepOut] = []
+    pomodoros: List[PomodoroOut] = []
+    deleted: SyncDeleted = SyncDeleted()
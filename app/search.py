@@ -0,0 +1,167 @@
+# app/search.py
+"""Full-text search over todo title, notes and step text.
+
+SQLite: an FTS5 table (todo_fts, rowid = todo id) kept in sync by triggers.
+Postgres: a todos.search_vector tsvector with a GIN index, maintained by
+triggers. Both are created by ensure_search_index() at startup; the ORM
+models don't know about them.
+"""
+import logging
+import re
+from typing import List
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+log = logging.getLogger(__name__)
+
+_SQLITE_DDL = [
+    # `owner` holds a single "u<id>" token so a query can be scoped to one
+    # user inside the index instead of filtering everyone's matches.
+    """CREATE VIRTUAL TABLE IF NOT EXISTS todo_fts USING fts5(
+        owner, title, notes, steps, tokenize = 'unicode61 remove_diacritics 2')""",
+    """CREATE TRIGGER IF NOT EXISTS todo_fts_ai AFTER INSERT ON todos BEGIN
+        INSERT INTO todo_fts(rowid, owner, title, notes, steps)
+        VALUES (new.id, 'u' || new.owner_id, new.title, coalesce(new.notes, ''), '');
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS todo_fts_au AFTER UPDATE OF title, notes, owner_id ON todos BEGIN
+        UPDATE todo_fts SET owner = 'u' || new.owner_id, title = new.title, notes = coalesce(new.notes, '')
+        WHERE rowid = new.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS todo_fts_ad AFTER DELETE ON todos BEGIN
+        DELETE FROM todo_fts WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS todo_fts_steps_ai AFTER INSERT ON todo_steps BEGIN
+        UPDATE todo_fts SET steps = (SELECT coalesce(group_concat(text, ' '), '') FROM todo_steps WHERE todo_id = new.todo_id)
+        WHERE rowid = new.todo_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS todo_fts_steps_au AFTER UPDATE OF text, todo_id ON todo_steps BEGIN
+        UPDATE todo_fts SET steps = (SELECT coalesce(group_concat(text, ' '), '') FROM todo_steps WHERE todo_id = todo_fts.rowid)
+        WHERE rowid IN (old.todo_id, new.todo_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS todo_fts_steps_ad AFTER DELETE ON todo_steps BEGIN
+        UPDATE todo_fts SET steps = (SELECT coalesce(group_concat(text, ' '), '') FROM todo_steps WHERE todo_id = old.todo_id)
+        WHERE rowid = old.todo_id;
+    END""",
+]
+
+_SQLITE_BACKFILL = """
+    INSERT INTO todo_fts(rowid, owner, title, notes, steps)
+    SELECT t.id, 'u' || t.owner_id, t.title, coalesce(t.notes, ''),
+           coalesce((SELECT group_concat(s.text, ' ') FROM todo_steps s WHERE s.todo_id = t.id), '')
+    FROM todos t
+"""
+
+_POSTGRES_DDL = [
+    "ALTER TABLE todos ADD COLUMN IF NOT EXISTS search_vector tsvector",
+    "CREATE INDEX IF NOT EXISTS ix_todos_search_vector ON todos USING GIN (search_vector)",
+    """CREATE OR REPLACE FUNCTION todos_search_vector(t_title text, t_notes text, t_id integer)
+    RETURNS tsvector AS $$
+        SELECT setweight(to_tsvector('simple', coalesce(t_title, '')), 'A')
+            || setweight(to_tsvector('simple', coalesce(t_notes, '')), 'B')
+            || setweight(to_tsvector('simple', coalesce(
+                   (SELECT string_agg(text, ' ') FROM todo_steps WHERE todo_id = t_id), '')), 'C')
+    $$ LANGUAGE sql STABLE""",
+    """CREATE OR REPLACE FUNCTION todos_search_trigger() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector := todos_search_vector(NEW.title, NEW.notes, NEW.id);
+        RETURN NEW;
+    END $$ LANGUAGE plpgsql""",
+    "DROP TRIGGER IF EXISTS todos_search_update ON todos",
+    """CREATE TRIGGER todos_search_update BEFORE INSERT OR UPDATE OF title, notes ON todos
+        FOR EACH ROW EXECUTE FUNCTION todos_search_trigger()""",
+    """CREATE OR REPLACE FUNCTION todo_steps_search_trigger() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            UPDATE todos SET search_vector = todos_search_vector(title, notes, id) WHERE id = OLD.todo_id;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            UPDATE todos SET search_vector = todos_search_vector(title, notes, id) WHERE id = NEW.todo_id;
+        END IF;
+        RETURN NULL;
+    END $$ LANGUAGE plpgsql""",
+    "DROP TRIGGER IF EXISTS todo_steps_search_update ON todo_steps",
+    """CREATE TRIGGER todo_steps_search_update AFTER INSERT OR UPDATE OR DELETE ON todo_steps
+        FOR EACH ROW EXECUTE FUNCTION todo_steps_search_trigger()""",
+    "UPDATE todos SET search_vector = todos_search_vector(title, notes, id) WHERE search_vector IS NULL",
+]
+
+_fts_available = False
+
+
+def search_ddl(dialect: str) -> List[str]:
+    """The statements ensure_search_index runs (part of the schema fingerprint)."""
+    return {"sqlite": _SQLITE_DDL + [_SQLITE_BACKFILL], "postgresql": _POSTGRES_DDL}.get(dialect, [])
+
+
+def probe_search_index(engine: Engine) -> None:
+    """Set up search without DDL, for a schema already known to be current."""
+    global _fts_available
+    dialect = engine.dialect.name
+    if dialect == "sqlite":
+        try:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT rowid FROM todo_fts LIMIT 0"))
+        except Exception:  # no table, or sqlite3 built without FTS5
+            log.warning("FTS5 unavailable; /todos/search falls back to LIKE")
+            _fts_available = False
+            return
+    _fts_available = dialect in ("sqlite", "postgresql")
+
+
+def ensure_search_index(engine: Engine) -> None:
+    global _fts_available
+    dialect = engine.dialect.name
+    if dialect == "sqlite":
+        fresh = not inspect(engine).has_table("todo_fts")
+        try:
+            with engine.begin() as conn:
+                for ddl in _SQLITE_DDL:
+                    conn.execute(text(ddl))
+                if fresh:
+                    conn.execute(text(_SQLITE_BACKFILL))
+        except Exception:  # sqlite3 built without FTS5
+            log.warning("FTS5 unavailable; /todos/search falls back to LIKE", exc_info=True)
+            return
+    elif dialect == "postgresql":
+        with engine.begin() as conn:
+            for ddl in _POSTGRES_DDL:
+                conn.execute(text(ddl))
+    else:
+        return
+    _fts_available = True
+
+
+def _terms(q: str) -> List[str]:
+    return re.findall(r"\w+", q.lower())[:16]
+
+
+def search_todo_ids(db: Session, owner_id: int, q: str, limit: int, offset: int) -> List[int]:
+    """Ids of the owner's todos matching every term (prefix match), best first."""
+    terms = _terms(q)
+    if not terms:
+        return []
+    dialect = db.get_bind().dialect.name
+    params = {"owner": owner_id, "limit": limit, "offset": offset}
+    if _fts_available and dialect == "sqlite":
+        params["match"] = f'owner:"u{owner_id}" AND {{title notes steps}}: (' + \
+            " AND ".join(f'"{t}"*' for t in terms) + ")"
+        # bm25 column weights follow the table: owner, title, notes, steps.
+        sql = """SELECT rowid FROM todo_fts WHERE todo_fts MATCH :match
+                 ORDER BY bm25(todo_fts, 0.0, 10.0, 4.0, 1.0), rowid DESC
+                 LIMIT :limit OFFSET :offset"""
+    elif _fts_available and dialect == "postgresql":
+        params["tsq"] = " & ".join(f"{t}:*" for t in terms)
+        sql = """SELECT id FROM todos, to_tsquery('simple', :tsq) query
+                 WHERE owner_id = :owner AND search_vector @@ query
+                 ORDER BY ts_rank(search_vector, query) DESC, id DESC
+                 LIMIT :limit OFFSET :offset"""
+    else:
+        where = " AND ".join(
+            f"(lower(title) LIKE :t{i} OR lower(coalesce(notes, '')) LIKE :t{i})" for i in range(len(terms))
+        )
+        params.update({f"t{i}": f"%{t}%" for i, t in enumerate(terms)})
+        sql = f"""SELECT id FROM todos WHERE owner_id = :owner AND {where}
+                  ORDER BY created_at DESC, id DESC LIMIT :limit OFFSET :offset"""
+    return [row[0] for row in db.execute(text(sql), params)]
@@ -1,57 +1,206 @@
 # app/security.py
+import asyncio
 import os
+import threading
 import time
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from typing import Callable, Optional, Tuple, TypeVar
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from .database import get_db
+from .database import SessionLocal, get_async_db, get_db
 from . import models
+from .utils.cache import TTLCache
 
 # Load settings (use .env or export in shell)
 SECRET_KEY = os.getenv("SECRET_KEY", "CHANGE_ME")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "360"))
+# Verified token -> user identity. Kept short so other workers see user changes quickly.
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+# bcrypt cost; stored hashes with a different cost are rehashed on next login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Hashing runs on its own small pool so logins can't starve the request threadpool.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "8"))
+
+# passlib and jose are imported on first use, not at startup: a worker that
+# only serves cached tokens never needs passlib at all.
+@lru_cache(maxsize=None)
+def pwd_context():
+    from passlib.context import CryptContext
+
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=BCRYPT_ROUNDS,
+        bcrypt__min_rounds=BCRYPT_ROUNDS,
+        bcrypt__max_rounds=BCRYPT_ROUNDS,
+    )
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
+user_cache = TTLCache(maxsize=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL_SECONDS)
+
+
+@dataclass(frozen=True)
+class CurrentUser:
+    """Detached snapshot of the authenticated user (safe to share across requests)."""
+    id: int
+    email: str
+    created_at: datetime
+
+
+T = TypeVar("T")
+
+# bcrypt releases the GIL, so a thread pool gives real parallelism here.
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="pwhash")
+# Running + queued jobs; anything beyond this is rejected instead of piling up.
+_hash_slots = threading.BoundedSemaphore(PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE)
+
+def _hashing_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many concurrent sign-ins, please retry",
+        headers={"Retry-After": "1"},
+    )
+
+def _run_hashing(fn: Callable[..., T], *args) -> T:
+    """Run fn on the hashing pool, or 503 straight away if it is saturated."""
+    if not _hash_slots.acquire(blocking=False):
+        raise _hashing_busy()
+    try:
+        return _hash_executor.submit(fn, *args).result()
+    finally:
+        _hash_slots.release()
+
+
+async def _run_hashing_async(fn: Callable[..., T], *args) -> T:
+    """Same admission rules as _run_hashing, but awaits instead of blocking."""
+    if not _hash_slots.acquire(blocking=False):
+        raise _hashing_busy()
+    try:
+        return await asyncio.wrap_future(_hash_executor.submit(fn, *args))
+    finally:
+        _hash_slots.release()
+
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return _run_hashing(pwd_context().hash, password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return _run_hashing(pwd_context().verify, plain_password, hashed_password)
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify; also return a fresh hash when the stored one uses outdated settings."""
+    return _run_hashing(pwd_context().verify_and_update, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_hashing_async(pwd_context().hash, password)
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return await _run_hashing_async(pwd_context().verify_and_update, plain_password, hashed_password)
 
 def create_access_token(data: dict) -> str:
     """Sign a JWT with iat/exp using the configured secret/algorithm."""
+    from jose import jwt
+
     to_encode = data.copy()
     now = int(time.time())
     exp = now + ACCESS_TOKEN_EXPIRE_MINUTES * 60
     to_encode.update({"iat": now, "exp": exp})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
-) -> models.User:
-    """Decode and verify JWT; return the user or 401."""
-    creds_exc = HTTPException(
+def invalidate_user(user_id: Optional[int] = None, email: Optional[str] = None) -> int:
+    """Drop cached identities for a user (by id and/or email)."""
+    return user_cache.discard_where(
+        lambda _token, u: (user_id is not None and u.id == user_id)
+        or (email is not None and u.email == email)
+    )
+
+def auth_cache_stats() -> dict:
+    return user_cache.stats()
+
+def _credentials_exc() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Invalid or expired token",
     )
+
+def _decode_token(token: str) -> Tuple[str, Optional[float]]:
+    """Verify the JWT and return (email, exp); 401 if invalid."""
+    from jose import JWTError, jwt
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: Optional[str] = payload.get("sub")
-        if not email:
-            raise creds_exc
     except JWTError:
-        raise creds_exc
+        raise _credentials_exc()
+    email: Optional[str] = payload.get("sub")
+    if not email:
+        raise _credentials_exc()
+    return email, payload.get("exp")
 
-    user = db.query(models.User).filter(models.User.email == email).first()
-    if not user:
-        raise creds_exc
+def _user_by_email(email: str):
+    return select(models.User.id, models.User.email, models.User.created_at).where(models.User.email == email)
+
+def _remember(token: str, row, exp: Optional[float]) -> CurrentUser:
+    if not row:
+        raise _credentials_exc()
+    user = CurrentUser(id=row.id, email=row.email, created_at=row.created_at)
+    user_cache.set(token, user, ttl=(exp - time.time()) if exp else None)
     return user
+
+def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db),
+) -> CurrentUser:
+    """Decode and verify JWT; return the user or 401.
+
+    Verified tokens are cached until min(cache TTL, token exp), so a warm
+    request skips both the signature check and the user lookup.
+    """
+    cached = user_cache.get(token)
+    if cached is not None:
+        return cached
+    email, exp = _decode_token(token)
+    return _remember(token, db.execute(_user_by_email(email)).first(), exp)
+
+async def get_current_user_async(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db),
+) -> CurrentUser:
+    """get_current_user for DB_MODE=async routes; shares the same cache."""
+    cached = user_cache.get(token)
+    if cached is not None:
+        return cached
+    email, exp = _decode_token(token)
+    return _remember(token, (await db.execute(_user_by_email(email))).first(), exp)
+
+def authenticate_token(token: Optional[str]) -> Tuple[CurrentUser, Optional[float]]:
+    """For callers outside Depends (WebSocket/SSE): return (user, exp) or 401.
+
+    The signature is always checked here because long-lived connections
+    need `exp` to know when to hang up. Blocking; call it from a threadpool.
+    """
+    if not token:
+        raise _credentials_exc()
+    email, exp = _decode_token(token)
+    cached = user_cache.get(token)
+    if cached is not None:
+        return cached, exp
+    with SessionLocal() as db:
+        return _remember(token, db.execute(_user_by_email(email)).first(), exp), exp
+
+
+# Any ORM change to a user (password, email, delete) evicts its cached tokens.
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _evict_cached_user(mapper, connection, target):
+    invalidate_user(user_id=target.id, email=target.email)
@@ -0,0 +1,166 @@
+# app/steps.py
+"""Checklist step ordering with fractional ranks.
+
+Steps sort by (rank, id), where rank is an app.utils.lexorank key. The
+(todo_id, rank) index serves the sorted loads as well as the neighbour
+lookups here. Placing a step reads the ranks on either side of the target
+position and writes only the step itself. Reordering a whole checklist
+gives every step a fresh, evenly spaced rank in a single UPDATE.
+
+Inserting at the same spot again and again makes keys longer. When a write
+produces a key longer than STEP_RANK_REBALANCE_LENGTH, its todo is queued
+(once the transaction commits). A lifespan task respaces queued todos every
+STEP_REBALANCE_INTERVAL_SECONDS. A key that would not fit the column is
+never written; the todo is respaced on the spot instead. Respacing is
+recorded as step updates, like any other write, so clients that sort by
+rank receive the new keys.
+"""
+import asyncio
+import logging
+import os
+import threading
+from itertools import groupby
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, case, event, func, inspect, or_, select, text, update
+from sqlalchemy.orm import Session
+
+from . import changes
+from .database import SessionLocal
+from .models import RANK_LENGTH, TodoStep
+from .utils import lexorank
+
+STEP_RANK_REBALANCE_LENGTH = int(os.getenv("STEP_RANK_REBALANCE_LENGTH", "12"))
+STEP_REBALANCE_INTERVAL_SECONDS = float(os.getenv("STEP_REBALANCE_INTERVAL_SECONDS", "60"))
+
+log = logging.getLogger(__name__)
+
+_queued: Set[Tuple[int, int]] = set()  # (owner_id, todo_id), committed writes only
+_queued_lock = threading.Lock()
+
+
+def _sorted(q):
+    return q.order_by(TodoStep.rank, TodoStep.id)
+
+
+def assign(db: Session, owner_id: int, todo_id: int, step_ids: List[int]) -> None:
+    """Rank the todo's steps in the order given, with one UPDATE."""
+    if not step_ids:
+        return
+    ranks = dict(zip(step_ids, lexorank.spread(len(step_ids))))
+    db.execute(
+        update(TodoStep)
+        .where(TodoStep.todo_id == todo_id, TodoStep.id.in_(step_ids))
+        .values(rank=case(ranks, value=TodoStep.id))
+        .execution_options(synchronize_session=False)
+    )
+    for step_id in step_ids:
+        changes.record(db, owner_id, "step", step_id, "update", {"todo_id": todo_id})
+
+
+def respace(db: Session, owner_id: int, todo_id: int) -> None:
+    """Evenly spaced ranks for the todo's steps, keeping their order."""
+    ids = db.scalars(_sorted(select(TodoStep.id).where(TodoStep.todo_id == todo_id))).all()
+    assign(db, owner_id, todo_id, ids)
+
+
+def rank_at(db: Session, owner_id: int, todo_id: int, position: Optional[int] = None,
+            exclude_id: Optional[int] = None) -> str:
+    """Rank that puts a step at `position` (0-based; None = last) among the
+    todo's other steps. exclude_id is the step being moved, if any."""
+    q = select(TodoStep.rank).where(TodoStep.todo_id == todo_id)
+    if exclude_id is not None:
+        q = q.where(TodoStep.id != exclude_id)
+    for attempt in range(2):
+        if position is None:
+            lo, hi = db.scalar(q.order_by(TodoStep.rank.desc(), TodoStep.id.desc()).limit(1)), None
+        elif position <= 0:
+            lo, hi = None, db.scalar(_sorted(q).limit(1))
+        else:
+            near = db.scalars(_sorted(q).offset(position - 1).limit(2)).all()
+            if not near:  # past the end
+                return rank_at(db, owner_id, todo_id, None, exclude_id)
+            lo, hi = near[0], (near[1] if len(near) > 1 else None)
+        # Equal neighbours (a concurrent insert, or rows written without a
+        # rank) leave no room, and a key may outgrow the column: respace.
+        if hi is None or (lo or "") < hi:
+            rank = lexorank.between(lo, hi)
+            if len(rank) <= RANK_LENGTH:
+                if len(rank) > STEP_RANK_REBALANCE_LENGTH:
+                    db.info.setdefault("rebalance_todos", set()).add((owner_id, todo_id))
+                return rank
+        if attempt == 0:
+            db.flush()
+            respace(db, owner_id, todo_id)
+    raise RuntimeError(f"no rank available in todo {todo_id}")
+
+
+def position(db: Session, step: TodoStep) -> int:
+    """0-based place of the step within its todo."""
+    return db.scalar(select(func.count()).where(
+        TodoStep.todo_id == step.todo_id,
+        or_(TodoStep.rank < step.rank, and_(TodoStep.rank == step.rank, TodoStep.id < step.id)),
+    ))
+
+
+def positions(db: Session, step_ids: Iterable[int]) -> Dict[int, int]:
+    """position() for many steps in one query."""
+    step_ids = list(step_ids)
+    if not step_ids:
+        return {}
+    pos = func.row_number().over(partition_by=TodoStep.todo_id, order_by=(TodoStep.rank, TodoStep.id))
+    ranked = (
+        select(TodoStep.id, (pos - 1).label("pos"))
+        .where(TodoStep.todo_id.in_(select(TodoStep.todo_id).where(TodoStep.id.in_(step_ids))))
+        .subquery()
+    )
+    return dict(db.execute(select(ranked.c.id, ranked.c.pos).where(ranked.c.id.in_(step_ids))).all())
+
+
+def backfill_ranks(db: Session, table: str) -> None:
+    """Rank steps that predate the rank column, by their old integer order."""
+    columns = {c["name"] for c in inspect(db.get_bind()).get_columns(table)}
+    order = '"order", id' if "order" in columns else "id"
+    rows = db.execute(text(f"SELECT todo_id, id FROM {table} ORDER BY todo_id, {order}")).all()
+    updates = []
+    for _, group in groupby(rows, key=lambda r: r.todo_id):
+        ids = [r.id for r in group]
+        updates += [{"id": i, "rank": r} for i, r in zip(ids, lexorank.spread(len(ids)))]
+    if updates:
+        db.execute(text(f"UPDATE {table} SET rank = :rank WHERE id = :id"), updates)
+
+
+def _respace_queued() -> int:
+    with _queued_lock:
+        todos = sorted(_queued)
+        _queued.clear()
+    for owner_id, todo_id in todos:
+        with SessionLocal() as db:  # one short transaction per todo
+            respace(db, owner_id, todo_id)
+            db.commit()
+    return len(todos)
+
+
+async def rebalance_periodically() -> None:
+    """Lifespan task: respace queued todos every STEP_REBALANCE_INTERVAL_SECONDS."""
+    while True:
+        await asyncio.sleep(STEP_REBALANCE_INTERVAL_SECONDS)
+        try:
+            n = await asyncio.to_thread(_respace_queued)
+            if n:
+                log.info("respaced step ranks of %d todos", n)
+        except Exception:
+            log.exception("step rank rebalancing failed")
+
+
+@event.listens_for(Session, "after_commit")
+def _queue_committed(session):
+    todos = session.info.pop("rebalance_todos", None)
+    if todos:
+        with _queued_lock:
+            _queued.update(todos)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_uncommitted(session):
+    session.info.pop("rebalance_todos", None)
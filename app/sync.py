@@ -0,0 +1,120 @@
+# app/sync.py
+"""Change log behind GET /sync.
+
+app.changes appends one row per recorded change inside the committing
+transaction, so the log and the data cannot disagree. A sync reads only
+the rows after the client's cursor and keeps the newest row per entity,
+which makes its cost follow the size of the change, not of the account.
+
+compact() drops rows superseded by a newer row for the same entity, plus
+tombstones older than SYNC_TOMBSTONE_DAYS. Pruning a tombstone raises that
+user's horizon. A cursor below the horizon may have missed a delete, so it
+gets a full reset.
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, exists, func, insert, select
+from sqlalchemy.orm import Session, aliased
+
+from .database import SessionLocal
+from .models import ChangeLog, SyncHorizon, User
+
+SYNC_TOMBSTONE_DAYS = int(os.getenv("SYNC_TOMBSTONE_DAYS", "30"))
+SYNC_COMPACT_INTERVAL_SECONDS = float(os.getenv("SYNC_COMPACT_INTERVAL_SECONDS", "3600"))
+
+log = logging.getLogger(__name__)
+
+
+def append(db: Session, changes: Iterable) -> None:
+    """Write app.changes.Change records to the log (called before commit)."""
+    now = datetime.utcnow()
+    rows = [{
+        "user_id": c.user_id, "entity": c.entity, "entity_id": c.entity_id,
+        "op": "delete" if c.op == "delete" else "upsert", "created_at": now,
+    } for c in changes if c.entity_id is not None]
+    if not rows:
+        return
+    if db.get_bind().dialect.name == "postgresql":
+        # Serialise each user's writers so their seqs commit in order and a
+        # cursor can never skip past a row that is still in flight.
+        user_ids = sorted({r["user_id"] for r in rows})
+        db.execute(select(User.id).where(User.id.in_(user_ids)).order_by(User.id).with_for_update())
+    db.execute(insert(ChangeLog), rows)
+
+
+def cursor_of(db: Session, user_id: int) -> int:
+    return db.scalar(select(func.max(ChangeLog.seq)).where(ChangeLog.user_id == user_id)) or 0
+
+
+def horizon_of(db: Session, user_id: int) -> int:
+    return db.scalar(select(SyncHorizon.seq).where(SyncHorizon.user_id == user_id)) or 0
+
+
+def changes_since(db: Session, user_id: int, since: int, limit: int) -> Tuple[List, bool]:
+    """Newest (seq, entity, entity_id, op) per entity after `since`, oldest first."""
+    latest = (
+        select(func.max(ChangeLog.seq).label("seq"))
+        .where(ChangeLog.user_id == user_id, ChangeLog.seq > since)
+        .group_by(ChangeLog.entity, ChangeLog.entity_id)
+        .subquery()
+    )
+    rows = db.execute(
+        select(ChangeLog.seq, ChangeLog.entity, ChangeLog.entity_id, ChangeLog.op)
+        .join(latest, ChangeLog.seq == latest.c.seq)
+        .order_by(ChangeLog.seq)
+        .limit(limit + 1)
+    ).all()
+    return rows[:limit], len(rows) > limit
+
+
+def compact(db: Session, now: Optional[datetime] = None) -> dict:
+    newer = aliased(ChangeLog)
+    superseded = db.execute(
+        delete(ChangeLog)
+        .where(exists().where(and_(
+            newer.user_id == ChangeLog.user_id,
+            newer.entity == ChangeLog.entity,
+            newer.entity_id == ChangeLog.entity_id,
+            newer.seq > ChangeLog.seq,
+        )))
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+    cutoff = (now or datetime.utcnow()) - timedelta(days=SYNC_TOMBSTONE_DAYS)
+    old = and_(ChangeLog.op == "delete", ChangeLog.created_at < cutoff)
+    pruned = 0
+    for user_id, max_seq in db.execute(
+        select(ChangeLog.user_id, func.max(ChangeLog.seq)).where(old).group_by(ChangeLog.user_id)
+    ).all():
+        horizon = db.get(SyncHorizon, user_id)
+        if horizon is None:
+            db.add(SyncHorizon(user_id=user_id, seq=max_seq))
+        else:
+            horizon.seq = max(horizon.seq, max_seq)
+        pruned += db.execute(
+            delete(ChangeLog).where(old, ChangeLog.user_id == user_id)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+    return {"superseded": superseded, "tombstones": pruned}
+
+
+def _compact_once() -> dict:
+    with SessionLocal() as db:
+        stats = compact(db)
+        db.commit()
+    return stats
+
+
+async def compact_periodically() -> None:
+    """Lifespan task: compact now and then every SYNC_COMPACT_INTERVAL_SECONDS."""
+    while True:
+        try:
+            stats = await asyncio.to_thread(_compact_once)
+            log.info("change log compacted: %s", stats)
+        except Exception:
+            log.exception("change log compaction failed")
+        await asyncio.sleep(SYNC_COMPACT_INTERVAL_SECONDS)
@@ -0,0 +1,102 @@
+# app/tags.py
+"""Tag get-or-create and todo<->tag link maintenance.
+
+Tag names are global and never deleted, so name -> id is cached
+in-process. New ids are only cached once their transaction commits.
+"""
+import os
+from typing import Dict, Iterable, List, Mapping, Optional
+
+from sqlalchemy import delete, event, select
+from sqlalchemy.orm import Session
+
+from .models import Tag, TodoTag
+from .utils.cache import TTLCache
+
+TAG_CACHE_SIZE = int(os.getenv("TAG_CACHE_SIZE", "50000"))
+MAX_TAG_LENGTH = 64
+
+_tag_ids = TTLCache(maxsize=TAG_CACHE_SIZE, ttl=float(os.getenv("TAG_CACHE_TTL_SECONDS", "86400")))
+
+
+def normalize(names: Optional[Iterable[str]]) -> List[str]:
+    """Strip, drop blanks and duplicates (keeping first-seen order)."""
+    seen: Dict[str, None] = {}
+    for name in names or ():
+        name = (name or "").strip()[:MAX_TAG_LENGTH]
+        if name:
+            seen.setdefault(name, None)
+    return list(seen)
+
+
+def _upsert_stmt(db: Session, names: List[str]):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as upsert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as upsert
+    stmt = upsert(Tag).values([{"name": n} for n in names])
+    # No-op update so RETURNING also yields rows that already existed.
+    return stmt.on_conflict_do_update(index_elements=["name"], set_={"name": stmt.excluded.name}) \
+        .returning(Tag.id, Tag.name)
+
+
+def lookup_ids(db: Session, names: Iterable[str]) -> Dict[str, int]:
+    """Existing tag ids for names (unknown names are simply absent)."""
+    found: Dict[str, int] = {}
+    missing = []
+    for name in names:
+        tag_id = _tag_ids.get(name)
+        if tag_id is None:
+            missing.append(name)
+        else:
+            found[name] = tag_id
+    if missing:
+        for tag_id, name in db.execute(select(Tag.id, Tag.name).where(Tag.name.in_(missing))):
+            found[name] = tag_id
+            _tag_ids.set(name, tag_id)
+    return found
+
+
+def get_or_create_ids(db: Session, names: Iterable[str]) -> Dict[str, int]:
+    """Tag ids for names, creating missing tags with a single upsert."""
+    names = normalize(names)
+    found: Dict[str, int] = {}
+    missing = []
+    for name in names:
+        tag_id = _tag_ids.get(name)
+        if tag_id is None:
+            missing.append(name)
+        else:
+            found[name] = tag_id
+    if missing:
+        pending = db.info.setdefault("pending_tag_ids", {})
+        for tag_id, name in db.execute(_upsert_stmt(db, missing)):
+            found[name] = tag_id
+            pending[name] = tag_id
+    return found
+
+
+def replace_links(db: Session, tags_by_todo: Mapping[int, Iterable[str]], chunk: int = 500) -> None:
+    """Make each todo's tag set exactly the given names (set-based)."""
+    wanted = {todo_id: normalize(names) for todo_id, names in tags_by_todo.items()}
+    if not wanted:
+        return
+    ids = get_or_create_ids(db, (n for names in wanted.values() for n in names))
+    todo_ids = list(wanted)
+    for i in range(0, len(todo_ids), chunk):
+        db.execute(delete(TodoTag).where(TodoTag.c.todo_id.in_(todo_ids[i:i + chunk])))
+    links = [{"todo_id": t, "tag_id": ids[n]} for t, names in wanted.items() for n in names]
+    if links:
+        db.execute(TodoTag.insert(), links)
+
+
+@event.listens_for(Session, "after_commit")
+def _cache_committed_tags(session):
+    for name, tag_id in session.info.pop("pending_tag_ids", {}).items():
+        _tag_ids.set(name, tag_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_uncommitted_tags(session):
+    session.info.pop("pending_tag_ids", None)
@@ -0,0 +1,128 @@
+# app/throttle.py
+"""Token-bucket throttling for the unauthenticated auth routes.
+
+/auth/login and /auth/seed_demo each cost a bcrypt hash or verify, so a
+scripted flood can keep every worker busy. Both routes take a dependency
+from this module. It spends one token from each of the caller's buckets
+(per client IP, and per account for logins) and answers 429 with
+Retry-After once a bucket is empty. It runs before the endpoint body, so a
+rejected request never reaches the database or the hashing pool.
+
+Buckets live in a memory-mapped table shared by every worker on the host
+(like app.versions). Keys hash into THROTTLE_SLOTS slots with a short probe.
+When the probe finds no free slot, the least recently used entry is
+evicted, which at worst forgives one key. Rates are "<burst>/<seconds>": a
+bucket holds `burst` tokens and refills all of them over `seconds`.
+
+Behind a reverse proxy, start uvicorn with --proxy-headers and
+--forwarded-allow-ips so request.client is the real client address.
+"""
+import math
+import os
+import struct
+import time
+from dataclasses import dataclass
+from hashlib import blake2b
+from typing import Iterable, Optional, Tuple
+
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import OAuth2PasswordRequestForm
+
+from .database import DATABASE_URL
+from .metrics import registry
+from .utils.shm import SharedBuffer, default_path
+
+THROTTLE_ENABLED = os.getenv("THROTTLE_ENABLED", "true").lower() in {"1", "true", "yes"}
+THROTTLE_SLOTS = int(os.getenv("THROTTLE_SLOTS", "65536"))
+_PROBE = 4
+
+_SLOT = struct.Struct("<Qdd")  # key hash (0 = free), tokens, last update (unix seconds)
+
+
+@dataclass(frozen=True)
+class Rate:
+    burst: int
+    seconds: float
+
+    @property
+    def per_second(self) -> float:
+        return self.burst / self.seconds
+
+
+def parse_rate(spec: str) -> Rate:
+    burst, _, seconds = spec.partition("/")
+    return Rate(int(burst), float(seconds or 1))
+
+
+LOGIN_PER_IP = parse_rate(os.getenv("THROTTLE_LOGIN_PER_IP", "20/60"))
+LOGIN_PER_ACCOUNT = parse_rate(os.getenv("THROTTLE_LOGIN_PER_ACCOUNT", "5/60"))
+SEED_DEMO_PER_IP = parse_rate(os.getenv("THROTTLE_SEED_DEMO_PER_IP", "10/3600"))
+
+
+class BucketStore:
+    def __init__(self, path: str = "memory", slots: int = THROTTLE_SLOTS):
+        self.slots = slots
+        self._shared = SharedBuffer(path, slots * _SLOT.size)
+        self._buf = self._shared.buf
+
+    def _find(self, h: int) -> Tuple[int, bool]:
+        """(offset, found) for h; if absent, the free or least recently used slot."""
+        victim, victim_seen = 0, math.inf
+        for i in range(_PROBE):
+            off = ((h + i) % self.slots) * _SLOT.size
+            key, _, seen = _SLOT.unpack_from(self._buf, off)
+            if key == h:
+                return off, True
+            if seen < victim_seen:
+                victim, victim_seen = off, seen
+        return victim, False
+
+    def take(self, key: str, rate: Rate, now: Optional[float] = None) -> float:
+        """Spend one token: 0.0 if allowed, else seconds until a token is back."""
+        h = int.from_bytes(blake2b(key.encode(), digest_size=8).digest(), "little") | 1
+        now = time.time() if now is None else now
+        with self._shared.locked():
+            off, found = self._find(h)
+            tokens = float(rate.burst)
+            if found:
+                _, tokens, seen = _SLOT.unpack_from(self._buf, off)
+                tokens = min(rate.burst, tokens + max(0.0, now - seen) * rate.per_second)
+            if tokens < 1:
+                return (1 - tokens) / rate.per_second
+            _SLOT.pack_into(self._buf, off, h, tokens - 1, now)
+            return 0.0
+
+
+buckets = BucketStore(os.getenv("THROTTLE_FILE") or default_path("throttle", DATABASE_URL))
+
+
+def client_ip(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+
+def enforce(endpoint: str, limits: Iterable[Tuple[str, str, Rate]]) -> None:
+    """Spend a token per (scope, key, rate); 429 on the first empty bucket."""
+    if not THROTTLE_ENABLED:
+        return
+    for scope, key, rate in limits:
+        wait = buckets.take(f"{endpoint}:{scope}:{key}", rate)
+        if wait:
+            registry.inc("auth_throttled_total", (("endpoint", endpoint), ("scope", scope)))
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many attempts, please retry later",
+                headers={"Retry-After": str(math.ceil(wait))},
+            )
+
+
+# async: no I/O beyond a brief flock, so no threadpool hop. The form
+# dependency is shared with the endpoint's, so the body is parsed once.
+async def throttle_login(request: Request, form: OAuth2PasswordRequestForm = Depends()) -> None:
+    enforce("login", [
+        ("ip", client_ip(request), LOGIN_PER_IP),
+        ("account", form.username.strip().lower(), LOGIN_PER_ACCOUNT),
+    ])
+
+
+async def throttle_seed_demo(request: Request) -> None:
+    enforce("seed_demo", [("ip", client_ip(request), SEED_DEMO_PER_IP)])
@@ -1,34 +1,104 @@
-from uuid import uuid4
-from typing import List
-from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Iterator
+from datetime import datetime, timezone
 from ..models import Todo
 
+# Bump when the rendered format changes so cached feeds are revalidated.
+ICS_FORMAT_VERSION = 2
+
 def _fmt(dt: datetime) -> str:
     if dt.tzinfo is None:
         dt = dt.replace(tzinfo=timezone.utc)
     return dt.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
 
-def todos_to_ics(todos: List[Todo]) -> str:
-    lines = [
-        "BEGIN:VCALENDAR",
-        "VERSION:2.0",
-        "PRODID:-//Todo+Time Manager//EN",
-        "CALSCALE:GREGORIAN",
-    ]
+def _date(dt: datetime) -> str:
+    return dt.strftime("%Y%m%d")
+
+def _text(value: str) -> str:
+    """Escape a TEXT property value (RFC 5545 3.3.11)."""
+    return (
+        (value or "")
+        .replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+def iter_ics(todos: Iterable[Todo]) -> Iterator[str]:
+    """Render todos with a due date as all-day VEVENTs, one chunk per event.
+
+    Output depends only on the todo rows (UIDs are derived from ids, DTSTAMP
+    from updated_at), so the same data always renders to the same bytes.
+    """
+    yield "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//Todo+Pomodoro//EN\r\nCALSCALE:GREGORIAN\r\n"
     for t in todos:
         if not t.due_date:
             continue
-        uid = f"{t.id}-{uuid4()}@todo-time"
-        status = "COMPLETED" if t.completed else "NEEDS-ACTION"
-        lines += [
-            "BEGIN:VTODO",
-            f"UID:{uid}",
-            f"DTSTAMP:{_fmt(t.created_at)}",
-            f"DUE:{_fmt(t.due_date)}",
-            f"SUMMARY:{t.title}",
-            f"DESCRIPTION:{(t.notes or '').replace('\\n',' ')}",
-            f"STATUS:{status}",
-            "END:VTODO",
-        ]
-    lines.append("END:VCALENDAR")
-    return "\r\n".join(lines)
+        yield (
+            "BEGIN:VEVENT\r\n"
+            f"UID:todo-{t.id}@todo-pomodoro\r\n"
+            f"DTSTAMP:{_fmt(t.updated_at or t.created_at)}\r\n"
+            f"SUMMARY:{_text(t.title)}\r\n"
+            f"DESCRIPTION:{_text(t.notes)}\r\n"
+            f"DTSTART;VALUE=DATE:{_date(t.due_date)}\r\n"
+            f"DTEND;VALUE=DATE:{_date(t.due_date)}\r\n"
+            f"STATUS:{'COMPLETED' if t.completed else 'NEEDS-ACTION'}\r\n"
+            "END:VEVENT\r\n"
+        )
+    yield "END:VCALENDAR\r\n"
+
+def todos_to_ics(todos: Iterable[Todo]) -> str:
+    return "".join(iter_ics(todos))
+
+def _untext(value: str) -> str:
+    """Inverse of _text."""
+    if "\\" not in value:
+        return value
+    out, i = [], 0
+    while i < len(value):
+        c = value[i]
+        if c == "\\" and i + 1 < len(value):
+            i += 1
+            c = "\n" if value[i] in "nN" else value[i]
+        out.append(c)
+        i += 1
+    return "".join(out)
+
+def iter_ics_components(lines: Iterable[str], kinds=("VEVENT", "VTODO")) -> Iterator[Dict[str, str]]:
+    """Parse an ICS stream one component at a time (for imports).
+
+    Yields {"KIND": "VEVENT", "SUMMARY": ..., ...} per VEVENT/VTODO with
+    folded lines joined and TEXT values unescaped. Property parameters
+    (TZID, VALUE=DATE, ...) are dropped, and the first occurrence of a
+    property wins. Only the current component is held in memory.
+    """
+    current = None
+    pending = ""
+
+    def emit(line: str):
+        nonlocal current
+        name, _, value = line.partition(":")
+        name = name.split(";", 1)[0].upper()
+        if name == "BEGIN" and value.upper() in kinds:
+            current = {"KIND": value.upper()}
+        elif name == "END" and current is not None and value.upper() == current["KIND"]:
+            done, current = current, None
+            return done
+        elif current is not None and name and name not in current:
+            current[name] = _untext(value) if name in ("SUMMARY", "DESCRIPTION", "CATEGORIES") else value
+        return None
+
+    for raw in lines:
+        line = raw.rstrip("\r\n")
+        if line[:1] in (" ", "\t"):  # folded continuation
+            pending += line[1:]
+            continue
+        if pending:
+            done = emit(pending)
+            if done is not None:
+                yield done
+        pending = line
+    if pending:
+        done = emit(pending)
+        if done is not None:
+            yield done
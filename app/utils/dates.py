@@ -1,7 +1,8 @@
 # app/utils/dates.py
 from __future__ import annotations
+import re
 from datetime import datetime
-from typing import Optional
+from typing import Callable, Optional, Sequence, Tuple
 
 KNOWN_FORMATS = (
     "%d/%m/%Y",
@@ -29,3 +30,63 @@ def parse_any_dt(value: Optional[str | datetime]) -> Optional[datetime]:
         except Exception:
             continue
     return None
+
+
+def _iso(s: str) -> datetime:
+    return datetime.fromisoformat(s.replace("Z", "+00:00")).replace(tzinfo=None)
+
+
+_FIELDS = {"%Y": r"(?P<Y>\d{4})", "%m": r"(?P<m>\d{1,2})", "%d": r"(?P<d>\d{1,2})",
+           "%H": r"(?P<H>\d{1,2})", "%M": r"(?P<M>\d{1,2})", "%S": r"(?P<S>\d{1,2})"}
+
+
+def _strptime(fmt: str) -> Callable[[str], datetime]:
+    """A parser for fmt; numeric-only formats compile to a regex (~5x strptime)."""
+    tokens = re.findall(r"%.|[^%]+", fmt)
+    if any(t.startswith("%") and t not in _FIELDS for t in tokens):
+        return lambda s: datetime.strptime(s, fmt)
+    match = re.compile("".join(_FIELDS.get(t) or re.escape(t) for t in tokens)).fullmatch
+
+    def parse(s: str) -> datetime:
+        m = match(s)
+        if m is None:
+            raise ValueError(f"{s!r} does not match {fmt!r}")
+        g = m.groupdict()
+        return datetime(int(g["Y"]), int(g["m"]), int(g["d"]),
+                        int(g.get("H", 0)), int(g.get("M", 0)), int(g.get("S", 0)))
+    return parse
+
+
+class ColumnDateParser:
+    """parse_any_dt for a column of values that share one format (imports).
+
+    The first value that parses fixes the column's parser, so later values
+    cost one parse attempt instead of a walk through KNOWN_FORMATS. A value
+    that doesn't fit triggers detection again and may switch the parser.
+    Unlike parse_any_dt, an unparseable value raises ValueError.
+    """
+
+    def __init__(self, formats: Sequence[str] = KNOWN_FORMATS):
+        self._parsers: Tuple[Callable[[str], datetime], ...] = (_iso, *map(_strptime, formats))
+        self._parse = _iso
+
+    def __call__(self, value: Optional[str | datetime]) -> Optional[datetime]:
+        if value is None or value == "":
+            return None
+        if isinstance(value, datetime):
+            return value
+        s = str(value).strip()
+        if not s:
+            return None
+        try:
+            return self._parse(s)
+        except ValueError:
+            pass
+        for parse in self._parsers:
+            try:
+                dt = parse(s)
+            except ValueError:
+                continue
+            self._parse = parse
+            return dt
+        raise ValueError(f"unrecognised date {s[:40]!r}")
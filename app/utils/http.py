@@ -0,0 +1,93 @@
+# app/utils/http.py
+from __future__ import annotations
+import zlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Iterable, Iterator, Optional
+
+from fastapi import Request
+
+
+def _qvalue(params: list[str]) -> float:
+    """The q parameter of one Accept-* entry; unparsable or out of range counts as 0."""
+    for param in params:
+        name, _, value = param.partition("=")
+        if name.strip().lower() == "q":
+            try:
+                q = float(value.strip())
+            except ValueError:
+                return 0.0
+            return q if 0 <= q <= 1 else 0.0  # also rejects nan
+    return 1.0
+
+
+def accepts_gzip(request: Request) -> bool:
+    """True if Accept-Encoding allows gzip (RFC 9110 12.5.3).
+
+    An explicit gzip entry wins over `*`, whatever their order, and q=0
+    refuses the coding.
+    """
+    gzip_q = any_q = None
+    for part in request.headers.get("accept-encoding", "").split(","):
+        coding, *params = part.split(";")
+        coding = coding.strip().lower()
+        if coding == "gzip":
+            gzip_q = _qvalue(params)
+        elif coding == "*":
+            any_q = _qvalue(params)
+    q = gzip_q if gzip_q is not None else any_q
+    return q is not None and q > 0
+
+
+def gzip_stream(chunks: Iterable[str | bytes], level: int = 6) -> Iterator[bytes]:
+    """Incrementally gzip a stream of text/bytes chunks."""
+    z = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+    for chunk in chunks:
+        data = z.compress(chunk.encode() if isinstance(chunk, str) else chunk)
+        if data:
+            yield data
+    yield z.flush()
+
+
+def http_date(dt: datetime) -> str:
+    """Format a naive-UTC or aware datetime as an IMF-fixdate header value."""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return format_datetime(dt.astimezone(timezone.utc), usegmt=True)
+
+
+def settled(dt: Optional[datetime], now: Optional[datetime] = None) -> Optional[datetime]:
+    """dt, or None while it's still in the current second (naive UTC).
+
+    HTTP dates have whole-second resolution, so a Last-Modified issued during
+    the second it names would hide any later write in that same second from
+    If-Modified-Since.
+    """
+    if dt is None:
+        return None
+    now = now or datetime.utcnow()
+    return dt if dt.replace(microsecond=0) < now.replace(microsecond=0) else None
+
+
+def private_cache_headers(etag: str) -> dict:
+    """Per-user representation: revalidate every time, never share across users."""
+    return {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Authorization"}
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """Evaluate If-None-Match / If-Modified-Since (RFC 9110 13.2.2 order)."""
+    inm = request.headers.get("if-none-match")
+    if inm is not None:
+        tags = {t.strip() for t in inm.split(",")}
+        return "*" in tags or etag in tags or f"W/{etag}" in tags
+    ims = request.headers.get("if-modified-since")
+    if ims and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(ims)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        lm = last_modified if last_modified.tzinfo else last_modified.replace(tzinfo=timezone.utc)
+        return lm.replace(microsecond=0) <= since
+    return False
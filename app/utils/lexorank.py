@@ -0,0 +1,57 @@
+# app/utils/lexorank.py
+"""Fractional sort keys: strings that order like the numbers 0.<digits>.
+
+between(a, b) returns a key strictly between two keys, so moving an item
+means rewriting only that item's key. Keys use base-36 digits (0-9a-z),
+which sort the same under byte order and the usual database collations.
+They never end in "0", so there is always room between two of them.
+Repeated inserts at one spot make keys longer; spread() deals a fresh,
+evenly spaced set for rebalancing.
+"""
+from typing import List, Optional
+
+DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+_BASE = len(DIGITS)
+_INDEX = {d: i for i, d in enumerate(DIGITS)}
+
+
+def between(lo: Optional[str], hi: Optional[str]) -> str:
+    """A key k with lo < k < hi; None/"" for lo or hi means unbounded."""
+    lo, hi = lo or "", hi or None
+    if hi is not None and lo >= hi:
+        raise ValueError(f"{lo!r} is not below {hi!r}")
+    if lo.endswith("0") or (hi is not None and hi.endswith("0")):
+        raise ValueError("keys can't end in 0")
+    prefix = ""
+    while True:
+        if hi is not None:
+            # Copy the digits lo and hi share (lo padded with zeros).
+            n = 0
+            while n < len(hi) and (lo[n] if n < len(lo) else "0") == hi[n]:
+                n += 1
+            prefix, lo, hi = prefix + hi[:n], lo[n:], hi[n:]
+        a = _INDEX[lo[0]] if lo else 0
+        b = _INDEX[hi[0]] if hi is not None else _BASE
+        if b - a > 1:
+            return prefix + DIGITS[(a + b) // 2]
+        # Adjacent digits: hi[0] alone fits if hi goes on; otherwise keep lo's
+        # digit and find room above the rest of lo.
+        if hi is not None and len(hi) > 1:
+            return prefix + hi[0]
+        prefix, lo, hi = prefix + DIGITS[a], lo[1:], None
+
+
+def spread(n: int) -> List[str]:
+    """n increasing keys of equal width spaced evenly over (0, 1)."""
+    width = 1
+    while _BASE ** width <= n:
+        width += 1
+    step = _BASE ** width // (n + 1)
+    keys = []
+    for i in range(1, n + 1):
+        value, digits = i * step, []
+        for _ in range(width):
+            value, d = divmod(value, _BASE)
+            digits.append(DIGITS[d])
+        keys.append("".join(reversed(digits)).rstrip("0"))
+    return keys
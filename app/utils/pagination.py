@@ -0,0 +1,31 @@
+# app/utils/pagination.py
+from __future__ import annotations
+import base64
+from datetime import datetime
+from typing import Tuple
+
+
+def encode_cursor(created_at: datetime, id: int) -> str:
+    """Opaque keyset cursor for a (created_at, id) position."""
+    raw = f"{created_at.isoformat()}|{id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+_MAX_ID = 2 ** 63 - 1  # BIGINT / SQLite INTEGER; larger ids can't be bound
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of encode_cursor; raises ValueError on anything malformed.
+
+    Cursors aren't signed, so a decoded value is also checked to be one
+    encode_cursor could have made: a naive (UTC) timestamp and a positive id.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        ts, _, id_ = raw.partition("|")
+        created_at, id = datetime.fromisoformat(ts), int(id_)
+    except Exception as exc:
+        raise ValueError("invalid cursor") from exc
+    if created_at.tzinfo is not None or not 0 < id <= _MAX_ID:
+        raise ValueError("invalid cursor")
+    return created_at, id
@@ -0,0 +1,53 @@
+# app/utils/shm.py
+"""Small fixed-size buffers shared by every worker on a host.
+
+The buffer is a memory-mapped file, and writers serialise on a thread lock
+plus flock. path="memory" gives a private bytearray instead, for a single
+worker or a :memory: database.
+"""
+import hashlib
+import mmap
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: in-process locking only
+    fcntl = None
+
+
+def default_path(kind: str, database_url: str) -> str:
+    """Per-database file in the temp dir, or "memory" for an in-memory DB."""
+    if ":memory:" in database_url or "mode=memory" in database_url:
+        return "memory"
+    tag = hashlib.sha1(database_url.encode()).hexdigest()[:12]
+    return os.path.join(tempfile.gettempdir(), f"todo-{kind}-{tag}.bin")
+
+
+class SharedBuffer:
+    def __init__(self, path: str, size: int):
+        self.path = path
+        self._lock = threading.Lock()
+        self._fd: Optional[int] = None
+        if path == "memory":
+            self.buf = bytearray(size)
+        else:
+            self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+            if os.fstat(self._fd).st_size < size:
+                os.ftruncate(self._fd, size)
+            self.buf = mmap.mmap(self._fd, size)
+
+    @contextmanager
+    def locked(self):
+        with self._lock:
+            if self._fd is None or fcntl is None:
+                yield
+                return
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
@@ -0,0 +1,63 @@
+# app/utils/timing.py
+"""Per-request counters shared by the SQL hooks, the response classes and
+the metrics middleware. The middleware installs a RequestStats in a
+ContextVar; threadpool and run_sync calls inherit the context, so SQL
+executed on their behalf is counted against the right request."""
+from __future__ import annotations
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class RequestStats:
+    path: str = ""
+    sql_count: int = 0
+    sql_seconds: float = 0.0
+    slow_queries: int = 0
+    serialize_seconds: float = 0.0
+
+
+current_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+@contextmanager
+def timing_serialization():
+    stats = current_stats.get()
+    if stats is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.serialize_seconds += time.perf_counter() - t0
+
+
+class BootTimer:
+    """Wall-clock split of worker startup into phases, for logs and /health.
+
+    The clock starts when the app package is first imported, so the first
+    phase covers importing the app and everything it pulls in.
+    """
+
+    def __init__(self):
+        self.started = self._last = time.perf_counter()
+        self.phases: dict = {}
+
+    def mark(self, phase: str) -> None:
+        """End `phase` now; it began where the previous phase ended."""
+        now = time.perf_counter()
+        self.phases[phase] = now - self._last
+        self._last = now
+
+    def report(self) -> dict:
+        return {
+            **{f"{name}_ms": round(secs * 1000, 1) for name, secs in self.phases.items()},
+            "total_ms": round((self._last - self.started) * 1000, 1),
+        }
+
+
+boot = BootTimer()
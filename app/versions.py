@@ -0,0 +1,81 @@
+# app/versions.py
+"""Per-user data versions for cheap conditional GETs.
+
+Every committed write bumps its owner's version (see app.changes); read
+endpoints derive their ETag from it, so an unchanged If-None-Match is
+answered without touching the database.
+
+Versions live in a small memory-mapped file so that all workers on a host
+see the same numbers. A version is a nanosecond timestamp, which keeps it
+monotonic across restarts. Users hash into a fixed number of slots, and a
+collision only means an extra cache miss. Unwritten slots report the
+store's epoch. reset() moves the epoch forward, which changes every ETag
+at once; it runs at startup because the DB may have changed while the app
+was down.
+
+DATA_VERSION_FILE=memory keeps the store in-process, which is right for a
+single worker or a :memory: database.
+"""
+import os
+import struct
+import time
+import zlib
+
+from fastapi import Request
+
+from .database import DATABASE_URL
+from .utils.shm import SharedBuffer, default_path
+
+DATA_VERSION_SLOTS = int(os.getenv("DATA_VERSION_SLOTS", "65536"))
+
+_MAGIC = b"TDVERS01"
+_HEADER = struct.Struct("<8sq")  # magic, epoch
+_SLOT = struct.Struct("<q")
+
+
+class VersionStore:
+    def __init__(self, path: str = "memory", slots: int = DATA_VERSION_SLOTS):
+        self.slots = slots
+        self.path = path
+        self._shared = SharedBuffer(path, _HEADER.size + slots * _SLOT.size)
+        self._buf = self._shared.buf
+        self._locked = self._shared.locked
+        with self._locked():
+            magic, _ = _HEADER.unpack_from(self._buf, 0)
+            if magic != _MAGIC:
+                _HEADER.pack_into(self._buf, 0, _MAGIC, time.time_ns())
+
+    def _offset(self, user_id: int) -> int:
+        return _HEADER.size + (user_id % self.slots) * _SLOT.size
+
+    @property
+    def epoch(self) -> int:
+        return _HEADER.unpack_from(self._buf, 0)[1]
+
+    def get(self, user_id: int) -> int:
+        return max(_SLOT.unpack_from(self._buf, self._offset(user_id))[0], self.epoch)
+
+    def bump(self, *user_ids: int) -> None:
+        with self._locked():
+            for user_id in set(user_ids):
+                off = self._offset(user_id)
+                current = max(_SLOT.unpack_from(self._buf, off)[0], self.epoch)
+                _SLOT.pack_into(self._buf, off, max(time.time_ns(), current + 1))
+
+    def reset(self) -> None:
+        """Invalidate every version (e.g. after a restart or restore)."""
+        with self._locked():
+            _HEADER.pack_into(self._buf, 0, _MAGIC, max(time.time_ns(), self.epoch + 1))
+
+
+versions = VersionStore(os.getenv("DATA_VERSION_FILE") or default_path("versions", DATABASE_URL))
+
+
+def etag(request: Request, scope: str, user_id: int, *extra: object) -> str:
+    """Strong ETag for `scope` as seen by `user_id` at the current version.
+
+    The query string and any `extra` inputs (e.g. today's date) are folded in,
+    so different views of the same data never share a tag.
+    """
+    salt = "|".join([request.url.query, *map(str, extra)])
+    return f'"{scope}-{user_id}-{versions.get(user_id):x}-{zlib.crc32(salt.encode()):08x}"'
@@ -0,0 +1,5 @@
+"""Performance benchmarks. Run modules with `python -m benchmarks.<name>`.
+
+They drive the app in-process (needs `httpx` for FastAPI's TestClient) against
+a throwaway SQLite file, so nothing here touches ./app.db.
+"""
@@ -0,0 +1,84 @@
+# benchmarks/async_vs_sync.py
+"""Sustained concurrent GET /todos/?limit=50 in DB_MODE=sync vs DB_MODE=async.
+
+    python -m benchmarks.async_vs_sync --concurrency 200 --requests 20
+
+Each mode runs in its own interpreter (DB_MODE is read at import time).
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+from .common import asgi_request, create_user, percentile, seed_todos, use_temp_database
+
+
+async def _drive(concurrency: int, per_client: int, path: str) -> dict:
+    from app.main import app
+
+    _, headers = create_user()
+    latencies: list[float] = []
+    errors = 0
+
+    async def client() -> None:
+        nonlocal errors
+        for _ in range(per_client):
+            t0 = time.perf_counter()
+            try:
+                status = await asgi_request(app, "GET", path, headers)
+            except Exception:  # e.g. pool timeouts; ServerErrorMiddleware re-raises
+                status = 500
+            latencies.append(time.perf_counter() - t0)
+            errors += status != 200
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    from app.database import async_engine
+    if async_engine is not None:
+        await async_engine.dispose()  # pooled aiosqlite threads would keep the process alive
+    return {
+        "requests": len(latencies), "errors": errors, "seconds": round(elapsed, 3),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+    }
+
+
+def _child(args) -> None:
+    use_temp_database()
+    from app.database import engine
+    from app.schema import init_schema
+
+    init_schema(engine)
+    seed_todos(1, args.todos)  # first user created below gets id 1
+    print(json.dumps(asyncio.run(_drive(args.concurrency, args.requests, args.path))))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--concurrency", type=int, default=200)
+    ap.add_argument("--requests", type=int, default=20, help="requests per concurrent client")
+    ap.add_argument("--todos", type=int, default=500)
+    ap.add_argument("--path", default="/todos/?limit=50")
+    ap.add_argument("--child", choices=["sync", "async"], help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.child:
+        return _child(args)
+
+    print(f"{'mode':>6} {'requests':>9} {'errors':>7} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    for mode in ("sync", "async"):
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.async_vs_sync", "--child", mode, *sys.argv[1:]],
+            env={**os.environ, "DB_MODE": mode}, capture_output=True, text=True, check=True,
+        ).stdout.strip().splitlines()[-1]
+        r = json.loads(out)
+        print(f"{mode:>6} {r['requests']:>9} {r['errors']:>7} {r['rps']:>8} {r['p50_ms']:>8} {r['p95_ms']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+# benchmarks/common.py
+from __future__ import annotations
+import asyncio
+import os
+import tempfile
+import threading
+from datetime import datetime, timedelta
+
+
+def use_temp_database(name: str = "bench.db") -> str:
+    """Point DATABASE_URL at a fresh temp SQLite file. Call before importing app."""
+    path = os.path.join(tempfile.mkdtemp(prefix="todo-bench-"), name)
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    os.environ.setdefault("BCRYPT_ROUNDS", "4")
+    return path
+
+
+def rss_mb() -> float:
+    """Current resident set size in MiB (Linux /proc, else peak via resource)."""
+    try:
+        with open("/proc/self/status") as fh:
+            for line in fh:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class PeakRss:
+    """Sample RSS on a background thread; `peak` is the high-water mark in MiB."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.start = self.peak = 0.0
+        self._stop = threading.Event()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, rss_mb())
+
+    def __enter__(self) -> "PeakRss":
+        self.start = self.peak = rss_mb()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, rss_mb())
+
+
+def seed_todos(owner_id: int, count: int, steps_per_todo: int = 2, batch: int = 5000) -> None:
+    """Bulk-insert synthetic todos (+ steps) for one user with Core inserts."""
+    from sqlalchemy import insert, select, func
+    from app.database import engine
+    from app import models
+    from app.utils import lexorank
+
+    base = datetime(2024, 1, 1)
+    with engine.begin() as conn:
+        start_id = (conn.execute(select(func.max(models.Todo.id))).scalar() or 0) + 1
+        for lo in range(0, count, batch):
+            ids = range(start_id + lo, start_id + min(lo + batch, count))
+            conn.execute(insert(models.Todo), [
+                {
+                    "id": i, "owner_id": owner_id, "title": f"Synthetic todo {i}",
+                    "notes": "lorem ipsum " * 4, "completed": i % 3 == 0,
+                    "priority": 1 + i % 3, "estimate_minutes": 25,
+                    "created_at": base + timedelta(minutes=i), "updated_at": base + timedelta(minutes=i),
+                    "due_date": base + timedelta(days=i % 90),
+                }
+                for i in ids
+            ])
+            if steps_per_todo:
+                ranks = lexorank.spread(steps_per_todo)
+                conn.execute(insert(models.TodoStep), [
+                    {"todo_id": i, "text": f"step {n}", "done": False, "rank": ranks[n]}
+                    for i in ids for n in range(steps_per_todo)
+                ])
+
+
+def create_user(email: str = "bench@example.com", password: str = "bench-password") -> tuple[int, dict]:
+    """Insert a user directly and return (user_id, auth headers)."""
+    from app import models
+    from app.database import SessionLocal
+    from app.security import create_access_token, get_password_hash
+
+    with SessionLocal() as db:
+        user = models.User(email=email, hashed_password=get_password_hash(password))
+        db.add(user)
+        db.commit()
+        return user.id, {"Authorization": f"Bearer {create_access_token({'sub': email})}"}
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def asgi_request(app, method: str, path: str, headers: dict | None = None, on_chunk=None,
+                       body: bytes = b"") -> int:
+    """Drive one request straight through the ASGI interface.
+
+    Unlike TestClient/httpx transports, the body is never buffered: every
+    chunk goes to on_chunk(bytes) and is dropped. Returns the status code.
+    """
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": method, "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": query.encode(), "root_path": "",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+        "client": ("127.0.0.1", 50000), "server": ("testserver", 80),
+    }
+    status = 0
+    sent = False
+    done = asyncio.Event()
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await done.wait()  # client stays connected until the response is complete
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body" and on_chunk:
+            on_chunk(message.get("body", b""))
+
+    try:
+        await app(scope, receive, send)
+    finally:
+        done.set()
+    return status
+
+
+def register(client, email: str = "bench@example.com", password: str = "bench-password") -> dict:
+    """Create a user through the API and return auth headers for it."""
+    client.post("/auth/register", json={"email": email, "password": password})
+    token = client.post("/auth/login", data={"username": email, "password": password}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
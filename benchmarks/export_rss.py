@@ -0,0 +1,50 @@
+# benchmarks/export_rss.py
+"""RSS while streaming /todos/export.csv for growing account sizes.
+
+    python -m benchmarks.export_rss --rows 10000 100000
+
+A streaming export shows roughly the same peak RSS growth for every size.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import time
+
+from .common import asgi_request, register, rss_mb, seed_todos, use_temp_database
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    ap.add_argument("--gzip", action="store_true", help="request Content-Encoding: gzip")
+    args = ap.parse_args()
+
+    use_temp_database()
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    print(f"{'rows':>8} {'bytes':>12} {'seconds':>8} {'rss start':>10} {'rss peak':>10} {'growth':>8}")
+    with TestClient(app) as client:
+        for n, rows in enumerate(args.rows):
+            headers = register(client, email=f"export{n}@example.com")
+            user_id = client.get("/auth/me", headers=headers).json()["id"]
+            seed_todos(user_id, rows)
+            headers["Accept-Encoding"] = "gzip" if args.gzip else "identity"
+
+            start = peak = rss_mb()
+            size = 0
+
+            def on_chunk(chunk: bytes) -> None:
+                nonlocal size, peak
+                size += len(chunk)
+                peak = max(peak, rss_mb())
+
+            t0 = time.perf_counter()
+            status = asyncio.run(asgi_request(app, "GET", "/todos/export.csv", headers, on_chunk))
+            assert status == 200, status
+            elapsed = time.perf_counter() - t0
+            print(f"{rows:>8} {size:>12} {elapsed:>8.2f} {start:>9.1f}M {peak:>9.1f}M {peak - start:>7.1f}M")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+# benchmarks/load.py
+"""Load suite: seeds synthetic data, drives the real app over ASGI, and
+reports latency percentiles, throughput and peak RSS per endpoint.
+
+    python -m benchmarks.load --users 20 --todos 2000 --save-baseline base.json
+    python -m benchmarks.load --users 20 --todos 2000 --baseline base.json --budget 0.2
+
+Requests go straight into the ASGI app (no sockets, no buffering client),
+with --concurrency in flight at a time. Each request acts as a randomly
+chosen seeded user. Tokens are minted directly, except in the auth.login
+scenario, which runs the real bcrypt check. Its errors are mostly 503s
+from the hashing pool shedding load when --concurrency exceeds it.
+
+With --baseline, a scenario regresses when its p95 grows, its throughput
+falls, or its peak RSS growth rises by more than --budget (a fraction; RSS
+also gets 5 MiB of slack). Any regression makes the exit status 1.
+--db reuses an already seeded file (see benchmarks.seed), and --only
+picks scenarios by name prefix.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+from urllib.parse import urlencode
+
+from .common import PeakRss, asgi_request, percentile, use_temp_database
+
+Request = tuple  # (method, path, headers, body)
+
+
+@dataclass
+class Scenario:
+    name: str
+    make: Callable[[int], Request]
+    on_body: Optional[Callable[[int, bytes], None]] = None
+    share: float = 1.0  # fraction of --requests to run (exports are expensive)
+
+
+class Workload:
+    def __init__(self, users: list[tuple[int, str]], password: str, seed: int):
+        from app.security import create_access_token
+
+        self.rnd = random.Random(seed)
+        self.password = password
+        self.users = [(uid, email, {"Authorization": f"Bearer {create_access_token({'sub': email})}"})
+                      for uid, email in users]
+        self.created: list[tuple[dict, int]] = []   # (auth headers, todo id)
+        self.running: list[tuple[dict, int]] = []   # (auth headers, pomodoro id)
+
+    def auth(self) -> dict:
+        return self.rnd.choice(self.users)[2]
+
+    def get(self, path: str) -> Callable[[int], Request]:
+        return lambda i: ("GET", path, {**self.auth(), "Accept-Encoding": "identity"}, b"")
+
+    def scenarios(self) -> list[Scenario]:
+        def json_body(method, path, headers, payload):
+            return method, path, {**headers, "Content-Type": "application/json"}, json.dumps(payload).encode()
+
+        def login(i):
+            _, email, _ = self.rnd.choice(self.users)
+            body = urlencode({"username": email, "password": self.password}).encode()
+            return "POST", "/auth/login", {"Content-Type": "application/x-www-form-urlencoded"}, body
+
+        pending_headers: dict[int, dict] = {}
+
+        def create(i):
+            headers = pending_headers[i] = self.auth()
+            return json_body("POST", "/todos/", headers, {"title": f"bench {i}", "tags": ["bench"]})
+
+        def created(i, body):
+            self.created.append((pending_headers.pop(i), json.loads(body)["id"]))
+
+        def update(i):
+            headers, todo_id = self.created[i % len(self.created)]
+            return json_body("PUT", f"/todos/{todo_id}", headers, {"completed": i % 2 == 0, "title": f"edited {i}"})
+
+        def start(i):
+            headers = pending_headers[i] = self.auth()
+            return json_body("POST", "/pomodoro/start", headers, {"duration_minutes": 25})
+
+        def started(i, body):
+            self.running.append((pending_headers.pop(i), json.loads(body)["id"]))
+
+        def stop(i):
+            headers, pomodoro_id = self.running[i % len(self.running)]
+            return json_body("POST", "/pomodoro/stop", headers, {"pomodoro_id": pomodoro_id})
+
+        def bulk(i):
+            ops = [{"op": "create", "data": {"title": f"bulk {i}.{n}"}} for n in range(20)]
+            return json_body("POST", "/todos/bulk", self.auth(), {"ops": ops})
+
+        def delete(i):
+            headers, todo_id = self.created[i % len(self.created)]
+            return "DELETE", f"/todos/{todo_id}", headers, b""
+
+        return [
+            Scenario("auth.login", login, share=0.25),
+            *(Scenario(f"todos.list.{f}", self.get(f"/todos/?filter={f}")) for f in ("all", "done", "pending", "urgent")),
+            Scenario("todos.page", self.get("/todos/?limit=100")),
+            Scenario("todos.search", self.get("/todos/search?q=report")),
+            Scenario("pomodoro.summary", self.get("/pomodoro/summary?days=30&group_by=day")),
+            Scenario("export.csv", self.get("/todos/export.csv"), share=0.1),
+            Scenario("export.ics", self.get("/todos/calendar.ics"), share=0.1),
+            Scenario("todos.create", create, on_body=created),
+            Scenario("todos.update", update),
+            Scenario("pomodoro.start", start, on_body=started),
+            Scenario("pomodoro.stop", stop),
+            Scenario("todos.bulk", bulk, share=0.25),
+            Scenario("todos.delete", delete),
+        ]
+
+
+async def run_scenario(app, scenario: Scenario, requests: int, concurrency: int) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> None:
+        nonlocal errors
+        method, path, headers, body = scenario.make(i)
+        chunks: list[bytes] = []
+        async with gate:
+            t0 = time.perf_counter()
+            status = await asgi_request(app, method, path, headers, chunks.append if scenario.on_body else None, body)
+            latencies.append(time.perf_counter() - t0)
+        if status >= 400:
+            errors += 1
+        elif scenario.on_body:
+            scenario.on_body(i, b"".join(chunks))
+
+    with PeakRss() as mem:
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        wall = time.perf_counter() - t0
+    return {
+        "requests": requests,
+        "errors": errors,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "rps": requests / wall if wall else 0.0,
+        "peak_rss_growth_mb": mem.peak - mem.start,
+    }
+
+
+def compare(results: dict, baseline: dict, budget: float) -> list[str]:
+    problems = []
+    for name, base in baseline.get("results", {}).items():
+        cur = results.get(name)
+        if cur is None:
+            continue
+        if cur["p95_ms"] > base["p95_ms"] * (1 + budget):
+            problems.append(f"{name}: p95 {base['p95_ms']:.1f} -> {cur['p95_ms']:.1f} ms")
+        if cur["rps"] < base["rps"] * (1 - budget):
+            problems.append(f"{name}: throughput {base['rps']:.0f} -> {cur['rps']:.0f} req/s")
+        if cur["peak_rss_growth_mb"] > base["peak_rss_growth_mb"] * (1 + budget) + 5:
+            problems.append(f"{name}: peak RSS growth {base['peak_rss_growth_mb']:.1f} -> "
+                            f"{cur['peak_rss_growth_mb']:.1f} MiB")
+        if cur["errors"] > base.get("errors", 0):
+            problems.append(f"{name}: errors {base.get('errors', 0)} -> {cur['errors']}")
+    return problems
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", help="reuse this seeded SQLite file instead of a fresh temp one")
+    ap.add_argument("--users", type=int, default=20)
+    ap.add_argument("--todos", type=int, default=1000, help="per user")
+    ap.add_argument("--steps", type=int, default=2, help="per todo")
+    ap.add_argument("--tags", type=int, default=50)
+    ap.add_argument("--pomodoros", type=int, default=200, help="per user")
+    ap.add_argument("--requests", type=int, default=200, help="per scenario (before its share)")
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--only", nargs="*", help="scenario name prefixes (update/delete/stop need create/start too)")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--baseline", help="JSON from --save-baseline to compare against")
+    ap.add_argument("--budget", type=float, default=0.2, help="allowed regression, e.g. 0.2 = 20%%")
+    ap.add_argument("--save-baseline", help="write this run's results here")
+    args = ap.parse_args()
+
+    os.environ.setdefault("SLOW_QUERY_MS", "0")  # the slow-query log would drown the report
+    os.environ.setdefault("THROTTLE_ENABLED", "false")  # every request comes from one client IP
+    if args.db:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(args.db)}"
+        os.environ.setdefault("BCRYPT_ROUNDS", "4")
+    else:
+        use_temp_database("load.db")
+    from sqlalchemy import select
+    from app import models
+    from app.database import SessionLocal
+    from app.main import app
+    from .seed import SeedConfig, seed
+
+    cfg = SeedConfig(users=args.users, todos_per_user=args.todos, steps_per_todo=args.steps,
+                     tags=args.tags, pomodoros_per_user=args.pomodoros, seed=args.seed)
+    if not (args.db and os.path.exists(args.db)):
+        t0 = time.perf_counter()
+        seed(cfg)
+        print(f"seeded {cfg.users} users x {cfg.todos_per_user} todos in {time.perf_counter() - t0:.1f}s")
+    with SessionLocal() as db:
+        users = db.execute(
+            select(models.User.id, models.User.email).where(models.User.email.like("%@bench.example.com"))
+        ).all()
+
+    workload = Workload([tuple(u) for u in users], cfg.password, args.seed)
+    scenarios = [s for s in workload.scenarios()
+                 if not args.only or any(s.name.startswith(p) for p in args.only)]
+
+    async def run_all() -> dict:
+        out = {}
+        async with app.router.lifespan_context(app):
+            for s in scenarios:
+                out[s.name] = await run_scenario(app, s, max(1, int(args.requests * s.share)), args.concurrency)
+                r = out[s.name]
+                print(f"{s.name:<20} {r['requests']:>6} {r['errors']:>6} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+                      f"{r['p99_ms']:>8.1f} {r['rps']:>9.1f} {r['peak_rss_growth_mb']:>8.1f}")
+        return out
+
+    print(f"{'scenario':<20} {'reqs':>6} {'errors':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'req/s':>9} {'rss +MiB':>8}")
+    results = asyncio.run(run_all())
+    report = {
+        "meta": {
+            "users": len(users), "todos_per_user": cfg.todos_per_user, "requests": args.requests,
+            "concurrency": args.concurrency, "python": platform.python_version(),
+            "db_mode": os.getenv("DB_MODE", "sync"),
+        },
+        "results": results,
+    }
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as fh:
+            json.dump(report, fh, indent=2)
+        print(f"baseline written to {args.save_baseline}")
+    if args.baseline:
+        with open(args.baseline) as fh:
+            problems = compare(results, json.load(fh), args.budget)
+        for p in problems:
+            print(f"REGRESSION {p}")
+        if problems:
+            sys.exit(1)
+        print(f"no regressions beyond {args.budget:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# benchmarks/schedule.py
+"""Auto-scheduler cost over synthetic calendars.
+
+    python -m benchmarks.schedule --todos 1000 5000 --days 30 --repeat 5
+
+"plan" times app.scheduler.plan alone. The calendar has working hours on
+weekdays, and a third of the working time is already taken by busy blocks.
+"endpoint" times POST /todos/schedule for a seeded user with that many
+pending todos, including the queries and the response encoding.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import gc
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+from .common import asgi_request, create_user, percentile, seed_todos, use_temp_database
+
+
+def synthetic_calendar(todos: int, days: int, seed: int = 7):
+    from app import scheduler
+
+    rnd = random.Random(seed)
+    start = datetime(2024, 3, 4, 0, 0)  # a Monday
+    busy = []
+    for d in range(days):
+        day = start + timedelta(days=d, hours=9)
+        for _ in range(rnd.randint(2, 6)):  # meetings, ~1/3 of an 8h day
+            begin = day + timedelta(minutes=rnd.randrange(0, 8 * 60, 15))
+            busy.append((begin, begin + timedelta(minutes=rnd.choice((15, 30, 60, 90)))))
+    tasks = [
+        scheduler.Task(i, rnd.choice((15, 25, 25, 50, 90)), rnd.randint(1, 3),
+                       start + timedelta(days=rnd.randint(1, days)) if rnd.random() < 0.5 else None)
+        for i in range(todos)
+    ]
+    return start, start + timedelta(days=days), busy, tasks
+
+
+def timed(fn, repeat: int) -> list[float]:
+    samples = []
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            t0 = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - t0)
+        finally:
+            gc.enable()
+    return samples
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--todos", type=int, nargs="+", default=[1000, 5000])
+    ap.add_argument("--days", type=int, default=30)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    use_temp_database("schedule.db")
+    from app import scheduler
+    from app.main import app
+
+    print(f"{'case':>10} {'todos':>7} {'placed':>7} {'p50 ms':>8} {'p95 ms':>8}")
+    for n in args.todos:
+        start, end, busy, tasks = synthetic_calendar(n, args.days)
+        placed, _ = scheduler.plan(start, end, scheduler.WorkingHours(), busy, tasks)
+        samples = timed(lambda: scheduler.plan(start, end, scheduler.WorkingHours(), busy, tasks), args.repeat)
+        print(f"{'plan':>10} {n:>7} {len(placed):>7} {percentile(samples, 50) * 1000:>8.1f} "
+              f"{percentile(samples, 95) * 1000:>8.1f}")
+
+    start = datetime(2024, 3, 4)
+    end = start + timedelta(days=args.days)
+
+    async def endpoint() -> None:
+        async with app.router.lifespan_context(app):
+            for i, n in enumerate(args.todos):
+                user_id, headers = create_user(email=f"schedule{i}@example.com")
+                seed_todos(user_id, n + n // 2, steps_per_todo=0)  # a third come out completed
+                body = json.dumps({"start": start.isoformat(), "end": end.isoformat()}).encode()
+                headers = {**headers, "Content-Type": "application/json"}
+                chunks: list[bytes] = []
+                samples = []
+                for _ in range(args.repeat + 1):
+                    chunks.clear()
+                    t0 = time.perf_counter()
+                    status = await asgi_request(app, "POST", "/todos/schedule", headers, chunks.append, body)
+                    samples.append(time.perf_counter() - t0)
+                    assert status == 200, b"".join(chunks)
+                placed = len(json.loads(b"".join(chunks))["scheduled"])
+                samples = samples[1:]  # first call warms the TypeAdapter
+                print(f"{'endpoint':>10} {n:>7} {placed:>7} {percentile(samples, 50) * 1000:>8.1f} "
+                      f"{percentile(samples, 95) * 1000:>8.1f}")
+
+    asyncio.run(endpoint())
+
+
+if __name__ == "__main__":
+    main()
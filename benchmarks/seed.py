@@ -0,0 +1,147 @@
+# benchmarks/seed.py
+"""Deterministic synthetic data: users with todos, steps, tags and pomodoros.
+
+    python -m benchmarks.seed --db /tmp/bench.db --users 1000 --todos 5000
+
+Rows go in through Core executemany inserts in large batches. The pomodoro
+rollup is rebuilt at the end, and the search index is kept up to date by
+its triggers. Every user gets the same password (SeedConfig.password),
+which is hashed once.
+"""
+from __future__ import annotations
+import argparse
+import os
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+WORDS = (
+    "email report invoice groceries plumber review budget deploy backup dentist "
+    "gym call draft slides refactor release taxes garden meeting notes"
+).split()
+
+
+@dataclass
+class SeedConfig:
+    users: int = 10
+    todos_per_user: int = 500
+    steps_per_todo: int = 2
+    tags: int = 50
+    tags_per_todo: int = 2
+    pomodoros_per_user: int = 200
+    password: str = "bench-password"
+    seed: int = 42
+    batch: int = 10_000
+
+
+def email_for(n: int) -> str:
+    return f"user{n}@bench.example.com"
+
+
+def seed(cfg: SeedConfig) -> list[str]:
+    """Insert cfg's dataset into app.database.engine; returns the user emails."""
+    from sqlalchemy import func, insert, select
+    from sqlalchemy.orm import Session
+
+    from app import models, rollups
+    from app.database import engine
+    from app.schema import ensure_schema
+    from app.security import get_password_hash
+    from app.utils import lexorank
+
+    ensure_schema(engine, migrate=True)
+    rnd = random.Random(cfg.seed)
+    ranks = lexorank.spread(cfg.steps_per_todo)
+    base = datetime.utcnow() - timedelta(days=120)
+    hashed = get_password_hash(cfg.password)
+
+    def title() -> str:
+        return " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(2, 5))).capitalize()
+
+    with engine.begin() as conn:
+        first_user = (conn.execute(select(func.max(models.User.id))).scalar() or 0) + 1
+        emails = [email_for(first_user + n) for n in range(cfg.users)]
+        conn.execute(insert(models.User), [
+            {"id": first_user + n, "email": e, "hashed_password": hashed, "created_at": base}
+            for n, e in enumerate(emails)
+        ])
+        tag_ids = []
+        if cfg.tags:
+            first_tag = (conn.execute(select(func.max(models.Tag.id))).scalar() or 0) + 1
+            tag_ids = list(range(first_tag, first_tag + cfg.tags))
+            conn.execute(insert(models.Tag), [{"id": t, "name": f"bench-{t}"} for t in tag_ids])
+
+        next_todo = (conn.execute(select(func.max(models.Todo.id))).scalar() or 0) + 1
+        todos, steps, links, pomodoros = [], [], [], []
+
+        def flush(force: bool = False) -> None:
+            if len(todos) + len(steps) + len(pomodoros) < cfg.batch and not force:
+                return
+            # Parents first: steps, links and pomodoros reference todos.
+            for table, rows in ((models.Todo, todos), (models.TodoStep, steps),
+                                (models.TodoTag, links), (models.Pomodoro, pomodoros)):
+                if rows:
+                    conn.execute(insert(table), rows)
+                    rows.clear()
+
+        for n in range(cfg.users):
+            user_id = first_user + n
+            own = range(next_todo, next_todo + cfg.todos_per_user)
+            next_todo += cfg.todos_per_user
+            for i in own:
+                created = base + timedelta(seconds=rnd.randint(0, 120 * 86400))
+                todos.append({
+                    "id": i, "owner_id": user_id, "title": title(), "notes": title(),
+                    "completed": rnd.random() < 0.3, "priority": rnd.randint(1, 3),
+                    "estimate_minutes": rnd.choice((15, 25, 50)),
+                    "created_at": created, "updated_at": created,
+                    "due_date": created + timedelta(days=rnd.randint(0, 30)) if rnd.random() < 0.5 else None,
+                })
+                steps.extend(
+                    {"todo_id": i, "text": title(), "done": rnd.random() < 0.5, "rank": rank}
+                    for rank in ranks
+                )
+                if tag_ids:
+                    links.extend({"todo_id": i, "tag_id": t} for t in rnd.sample(tag_ids, min(cfg.tags_per_todo, len(tag_ids))))
+            for _ in range(cfg.pomodoros_per_user):
+                started = base + timedelta(seconds=rnd.randint(0, 120 * 86400))
+                minutes = rnd.choice((25, 25, 50))
+                pomodoros.append({
+                    "owner_id": user_id, "todo_id": rnd.choice(own) if own and rnd.random() < 0.8 else None,
+                    "started_at": started, "ended_at": started + timedelta(minutes=minutes),
+                    "duration_minutes": minutes, "actual_minutes": minutes, "note": "",
+                })
+            flush()
+        flush(force=True)
+
+    with Session(engine) as db:
+        rollups.rebuild(db)
+        db.commit()
+    return emails
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", required=True, help="SQLite file to create/extend")
+    ap.add_argument("--users", type=int, default=SeedConfig.users)
+    ap.add_argument("--todos", type=int, default=SeedConfig.todos_per_user, help="per user")
+    ap.add_argument("--steps", type=int, default=SeedConfig.steps_per_todo, help="per todo")
+    ap.add_argument("--tags", type=int, default=SeedConfig.tags, help="distinct tags")
+    ap.add_argument("--tags-per-todo", type=int, default=SeedConfig.tags_per_todo)
+    ap.add_argument("--pomodoros", type=int, default=SeedConfig.pomodoros_per_user, help="per user")
+    ap.add_argument("--seed", type=int, default=SeedConfig.seed)
+    args = ap.parse_args()
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(args.db)}"
+    os.environ.setdefault("BCRYPT_ROUNDS", "4")
+    cfg = SeedConfig(users=args.users, todos_per_user=args.todos, steps_per_todo=args.steps, tags=args.tags,
+                     tags_per_todo=args.tags_per_todo, pomodoros_per_user=args.pomodoros, seed=args.seed)
+    t0 = time.perf_counter()
+    emails = seed(cfg)
+    print(f"seeded {len(emails)} users x {cfg.todos_per_user} todos into {args.db} "
+          f"in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# benchmarks/sqlite_writes.py
+"""Concurrent write throughput on one SQLite file, DB_PROFILE=plain vs production.
+
+    python -m benchmarks.sqlite_writes --processes 2 --threads 8 --writes 200
+
+Each process stands in for a uvicorn worker; its threads insert and update
+todos through app.database.SessionLocal the way the routes do (one commit
+per operation), while a reader thread keeps listing.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from .common import use_temp_database
+
+
+def _worker(args) -> None:
+    from sqlalchemy.exc import OperationalError
+    from app import models
+    from app.database import SessionLocal
+
+    done = threading.Event()
+    counts = {"writes": 0, "locked": 0, "other": 0, "reads": 0}
+    lock = threading.Lock()
+
+    def writer() -> None:
+        for i in range(args.writes):
+            db = SessionLocal()
+            try:
+                todo = models.Todo(owner_id=1, title=f"w{os.getpid()}-{i}")
+                db.add(todo)
+                db.commit()
+                todo.completed = True
+                db.commit()
+                key = "writes"
+            except OperationalError as exc:
+                db.rollback()
+                key = "locked" if "locked" in str(exc) else "other"
+            finally:
+                db.close()
+            with lock:
+                counts[key] += 1
+
+    def reader() -> None:
+        while not done.is_set():
+            try:
+                with SessionLocal() as db:
+                    db.query(models.Todo).order_by(models.Todo.id.desc()).limit(50).all()
+                key = "reads"
+            except OperationalError:
+                key = "locked"
+            with lock:
+                counts[key] += 1
+
+    r = threading.Thread(target=reader)
+    r.start()
+    threads = [threading.Thread(target=writer) for _ in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    done.set()
+    r.join()
+    print(json.dumps(counts))
+
+
+def _run_profile(profile: str, args) -> dict:
+    path = use_temp_database(f"writes-{profile}.db")
+    env = {**os.environ, "DB_PROFILE": profile, "DATABASE_URL": f"sqlite:///{path}"}
+    subprocess.run([sys.executable, "-c", "from app.database import engine; from app.schema import init_schema; init_schema(engine)"],
+                   env=env, check=True)
+    argv = [sys.executable, "-m", "benchmarks.sqlite_writes", "--child",
+            "--threads", str(args.threads), "--writes", str(args.writes)]
+    t0 = time.perf_counter()
+    procs = [subprocess.Popen(argv, env=env, stdout=subprocess.PIPE, text=True) for _ in range(args.processes)]
+    totals = {"writes": 0, "locked": 0, "other": 0, "reads": 0}
+    for p in procs:
+        out, _ = p.communicate()
+        for k, v in json.loads(out.strip().splitlines()[-1]).items():
+            totals[k] += v
+    totals["seconds"] = time.perf_counter() - t0
+    return totals
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--processes", type=int, default=2)
+    ap.add_argument("--threads", type=int, default=8)
+    ap.add_argument("--writes", type=int, default=200, help="insert+update pairs per thread")
+    ap.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.child:
+        return _worker(args)
+
+    print(f"{'profile':>11} {'ok writes':>10} {'locked':>7} {'other':>6} {'reads':>7} {'seconds':>8} {'writes/s':>9}")
+    for profile in ("plain", "production"):
+        r = _run_profile(profile, args)
+        print(f"{profile:>11} {r['writes']:>10} {r['locked']:>7} {r['other']:>6} {r['reads']:>7} "
+              f"{r['seconds']:>8.2f} {r['writes'] * 2 / r['seconds']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
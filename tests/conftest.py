@@ -0,0 +1,69 @@
+# tests/conftest.py
+"""Shared fixtures: one app on a throwaway SQLite file, a fresh user per test.
+
+The environment is set before app is imported, since app.database and
+friends read it at import time.
+"""
+import os
+import tempfile
+
+_tmp = tempfile.mkdtemp(prefix="todo-tests-")
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{os.path.join(_tmp, 'test.db')}",
+    "BCRYPT_ROUNDS": "4",
+    "THROTTLE_ENABLED": "false",
+    "METRICS_DIR": "memory",
+    "DATA_VERSION_FILE": "memory",
+    "THROTTLE_FILE": "memory",
+    "ARCHIVE_TODOS_AFTER_DAYS": "0",  # no background archival under the tests' feet
+    "ARCHIVE_POMODOROS_AFTER_DAYS": "0",
+})
+os.environ.pop("DATABASE_READ_URL", None)
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.database import engine
+from app.main import app
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture
+def make_user(client):
+    """make_user() -> Authorization headers for a new demo user."""
+    def make():
+        token = client.post("/auth/seed_demo").json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        client.get("/auth/me", headers=headers)  # warm the auth cache
+        return headers
+    return make
+
+
+@pytest.fixture
+def auth(make_user):
+    return make_user()
+
+
+@pytest.fixture
+def count_queries():
+    """count_queries(fn) -> (fn(), SQL statements it executed), counted
+    with a before_cursor_execute listener on the app's engine."""
+    def run(fn):
+        statements = []
+
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", count)
+        try:
+            result = fn()
+        finally:
+            event.remove(engine, "before_cursor_execute", count)
+        return result, statements
+    return run
@@ -0,0 +1,74 @@
+# tests/test_archive.py
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update
+
+from app import archive, models
+from app.database import SessionLocal
+
+
+def _todo(client, auth, title, stopped):
+    todo = client.post("/todos/", json={"title": title}, headers=auth).json()
+    pomodoro = client.post("/pomodoro/start", json={"todo_id": todo["id"]}, headers=auth).json()
+    if stopped:
+        client.post("/pomodoro/stop", json={"pomodoro_id": pomodoro["id"]}, headers=auth)
+    client.put(f"/todos/{todo['id']}", json={"completed": True}, headers=auth)
+    return todo["id"], pomodoro["id"]
+
+
+def _age(*todo_ids):
+    with SessionLocal() as db:
+        db.execute(update(models.Todo).where(models.Todo.id.in_(todo_ids))
+                   .values(updated_at=datetime.utcnow() - timedelta(days=200)))
+        db.commit()
+
+
+def _archive():
+    """One archival batch; returns the ids of every todo now in the archive."""
+    archive._run_batch(archive.archive_todos, datetime.utcnow() - timedelta(days=90))
+    with SessionLocal() as db:
+        return set(db.scalars(select(models.ArchivedTodo.id)))
+
+
+def _pomodoro_ids(model, ids):
+    with SessionLocal() as db:
+        return set(db.scalars(select(model.id).where(model.id.in_(ids))))
+
+
+def _listed(client, auth, **params):
+    return {t["id"]: t for t in client.get("/todos/", params=params, headers=auth).json()}
+
+
+def test_running_pomodoro_keeps_its_todo_live_until_stopped(client, auth):
+    running, p_running = _todo(client, auth, "running", stopped=False)
+    done, p_done = _todo(client, auth, "done", stopped=True)
+    _todo(client, auth, "newest", stopped=True)  # archival never moves the newest rows
+    _age(running, done)
+    archived = _archive()
+    assert done in archived and running not in archived
+    assert running in _listed(client, auth) and done not in _listed(client, auth)
+    assert _listed(client, auth, include_archived=True)[done]["archived"] is True
+    assert _pomodoro_ids(models.Pomodoro, [p_running, p_done]) == {p_running}
+    assert _pomodoro_ids(models.ArchivedPomodoro, [p_running, p_done]) == {p_done}
+
+    r = client.post("/pomodoro/stop", json={"pomodoro_id": p_running}, headers=auth)
+    assert r.status_code == 200 and r.json()["ended_at"] is not None
+
+    # Stopped now, so the next pass takes the todo along with its pomodoro.
+    assert running in _archive()
+    assert _pomodoro_ids(models.ArchivedPomodoro, [p_running, p_done]) == {p_running, p_done}
+    assert client.get("/pomodoro/summary", headers=auth).json()["sessions"] == 3
+
+
+def test_restore_brings_pomodoros_back(client, auth):
+    done, p_done = _todo(client, auth, "done", stopped=True)
+    _todo(client, auth, "newest", stopped=True)
+    _age(done)
+    assert done in _archive()
+
+    r = client.post(f"/todos/{done}/restore", headers=auth)
+    assert r.status_code == 200 and r.json()["archived"] is False
+    assert _pomodoro_ids(models.Pomodoro, [p_done]) == {p_done}
+    assert not _pomodoro_ids(models.ArchivedPomodoro, [p_done])
+    assert _listed(client, auth)[done]["completed"] is True
+    assert done not in _archive()  # restore touched updated_at
@@ -0,0 +1,25 @@
+# tests/test_auth.py
+import inspect
+import secrets
+
+import pytest
+
+from app.routers import auth
+
+
+@pytest.mark.parametrize("endpoint", [auth.register, auth.login, auth.seed_demo])
+def test_hashing_endpoints_are_async(endpoint):
+    # A sync endpoint would hold a threadpool thread while bcrypt runs.
+    assert inspect.iscoroutinefunction(endpoint)
+
+
+def test_register_then_login(client):
+    email, password = f"user-{secrets.token_hex(4)}@mail.com", "hunter22"
+    r = client.post("/auth/register", json={"email": email, "password": password})
+    assert r.status_code == 201 and r.json()["email"] == email
+    assert client.post("/auth/register", json={"email": email, "password": "other"}).status_code == 400
+
+    assert client.post("/auth/login", data={"username": email, "password": "wrong"}).status_code == 401
+    assert client.post("/auth/login", data={"username": "nobody@mail.com", "password": password}).status_code == 401
+    token = client.post("/auth/login", data={"username": email, "password": password}).json()["access_token"]
+    assert client.get("/auth/me", headers={"Authorization": f"Bearer {token}"}).json()["email"] == email
@@ -0,0 +1,58 @@
+# tests/test_bulk.py
+def _todos(client, auth):
+    return {t["id"]: t for t in client.get("/todos/", headers=auth).json()}
+
+
+def test_mixed_batch_reports_per_item_and_stores_only_valid(client, make_user):
+    me, other = make_user(), make_user()
+    keep = client.post("/todos/", json={"title": "keep", "tags": ["a"]}, headers=me).json()
+    edit = client.post("/todos/", json={"title": "edit"}, headers=me).json()
+    gone = client.post("/todos/", json={"title": "gone"}, headers=me).json()
+    theirs = client.post("/todos/", json={"title": "theirs"}, headers=other).json()
+
+    ops = [
+        {"op": "create", "data": {"title": "new one", "tags": ["x", "y"]}},    # 0 ok
+        {"op": "create", "data": {"notes": "no title"}},                       # 1 invalid
+        {"op": "create", "data": {"title": "bad priority", "priority": 9}},    # 2 invalid
+        {"op": "update", "id": edit["id"], "data": {"title": "edited", "tags": ["b"]}},  # 3 ok
+        {"op": "update", "id": keep["id"], "data": {"estimate_minutes": 1}},  # 4 invalid
+        {"op": "update", "data": {"title": "no id"}},                          # 5 invalid
+        {"op": "update", "id": theirs["id"], "data": {"title": "hijack"}},     # 6 not mine
+        {"op": "delete", "id": gone["id"]},                                    # 7 ok
+        {"op": "delete", "id": 10 ** 9},                                       # 8 missing
+        {"op": "delete", "id": theirs["id"]},                                  # 9 not mine
+        {"op": "create", "data": {"title": "new two"}},                        # 10 ok
+    ]
+    r = client.post("/todos/bulk", json={"ops": ops}, headers=me)
+    assert r.status_code == 200
+    results = r.json()["results"]
+    assert [x["index"] for x in results] == list(range(len(ops)))
+    assert [x["ok"] for x in results] == [True, False, False, True, False, False, False, True, False, False, True]
+    assert "title" in results[1]["error"]
+    assert "priority" in results[2]["error"]
+    assert "estimate_minutes" in results[4]["error"]
+    assert results[5]["error"] == "id is required"
+    assert results[6]["error"] == results[8]["error"] == results[9]["error"] == "Todo not found"
+    assert all(x["error"] is None for x in results if x["ok"])
+
+    mine = _todos(client, me)
+    created = {results[0]["id"], results[10]["id"]}
+    assert set(mine) == {keep["id"], edit["id"]} | created
+    # ids come back in op order (importer.insert_todos)
+    assert mine[results[0]["id"]]["title"] == "new one" and mine[results[10]["id"]]["title"] == "new two"
+    assert [t["name"] for t in mine[results[0]["id"]]["tags"]] == ["x", "y"]
+    assert mine[edit["id"]]["title"] == "edited" and [t["name"] for t in mine[edit["id"]]["tags"]] == ["b"]
+    assert mine[keep["id"]]["estimate_minutes"] == keep["estimate_minutes"]
+    assert [t["name"] for t in mine[keep["id"]]["tags"]] == ["a"]
+
+    assert _todos(client, other)[theirs["id"]]["title"] == "theirs"
+
+
+def test_all_invalid_stores_nothing(client, auth):
+    before = _todos(client, auth)
+    r = client.post("/todos/bulk", headers=auth, json={"ops": [
+        {"op": "create", "data": {}},
+        {"op": "update", "id": 10 ** 9, "data": {"title": "x"}},
+    ]})
+    assert [x["ok"] for x in r.json()["results"]] == [False, False]
+    assert _todos(client, auth) == before
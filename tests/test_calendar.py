@@ -0,0 +1,44 @@
+# tests/test_calendar.py
+import time
+from datetime import datetime, timedelta
+
+from app.utils.http import settled
+
+
+def _todo(client, auth, title="Dentist", due="2030-01-02T09:00:00"):
+    return client.post("/todos/", json={"title": title, "due_date": due}, headers=auth).json()
+
+
+def test_etag_revalidates(client, auth):
+    _todo(client, auth)
+    first = client.get("/todos/calendar.ics", headers=auth)
+    assert first.status_code == 200 and "SUMMARY:Dentist" in first.text
+    again = client.get("/todos/calendar.ics", headers={**auth, "If-None-Match": first.headers["etag"]})
+    assert again.status_code == 304 and again.content == b""
+
+
+def test_output_is_stable(client, auth):
+    _todo(client, auth)
+    assert client.get("/todos/calendar.ics", headers=auth).text == client.get("/todos/calendar.ics", headers=auth).text
+
+
+def test_if_modified_since_sees_delete(client, auth):
+    _todo(client, auth, "Keep")
+    gone = _todo(client, auth, "Gone")
+    time.sleep(1.1)  # let Last-Modified settle
+    first = client.get("/todos/calendar.ics", headers=auth)
+    since = first.headers["last-modified"]
+    assert client.get("/todos/calendar.ics", headers={**auth, "If-Modified-Since": since}).status_code == 304
+    client.delete(f"/todos/{gone['id']}", headers=auth)
+    after = client.get("/todos/calendar.ics", headers={**auth, "If-Modified-Since": since})
+    assert after.status_code == 200
+    assert "SUMMARY:Keep" in after.text and "SUMMARY:Gone" not in after.text
+    assert after.headers["etag"] != first.headers["etag"]
+
+
+
+def test_last_modified_settles_after_its_second():
+    t = datetime(2030, 1, 2, 9, 0, 0, 250000)
+    assert settled(t, now=t.replace(microsecond=900000)) is None  # a later write could share the second
+    assert settled(t, now=t + timedelta(seconds=1)) == t
+    assert settled(None) is None
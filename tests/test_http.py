@@ -0,0 +1,51 @@
+# tests/test_http.py
+import pytest
+from starlette.requests import Request
+
+from app.utils.http import accepts_gzip
+
+
+def _request(accept_encoding=None):
+    headers = [] if accept_encoding is None else [(b"accept-encoding", accept_encoding.encode())]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, False),
+    ("", False),
+    ("gzip", True),
+    ("GZIP", True),
+    ("br, gzip;q=0.5", True),
+    ("deflate, br", False),
+    ("gzip;q=0", False),
+    ("gzip; q=0.000", False),
+    ("gzip;q=abc", False),
+    ("gzip;q=", False),
+    ("gzip;q=nan", False),
+    ("gzip;q=2", False),
+    ("gzip;q=-1", False),
+    ("*", True),
+    ("*;q=0", False),
+    ("*;q=0, gzip", True),
+    ("gzip, *;q=0", True),
+    ("*, gzip;q=0", False),
+    ("gzip;q=0, *", False),
+    ("*;q=abc, br", False),
+    ("identity;q=1, *;q=0.1", True),
+])
+def test_accepts_gzip(header, expected):
+    assert accepts_gzip(_request(header)) is expected
+
+
+def test_export_survives_malformed_q(client, auth):
+    client.post("/todos/", json={"title": "exported"}, headers=auth)
+    r = client.get("/todos/export.csv", headers={**auth, "Accept-Encoding": "gzip;q=abc"})
+    assert r.status_code == 200
+    assert "content-encoding" not in r.headers and "exported" in r.text
+
+
+def test_export_gzips_when_asked(client, auth):
+    client.post("/todos/", json={"title": "exported"}, headers=auth)
+    r = client.get("/todos/export.csv", headers={**auth, "Accept-Encoding": "*;q=0, gzip"})
+    assert r.headers["content-encoding"] == "gzip"
+    assert "exported" in r.text  # httpx decodes the gzip body
@@ -0,0 +1,74 @@
+# tests/test_pagination.py
+import base64
+from datetime import datetime
+
+import pytest
+from sqlalchemy import update
+
+from app import models
+from app.database import SessionLocal
+
+
+def _walk(client, auth, limit, **params):
+    ids, cursor = [], None
+    while True:
+        r = client.get("/todos/", params={**params, "limit": limit, **({"cursor": cursor} if cursor else {})},
+                       headers=auth)
+        assert r.status_code == 200
+        ids += [t["id"] for t in r.json()]
+        cursor = r.headers.get("x-next-cursor")
+        if not cursor:
+            return ids
+
+
+@pytest.fixture
+def tied(client, auth):
+    """11 todos, mixed status/priority, sharing created_at in groups of 4, 4 and 3."""
+    ops = [{"op": "create", "data": {"title": f"t{i}", "priority": 1 if i % 3 == 0 else 2}} for i in range(11)]
+    ids = [r["id"] for r in client.post("/todos/bulk", json={"ops": ops}, headers=auth).json()["results"]]
+    client.post("/todos/bulk", headers=auth, json={"ops": [
+        {"op": "update", "id": i, "data": {"completed": True}} for i in ids[::2]
+    ]})
+    with SessionLocal() as db:
+        for n, group in enumerate((ids[:4], ids[4:8], ids[8:])):
+            db.execute(update(models.Todo).where(models.Todo.id.in_(group)).values(created_at=datetime(2024, 1, 1 + n)))
+        db.commit()
+    return ids
+
+
+@pytest.mark.parametrize("filter", ["all", "done", "pending", "urgent"])
+@pytest.mark.parametrize("limit", [1, 3, 4, 100])
+def test_pages_cover_every_todo_once(client, auth, tied, filter, limit):
+    expected = [t["id"] for t in client.get("/todos/", params={"filter": filter}, headers=auth).json()]
+    assert expected, "fixture should match every filter"
+    assert _walk(client, auth, limit, filter=filter) == expected
+
+
+def test_order_is_created_at_then_id_descending(client, auth, tied):
+    # Groups by day, newest first; ties broken by id, highest first.
+    assert _walk(client, auth, 2) == sorted(tied[8:], reverse=True) + sorted(tied[4:8], reverse=True) \
+        + sorted(tied[:4], reverse=True)
+
+
+def _cursor(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("cursor", [
+    "garbage",
+    "%%%",
+    "",
+    _cursor(b"\xff\xfe"),
+    _cursor(b"2024-01-01T00:00:00"),
+    _cursor(b"not-a-date|5"),
+    _cursor(b"2024-01-01T00:00:00|abc"),
+    _cursor(b"2024-01-01T00:00:00|" + b"9" * 40),
+    _cursor(b"2024-01-01T00:00:00|-1"),
+    _cursor(b"2024-01-01T00:00:00+05:00|5"),
+])
+def test_bad_cursor_is_400(client, auth, tied, cursor):
+    r = client.get("/todos/", params={"cursor": cursor, "limit": 2}, headers=auth)
+    if cursor == "":
+        assert r.status_code == 200  # same as no cursor
+    else:
+        assert r.status_code == 400, r.text
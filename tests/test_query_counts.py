@@ -0,0 +1,61 @@
+# tests/test_query_counts.py
+"""TodoOut responses cost a fixed number of queries, whatever their size."""
+import itertools
+
+import pytest
+
+N = 25
+_names = itertools.count()
+
+
+def _tags(n):
+    return [f"tag{next(_names)}" for _ in range(n)]
+
+
+def _seed(client, auth, todos, steps=3, tags=2):
+    ids = []
+    for i in range(todos):
+        todo = client.post("/todos/", json={"title": f"todo {i}", "tags": _tags(tags)}, headers=auth).json()
+        for j in range(steps):
+            client.post(f"/todos/{todo['id']}/steps", json={"text": f"step {j}"}, headers=auth)
+        ids.append(todo["id"])
+    return ids
+
+
+@pytest.mark.parametrize("params", [{}, {"limit": 10}, {"filter": "pending", "limit": 50}])
+def test_list(client, make_user, count_queries, params):
+    small, large = make_user(), make_user()
+    _seed(client, small, 1)
+    _seed(client, large, N)
+
+    (r1, q1), (rn, qn) = (count_queries(lambda h=h: client.get("/todos/", params=params, headers=h))
+                          for h in (small, large))
+    assert len(r1.json()) == 1 and len(rn.json()) == min(N, params.get("limit", N))
+    assert all(len(t["steps"]) == 3 and len(t["tags"]) == 2 for t in rn.json())
+    assert len(q1) == len(qn), qn
+
+
+def test_create(client, make_user, count_queries):
+    small, large = make_user(), make_user()
+    _seed(client, large, N)
+
+    def create(headers, n):
+        return client.post("/todos/", json={"title": "new", "tags": _tags(n)}, headers=headers)
+
+    (r1, q1), (rn, qn) = (count_queries(lambda a=a: create(*a)) for a in ((small, 1), (large, N)))
+    assert len(r1.json()["tags"]) == 1 and len(rn.json()["tags"]) == N
+    assert len(q1) == len(qn), qn
+
+
+def test_update(client, make_user, count_queries):
+    small, large = make_user(), make_user()
+    [one] = _seed(client, small, 1, steps=1, tags=1)
+    many = _seed(client, large, N, steps=N, tags=N)[0]
+
+    def update(headers, todo_id, n):
+        return client.put(f"/todos/{todo_id}", json={"title": "x", "tags": _tags(n)}, headers=headers)
+
+    (r1, q1), (rn, qn) = (count_queries(lambda a=a: update(*a)) for a in ((small, one, 1), (large, many, N)))
+    assert len(r1.json()["steps"]) == 1 and len(rn.json()["steps"]) == N
+    assert len(rn.json()["tags"]) == N
+    assert len(q1) == len(qn), qn
@@ -0,0 +1,102 @@
+# tests/test_steps.py
+import random
+
+import pytest
+
+from app import steps
+from app.utils import lexorank
+
+
+@pytest.fixture
+def todo(client, auth):
+    return client.post("/todos/", json={"title": "checklist"}, headers=auth).json()["id"]
+
+
+def _steps(client, auth, todo_id):
+    [todo] = [t for t in client.get("/todos/", headers=auth).json() if t["id"] == todo_id]
+    return todo["steps"]
+
+
+def _assert_consistent(listed):
+    """Listed in rank order, with `order` numbering that order."""
+    assert listed == sorted(listed, key=lambda s: (s["rank"], s["id"]))
+    assert [s["order"] for s in listed] == list(range(len(listed)))
+
+
+def _add(client, auth, todo_id, text, order=None):
+    body = {"text": text} if order is None else {"text": text, "order": order}
+    r = client.post(f"/todos/{todo_id}/steps", json=body, headers=auth)
+    assert r.status_code == 201, r.text
+    return r.json()
+
+
+def test_between_and_spread():
+    keys = lexorank.spread(50)
+    assert keys == sorted(keys) and len(set(keys)) == 50 and not any(k.endswith("0") for k in keys)
+    lo, hi = "1", "2"
+    for _ in range(200):
+        mid = lexorank.between(lo, hi)
+        assert lo < mid < hi and not mid.endswith("0")
+        hi = mid
+
+
+def test_repeated_inserts_at_one_spot_force_a_respace(client, auth, todo, monkeypatch):
+    monkeypatch.setattr(steps, "RANK_LENGTH", 6)
+    expected = [_add(client, auth, todo, "first")["id"], _add(client, auth, todo, "last")["id"]]
+    lengths = []
+    for i in range(40):  # always between "first" and the previous insert
+        step = _add(client, auth, todo, f"s{i}", order=1)
+        assert step["order"] == 1
+        expected.insert(1, step["id"])
+        listed = _steps(client, auth, todo)
+        assert [s["id"] for s in listed] == expected
+        _assert_consistent(listed)
+        lengths.append(max(len(s["rank"]) for s in listed))
+    assert max(lengths) <= 6
+    assert any(b < a for a, b in zip(lengths, lengths[1:])), "keys never got respaced"
+
+
+def test_background_rebalance_keeps_order(client, auth, todo, monkeypatch):
+    monkeypatch.setattr(steps, "STEP_RANK_REBALANCE_LENGTH", 2)
+    ids = [_add(client, auth, todo, "a")["id"], _add(client, auth, todo, "b")["id"]]
+    for i in range(20):
+        ids.insert(1, _add(client, auth, todo, f"m{i}", order=1)["id"])
+    assert any(t == todo for _, t in steps._queued)
+    steps._respace_queued()
+    listed = _steps(client, auth, todo)
+    assert [s["id"] for s in listed] == ids
+    assert max(len(s["rank"]) for s in listed) <= 2
+    _assert_consistent(listed)
+
+
+def test_batch_reorder(client, auth, todo):
+    ids = [_add(client, auth, todo, f"s{i}")["id"] for i in range(12)]
+    new = ids[:]
+    random.Random(7).shuffle(new)
+    r = client.patch(f"/todos/{todo}/steps/order", json={"step_ids": new}, headers=auth)
+    assert r.status_code == 200
+    assert [s["id"] for s in r.json()] == new
+    assert [s["order"] for s in r.json()] == list(range(12))
+    listed = _steps(client, auth, todo)
+    assert [s["id"] for s in listed] == new
+    _assert_consistent(listed)
+
+
+@pytest.mark.parametrize("change", ["missing", "duplicate", "foreign"])
+def test_batch_reorder_must_list_every_step_once(client, auth, todo, change):
+    ids = [_add(client, auth, todo, f"s{i}")["id"] for i in range(3)]
+    body = {"missing": ids[:2], "duplicate": ids + ids[:1], "foreign": ids[:2] + [10 ** 9]}[change]
+    r = client.patch(f"/todos/{todo}/steps/order", json={"step_ids": body}, headers=auth)
+    assert r.status_code == 422
+    assert [s["id"] for s in _steps(client, auth, todo)] == ids
+
+
+def test_move_rewrites_one_step_and_order_follows_rank(client, auth, todo):
+    ids = [_add(client, auth, todo, f"s{i}")["id"] for i in range(5)]
+    before = {s["id"]: s["rank"] for s in _steps(client, auth, todo)}
+    moved = client.put(f"/todos/steps/{ids[4]}", json={"order": 1}, headers=auth).json()
+    assert moved["order"] == 1
+    listed = _steps(client, auth, todo)
+    assert [s["id"] for s in listed] == [ids[0], ids[4], ids[1], ids[2], ids[3]]
+    assert {s["id"]: s["rank"] for s in listed if s["id"] != ids[4]} == {i: before[i] for i in ids[:4]}
+    _assert_consistent(listed)